@@ -2,32 +2,84 @@
 from flask import Flask
 from flask_sqlalchemy import SQLAlchemy
 from flask_cors import CORS
-from flask_migrate import Migrate
 from app.config import Config
+from app.cache import init_cache
+from app.lazy_migrate import LazyMigrate
+from app.engine import RoutingSession, configure_engine_options, install_engine_hooks
+from app.metrics import init_metrics
+from app.query_debug import init_query_debug
+from app.admission import init_admission
+from app.compression import init_compression
 
-db = SQLAlchemy()
-migrate = Migrate() 
+db = SQLAlchemy(session_options={'class_': RoutingSession})
+migrate = LazyMigrate()
 
 def create_app(config_class=Config):
     app = Flask(__name__)
     app.config.from_object(config_class)
     
     # Initialize extensions
+    configure_engine_options(app)
     db.init_app(app)
+    install_engine_hooks(app, db)
+    
+    from app.replicas import init_replicas
+    init_replicas(app)
+    
+    init_metrics(app, db)
+    init_query_debug(app, db)
+    init_admission(app)
+    init_compression(app)
     migrate.init_app(app, db)
+    init_cache(app)
+    
+    from app.serializers import init_json
+    init_json(app)
+    
+    from app.counters import init_counters
+    init_counters(app)
+    
+    from app.leaderboards import init_leaderboards
+    init_leaderboards(app)
+    
+    from app.vendor_cache import init_vendor_cache
+    init_vendor_cache(app)
     
     # Enable CORS with proper configuration
-    CORS(app, origins=app.config['CORS_ORIGINS'])
+    # Credentials let the SPA keep the replicas' read-your-writes cookie
+    CORS(app, origins=app.config['CORS_ORIGINS'], supports_credentials=True,
+         expose_headers=['X-Next-Cursor', 'Link'])
     
     # Import models so Alembic can see them
    
     
     # Register blueprints
+    from app.routes.core_routes import core_bp
     from app.routes.vendor_routes import vendor_bp
     from app.routes.service_routes import service_bp
+    from app.routes.job_routes import job_bp
    
-
+    app.register_blueprint(core_bp)
     app.register_blueprint(vendor_bp, url_prefix='/api')
     app.register_blueprint(service_bp, url_prefix='/api')
+    app.register_blueprint(job_bp, url_prefix='/api')
+    
+    # CLI commands
+    from app.schema import create_db_command
+    app.cli.add_command(create_db_command)
+    from app.search import rebuild_search_index_command
+    app.cli.add_command(rebuild_search_index_command)
+    from app.stats import stats_cli
+    app.cli.add_command(stats_cli)
+    from app.geo import geocode_vendors_command
+    app.cli.add_command(geocode_vendors_command)
+    from app.sync import purge_tombstones_command
+    app.cli.add_command(purge_tombstones_command)
+    from app.jobs import jobs_cli
+    app.cli.add_command(jobs_cli)
+    from app.replicas import replicas_cli
+    app.cli.add_command(replicas_cli)
+    from app.query_plans import check_query_plans_command
+    app.cli.add_command(check_query_plans_command)
     
     return app
@@ -0,0 +1,220 @@
+# app/admission.py
+"""Admission control: rate limits and load shedding before any view runs.
+
+Every request except CORS preflights and ADMISSION_EXEMPT endpoints goes
+through three checks, cheapest first:
+
+1. Queue wait. When the proxy stamps ``X-Request-Start`` (``t=<epoch>`` in
+   seconds, milliseconds or microseconds, as nginx and most routers do),
+   a request that already waited more than ADMISSION_MAX_QUEUE_WAIT_MS is
+   answered 503 at once. Its client has probably given up, and serving it
+   would only delay the requests queued behind it.
+2. Token buckets. Each client (the remote address, or the first entry of
+   ADMISSION_CLIENT_HEADER behind a proxy) gets a bucket, and so does
+   each route. Either one running dry gives 429 with Retry-After set to
+   when the next token is due.
+3. In-flight limit. A worker runs at most ADMISSION_MAX_IN_FLIGHT
+   requests at once, but a class only gets its ADMISSION_PRIORITY_SHARES
+   fraction of that. Writes are ``high``, reads ``normal``, and bulk
+   listing is ``low``. As load rises, low-priority reads are shed with 503
+   first, and vendor writes keep the last slots.
+
+Limits live in ADMISSION_LIMITS, keyed by ``default``, a blueprint name or
+an endpoint; the most specific setting wins. Recognised keys are
+client_rate, client_burst, route_rate, route_burst (requests per second
+and bucket size, None for no limit) and priority. A client's bucket is
+shared by every route that takes its client limit from the same key, so
+a blueprint-wide limit covers the whole blueprint.
+
+Admission is off unless ADMISSION_ENABLED is set. Before turning it on
+behind a reverse proxy, set ADMISSION_CLIENT_HEADER (e.g.
+``X-Forwarded-For``) to a header the proxy overwrites: otherwise every
+client arrives from the proxy's address and they all share one bucket.
+
+State is per process, like the response cache's memory backend: with
+several gunicorn workers each enforces the limits on its own share of
+the traffic. In-flight counting only matters when a worker runs requests
+concurrently (gthread workers or the ASGI mode).
+"""
+import math
+import threading
+import time
+from collections import OrderedDict, namedtuple
+
+from flask import current_app, g, jsonify, request
+
+PRIORITIES = ('high', 'normal', 'low')
+LIMIT_KEYS = ('client_rate', 'client_burst', 'route_rate', 'route_burst', 'priority')
+
+Rule = namedtuple('Rule', 'client_scope client_rate client_burst route_rate route_burst priority')
+
+
+class TokenBucket:
+    """``rate`` tokens per second, holding at most ``burst``"""
+
+    __slots__ = ('rate', 'burst', 'tokens', 'stamp')
+
+    def __init__(self, rate, burst, now):
+        self.rate = rate
+        self.burst = max(1.0, burst or 1.0)
+        self.tokens = self.burst
+        self.stamp = now
+
+    def wait(self, now):
+        """Seconds until a token is available (0 if one is)"""
+        self.tokens = min(self.burst, self.tokens + (now - self.stamp) * self.rate)
+        self.stamp = now
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.rate if self.rate > 0 else math.inf
+
+    def take(self):
+        self.tokens -= 1
+
+
+class AdmissionController:
+    def __init__(self, limits, max_in_flight=32, shares=None, max_queue_wait_ms=0,
+                 retry_after=1, client_header=None, max_clients=10000):
+        self.limits = limits
+        self.max_in_flight = max_in_flight
+        shares = shares or {}
+        self.slots = {priority: max(1, int(max_in_flight * shares.get(priority, 1.0)))
+                      for priority in PRIORITIES}
+        self.max_queue_wait_ms = max_queue_wait_ms
+        self.retry_after = retry_after
+        self.client_header = client_header
+        self.max_clients = max_clients
+        self.in_flight = 0
+        self._clients = OrderedDict()
+        self._routes = {}
+        self._rules = {}
+        self._lock = threading.Lock()
+
+    def rule(self, endpoint, blueprint):
+        """The limits that apply to an endpoint, merged default < blueprint < endpoint"""
+        rule = self._rules.get(endpoint)
+        if rule is None:
+            merged, scope = {}, 'default'
+            for key in ('default', blueprint, endpoint):
+                settings = self.limits.get(key) if key else None
+                if not settings:
+                    continue
+                merged.update((name, settings[name]) for name in LIMIT_KEYS if name in settings)
+                if 'client_rate' in settings or 'client_burst' in settings:
+                    scope = key
+            rule = Rule(scope, *(merged.get(name) for name in LIMIT_KEYS))
+            self._rules[endpoint] = rule
+        return rule
+
+    def client_id(self):
+        if self.client_header:
+            forwarded = request.headers.get(self.client_header)
+            if forwarded:
+                return forwarded.split(',')[0].strip()
+        return request.remote_addr or 'unknown'
+
+    def reserve(self, client, endpoint, rule, now):
+        """Take a token from the client and route buckets; returns 0 or seconds to wait"""
+        with self._lock:
+            buckets = []
+            if rule.client_rate is not None:
+                key = (client, rule.client_scope)
+                bucket = self._clients.get(key)
+                if bucket is None:
+                    bucket = self._clients[key] = TokenBucket(rule.client_rate, rule.client_burst, now)
+                    if len(self._clients) > self.max_clients:
+                        self._clients.popitem(last=False)
+                else:
+                    self._clients.move_to_end(key)
+                buckets.append(bucket)
+            if rule.route_rate is not None:
+                bucket = self._routes.get(endpoint)
+                if bucket is None:
+                    bucket = self._routes[endpoint] = TokenBucket(rule.route_rate, rule.route_burst, now)
+                buckets.append(bucket)
+
+            wait = max((bucket.wait(now) for bucket in buckets), default=0.0)
+            if not wait:
+                for bucket in buckets:
+                    bucket.take()
+            return wait
+
+    def enter(self, priority):
+        """Claim an in-flight slot for a request of this priority; False if full"""
+        with self._lock:
+            if self.in_flight >= self.slots[priority]:
+                return False
+            self.in_flight += 1
+            return True
+
+    def leave(self):
+        with self._lock:
+            self.in_flight -= 1
+
+
+def queue_wait_ms(header, now=None):
+    """Milliseconds since an ``X-Request-Start`` stamp, or None if there is none"""
+    if not header:
+        return None
+    try:
+        stamp = float(header.strip().removeprefix('t='))
+    except ValueError:
+        return None
+    # Seconds, milliseconds or microseconds since the epoch
+    if stamp > 1e14:
+        stamp /= 1e6
+    elif stamp > 1e11:
+        stamp /= 1e3
+    return ((now or time.time()) - stamp) * 1000
+
+
+def _reject(status, message, retry_after):
+    response = jsonify({"error": message})
+    response.status_code = status
+    # A bucket with rate 0 never refills
+    response.headers['Retry-After'] = str(max(1, math.ceil(min(retry_after, 3600))))
+    return response
+
+
+def _before_request():
+    if request.method == 'OPTIONS' or request.endpoint in current_app.config['ADMISSION_EXEMPT']:
+        return None
+    controller = current_app.extensions['admission']
+
+    if controller.max_queue_wait_ms:
+        waited = queue_wait_ms(request.headers.get('X-Request-Start'))
+        if waited is not None and waited > controller.max_queue_wait_ms:
+            return _reject(503, "Server busy, retry later", controller.retry_after)
+
+    rule = controller.rule(request.endpoint, request.blueprint)
+    wait = controller.reserve(controller.client_id(), request.endpoint, rule, time.monotonic())
+    if wait:
+        return _reject(429, "Too many requests", wait)
+
+    priority = rule.priority or ('normal' if request.method in ('GET', 'HEAD') else 'high')
+    if not controller.enter(priority):
+        return _reject(503, "Server busy, retry later", controller.retry_after)
+    g._admitted = True
+    return None
+
+
+def _teardown_request(exc):
+    if g.pop('_admitted', False):
+        current_app.extensions['admission'].leave()
+
+
+def init_admission(app):
+    """Install the admission checks (after init_metrics, so rejected requests are counted)"""
+    if not app.config.get('ADMISSION_ENABLED'):
+        return
+    app.extensions['admission'] = AdmissionController(
+        app.config.get('ADMISSION_LIMITS', {}),
+        max_in_flight=app.config.get('ADMISSION_MAX_IN_FLIGHT', 32),
+        shares=app.config.get('ADMISSION_PRIORITY_SHARES'),
+        max_queue_wait_ms=app.config.get('ADMISSION_MAX_QUEUE_WAIT_MS', 0),
+        retry_after=app.config.get('ADMISSION_RETRY_AFTER', 1),
+        client_header=app.config.get('ADMISSION_CLIENT_HEADER'),
+        max_clients=app.config.get('ADMISSION_MAX_CLIENTS', 10000),
+    )
+    app.before_request(_before_request)
+    app.teardown_request(_teardown_request)
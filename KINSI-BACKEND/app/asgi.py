@@ -0,0 +1,213 @@
+# app/asgi.py
+"""Async serving mode.
+
+    uvicorn --factory app.asgi:create_asgi_app --workers 4
+
+GET requests for the endpoints in app/routes/async_routes.py (vendor
+profile, stats, services, the catalog page, search and facets) are
+handled by coroutines that query through SQLAlchemy's asyncio engine on
+aiosqlite, so one worker keeps many reads in flight instead of one per
+thread.
+Every other request (writes, export, import, /metrics, ...) goes to the
+regular Flask app through asgiref's WsgiToAsgi, each request on a thread
+of its own (a ThreadSensitiveContext) rather than asgiref's one shared
+thread. The sync app and gunicorn keep working unchanged; both modes
+serve the same JSON.
+
+Async handlers run inside a Flask request context with the app's
+before/after request hooks, so the JSON provider, CORS headers, metrics,
+query debugging and the response cache (same keys and ETags as the sync
+views) all apply; a cache backend that does I/O is called from a thread.
+The async engine only reads: its connections are query_only, like the
+``readonly`` bind. Each pooled aiosqlite connection has a (non-daemon)
+thread, so the engine is disposed on lifespan shutdown and, for servers
+without lifespan, when the event loop cancels its remaining tasks on exit.
+"""
+import asyncio
+import io
+import sys
+
+from asgiref.sync import ThreadSensitiveContext, sync_to_async
+from asgiref.wsgi import WsgiToAsgi
+from flask import request
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from werkzeug.exceptions import HTTPException
+
+from app import create_app
+from app.cache import get_cache, lookup_cached, respond_cached
+from app.config import Config
+from app.engine import install_sqlite_hooks
+from app.routes.async_routes import ASYNC_VIEWS
+
+
+def _environ(scope):
+    """WSGI environ for a body-less ASGI HTTP request"""
+    server = scope.get('server') or ('localhost', 80)
+    client = scope.get('client') or ('', 0)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', '').encode('utf8').decode('latin-1'),
+        'PATH_INFO': scope['path'].encode('utf8').decode('latin-1'),
+        'QUERY_STRING': scope['query_string'].decode('ascii'),
+        'SERVER_NAME': server[0],
+        'SERVER_PORT': str(server[1] or 80),
+        'SERVER_PROTOCOL': f"HTTP/{scope['http_version']}",
+        'REMOTE_ADDR': client[0],
+        'REMOTE_PORT': str(client[1]),
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': io.BytesIO(),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False,
+    }
+    for name, value in scope['headers']:
+        name = name.decode('latin-1')
+        if name == 'content-type':
+            key = 'CONTENT_TYPE'
+        elif name == 'content-length':
+            key = 'CONTENT_LENGTH'
+        else:
+            key = 'HTTP_' + name.upper().replace('-', '_')
+        value = value.decode('latin-1')
+        environ[key] = f"{environ[key]},{value}" if key in environ else value
+    return environ
+
+
+def create_async_read_engine(app):
+    """aiosqlite engine on the app's database with query_only connections"""
+    config = app.config
+    url = make_url(config['SQLALCHEMY_DATABASE_URI'])
+    if url.get_backend_name() != 'sqlite' or url.database in (None, '', ':memory:'):
+        raise ValueError("Async serving needs a file-backed SQLite database")
+
+    engine = create_async_engine(
+        url.set(drivername='sqlite+aiosqlite'),
+        # aiosqlite defaults to NullPool, i.e. a new connection per request
+        poolclass=AsyncAdaptedQueuePool,
+        pool_size=config['ASYNC_DB_POOL_SIZE'],
+        max_overflow=0,
+        pool_timeout=config['DB_POOL_TIMEOUT'],
+        pool_recycle=config['DB_POOL_RECYCLE'],
+    )
+    if config.get('DB_ENGINE_PROFILE') == 'production':
+        install_sqlite_hooks(engine.sync_engine, config['SQLITE_PRAGMAS'],
+                             read_only=True, begin_immediate=False)
+    if config.get('METRICS_ENABLED'):
+        from app.metrics import instrument_engine
+        instrument_engine(engine.sync_engine)
+    if config.get('QUERY_DEBUG'):
+        from app.query_debug import instrument_engine
+        instrument_engine(engine.sync_engine)
+    return engine
+
+
+class AsyncReadApp:
+    """ASGI app: async handlers for hot reads, the Flask app for the rest"""
+
+    def __init__(self, flask_app, engine=None, views=ASYNC_VIEWS):
+        self.flask_app = flask_app
+        self.engine = engine or create_async_read_engine(flask_app)
+        self.sessions = async_sessionmaker(self.engine, expire_on_commit=False)
+        self.fallback = WsgiToAsgi(flask_app)
+        self.views = {endpoint: view for endpoint, view in views.items()
+                      if endpoint in flask_app.view_functions}
+        self._urls = flask_app.url_map.bind('localhost')
+        self._closer = None
+
+    async def __call__(self, scope, receive, send):
+        if self._closer is None:
+            self._closer = asyncio.get_running_loop().create_task(self._dispose_on_exit())
+        if scope['type'] == 'lifespan':
+            return await self._lifespan(receive, send)
+        if scope['type'] == 'http' and scope['method'] == 'GET':
+            view = self._match(scope['path'])
+            if view is not None:
+                return await self._serve(view, scope, send)
+        # Without a context of its own, asgiref runs every WSGI call on one shared thread
+        async with ThreadSensitiveContext():
+            await self.fallback(scope, receive, send)
+
+    def _match(self, path):
+        try:
+            endpoint, _ = self._urls.match(path, method='GET')
+        except HTTPException:
+            return None
+        return self.views.get(endpoint)
+
+    async def _serve(self, view, scope, send):
+        app = self.flask_app
+        environ = _environ(scope)
+        ctx = app.request_context(environ)
+        ctx.push()
+        error = None
+        try:
+            try:
+                response = app.preprocess_request()
+                if response is None:
+                    response = await self._dispatch(view)
+                response = app.process_response(app.make_response(response))
+            except Exception as e:
+                error = e
+                response = app.handle_exception(e)
+            body = response.get_data()
+            await send({
+                'type': 'http.response.start',
+                'status': response.status_code,
+                'headers': [(name.lower().encode('latin-1'), value.encode('latin-1'))
+                            for name, value in response.headers.items()],
+            })
+            await send({'type': 'http.response.body', 'body': body})
+        finally:
+            ctx.pop(error)
+
+    async def _dispatch(self, view):
+        view_args = request.view_args
+        tags = getattr(self.flask_app.view_functions[request.endpoint], '_cache_tags', None)
+        cache = get_cache() if tags is not None else None
+        # The sqlite backend reads a file; keep it off the event loop
+        run = sync_to_async if cache is not None and cache.blocking else _inline
+        cached = await run(lookup_cached, thread_sensitive=False)(tags, view_args) \
+            if cache is not None else None
+        if cached is not None and cached[2] is not None:
+            return await run(respond_cached, thread_sensitive=False)(*cached)
+
+        async with self.sessions() as session:
+            response = self.flask_app.make_response(await view(session, **view_args))
+        if cached is None:
+            return response
+        return await run(respond_cached, thread_sensitive=False)(*cached, response)
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                await self.engine.dispose()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def _dispose_on_exit(self):
+        # asyncio.run() (and uvicorn's loop runner) cancels leftover tasks
+        # before closing the loop; disposing here stops the connection
+        # threads that would otherwise keep the process from exiting
+        try:
+            await asyncio.Event().wait()
+        finally:
+            await self.engine.dispose()
+
+
+def _inline(func, thread_sensitive=False):
+    """sync_to_async's signature, calling ``func`` on the event loop"""
+    async def call(*args, **kwargs):
+        return func(*args, **kwargs)
+    return call
+
+
+def create_asgi_app(config_class=Config, flask_app=None):
+    """ASGI application factory (``uvicorn --factory app.asgi:create_asgi_app``)"""
+    return AsyncReadApp(flask_app or create_app(config_class))
@@ -0,0 +1,344 @@
+# app/bulk_import.py
+"""Bulk vendor/service import from CSV or NDJSON.
+
+Rows are read lazily, validated, and written a chunk at a time: vendors
+with multi-row ``INSERT ... ON CONFLICT(user_id) DO UPDATE`` statements
+(as many rows per statement as the driver's bind parameter limit allows),
+services matched to existing ones by (vendor_id, service_name) and updated
+or inserted with executemany, all in one transaction per chunk. The search
+index and stats rollup of the touched vendors are refreshed in the same
+transaction. A bad row is reported with its line number and skipped; it
+never aborts the rest of the import.
+
+Like the profile POST, an update only changes the columns a row supplies:
+a column missing from the row (or null) keeps its stored value, and is
+blank on a new vendor. NDJSON rows may carry a ``services`` list; in CSV
+the ``services`` column holds the same list as JSON. Rows without
+``latitude``/``longitude`` are located by geocoding their address
+(app/geo.py) when they supply one.
+"""
+import csv
+import io
+import json
+import sqlite3
+from dataclasses import dataclass, field
+from datetime import datetime
+
+from sqlalchemy.exc import SQLAlchemyError
+from app import db
+from app.cache import invalidate
+from app.facets import FACETS_TAG
+from app.geo import LOCATION_COLUMNS, geocode, location_values, parse_coordinates
+from app.leaderboards import vendors_changed
+from app.models.vendors import Vendor
+from app.search import index_vendors
+from app.stats import refresh_vendor_stats
+from app.sync import StampExpired, commit_stamped
+from app.vendor_cache import forget_vendors
+
+VENDOR_FIELDS = (
+    'business_name', 'owner_name', 'email', 'service_type', 'description',
+    'contact_phone', 'address', 'experience', 'website', 'instagram',
+    'facebook', 'twitter',
+)
+
+DEFAULT_CHUNK_SIZE = 500
+
+# Bind parameters per statement for drivers that do not report their limit
+DEFAULT_MAX_VARIABLES = 32766
+
+
+@dataclass
+class ImportReport:
+    rows: int = 0
+    vendors: int = 0
+    services: int = 0
+    errors: list = field(default_factory=list)
+
+    def to_dict(self, max_errors=None):
+        errors = self.errors if max_errors is None else self.errors[:max_errors]
+        return {
+            "rows": self.rows,
+            "vendors": self.vendors,
+            "services": self.services,
+            "error_count": len(self.errors),
+            "errors": [{"row": row, "error": error} for row, error in errors],
+        }
+
+
+def iter_rows(stream, fmt):
+    """Yield (line number, row dict or parse error) from a text stream"""
+    if fmt == 'ndjson':
+        for line_number, line in enumerate(stream, start=1):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError as e:
+                yield line_number, ValueError(f"Invalid JSON: {e}")
+                continue
+            yield line_number, row if isinstance(row, dict) else ValueError("Row must be an object")
+    elif fmt == 'csv':
+        reader = csv.DictReader(stream)
+        for row in reader:
+            yield reader.line_num, row
+    else:
+        raise ValueError(f"Unsupported import format: {fmt!r}")
+
+
+def _text(data, name, label=''):
+    """String value of ``name`` ('' if missing or null) or raise ValueError"""
+    value = data.get(name)
+    if value is None:
+        return ''
+    if not isinstance(value, str):
+        raise ValueError(f"{name}{label} must be a string")
+    return value
+
+
+def _validate_service(data):
+    if not isinstance(data, dict):
+        raise ValueError("services must be objects")
+    name = _text(data, 'service_name').strip()
+    if not name:
+        raise ValueError("service_name is required")
+    label = f" for service {name!r}"
+    price = data.get('price') or 0
+    # bool is an int, and float() would accept any numeric string
+    if isinstance(price, bool) or not isinstance(price, (int, float, str)):
+        raise ValueError(f"Invalid price{label}")
+    try:
+        price = float(price)
+    except ValueError:
+        raise ValueError(f"Invalid price{label}")
+    features = data.get('features') or []
+    if not isinstance(features, list):
+        raise ValueError(f"features{label} must be a list")
+    return {
+        "service_name": name,
+        "category": _text(data, 'category', label),
+        "price": price,
+        "duration": _text(data, 'duration', label),
+        "description": _text(data, 'description', label),
+        "features": json.dumps(features),
+    }
+
+
+def validate_row(row):
+    """Return (vendor values, service values list) or raise ValueError"""
+    try:
+        user_id = int(row.get('user_id'))
+    except (TypeError, ValueError):
+        raise ValueError("user_id must be an integer")
+    business_name = _text(row, 'business_name').strip()
+    if not business_name:
+        raise ValueError("business_name is required")
+
+    # Only the columns the row supplies, so an update leaves the others alone
+    vendor = {name: _text(row, name) for name in VENDOR_FIELDS if row.get(name) is not None}
+    vendor.update(user_id=user_id, business_name=business_name)
+    if row.get('latitude') not in (None, '') or row.get('longitude') not in (None, ''):
+        vendor.update(location_values(*parse_coordinates(row.get('latitude'), row.get('longitude'))))
+    elif 'address' in vendor:
+        vendor.update(location_values(*(geocode(vendor['address']) or (None, None))))
+
+    services = row.get('services') or []
+    if isinstance(services, str):
+        try:
+            services = json.loads(services)
+        except ValueError:
+            raise ValueError("services must be a JSON list")
+    if not isinstance(services, list):
+        raise ValueError("services must be a list")
+    return vendor, [_validate_service(service) for service in services]
+
+
+def _max_variables(connection):
+    """Bind parameters the driver accepts in one statement"""
+    getlimit = getattr(connection.connection.dbapi_connection, 'getlimit', None)
+    if getlimit is not None:
+        return getlimit(sqlite3.SQLITE_LIMIT_VARIABLE_NUMBER)
+    return DEFAULT_MAX_VARIABLES
+
+
+def _batches(items, size):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def _upsert_chunk(rows, now):
+    """Write validated rows in the current transaction.
+
+    Returns ({vendor_id: user_id} for every vendor written, services written).
+    """
+    # Within a chunk later rows for a user_id add to and override earlier ones
+    latest = {}
+    for vendor, services in rows:
+        if vendor['user_id'] in latest:
+            previous, previous_services = latest[vendor['user_id']]
+            vendor = {**previous, **vendor}
+            services = list({service['service_name']: service
+                             for service in previous_services + services}.values())
+        latest[vendor['user_id']] = (vendor, services)
+
+    # The multi-row statements go straight to the driver: with thousands of
+    # bind parameters, SQLAlchemy's statement compilation costs more than
+    # executing them
+    columns = ('user_id', *VENDOR_FIELDS, *LOCATION_COLUMNS, 'is_active', 'rating', 'total_reviews',
+               'created_at', 'updated_at')
+    connection = db.session.connection()
+    dialect = connection.dialect
+    placeholder = '?' if dialect.paramstyle == 'qmark' else '%s'
+    row_sql = '(' + ', '.join([placeholder] * len(columns)) + ')'
+    max_variables = _max_variables(connection)
+    max_rows = max(1, max_variables // len(columns))
+    # The dialect's own DateTime type, so vendor and service stamps are
+    # stored exactly as the ORM stores them
+    to_db = Vendor.__table__.c.created_at.type.dialect_impl(dialect).bind_processor(dialect)
+    stamp = to_db(now) if to_db else now
+    defaults = {**{name: '' for name in VENDOR_FIELDS}, **{name: None for name in LOCATION_COLUMNS},
+                "is_active": True, "rating": 0.0, "total_reviews": 0,
+                "created_at": stamp, "updated_at": stamp}
+
+    # One statement per set of supplied columns, which only updates those
+    by_supplied = {}
+    for vendor, _ in latest.values():
+        supplied = tuple(name for name in (*VENDOR_FIELDS, *LOCATION_COLUMNS) if name in vendor)
+        by_supplied.setdefault(supplied, []).append(vendor)
+    for supplied, vendors in by_supplied.items():
+        updates = ', '.join(f"{column} = excluded.{column}" for column in (*supplied, 'updated_at'))
+        for batch in _batches(vendors, max_rows):
+            params = []
+            for vendor in batch:
+                row = {**defaults, **vendor}
+                params.extend(row[column] for column in columns)
+            connection.exec_driver_sql(
+                f"INSERT INTO vendors ({', '.join(columns)}) VALUES {', '.join([row_sql] * len(batch))} "
+                f"ON CONFLICT (user_id) DO UPDATE SET {updates}",
+                tuple(params),
+            )
+
+    written = {}
+    for user_ids in _batches(list(latest), max_variables):
+        written.update(db.session.execute(
+            db.select(Vendor.id, Vendor.user_id).where(Vendor.user_id.in_(user_ids))
+        ).all())
+    id_by_user = {user_id: vendor_id for vendor_id, user_id in written.items()}
+
+    existing = {}
+    for vendor_ids in _batches(list(written), max_variables):
+        existing.update(
+            ((vendor_id, name), service_id)
+            for service_id, vendor_id, name in db.session.execute(db.text(
+                "SELECT id, vendor_id, service_name FROM services WHERE vendor_id IN :ids"
+            ).bindparams(db.bindparam('ids', expanding=True)), {"ids": vendor_ids})
+        )
+    inserts, updates = [], []
+    for user_id, (_, services) in latest.items():
+        vendor_id = id_by_user[user_id]
+        for service in services:
+            service_id = existing.get((vendor_id, service['service_name']))
+            if service_id is None:
+                inserts.append({**service, "vendor_id": vendor_id,
+                                "created_at": stamp, "updated_at": stamp})
+            else:
+                updates.append({**service, "id": service_id, "updated_at": stamp})
+
+    if inserts:
+        db.session.execute(db.text(
+            "INSERT INTO services (vendor_id, service_name, category, price, duration, "
+            "description, features, views, inquiries, bookings, is_active, created_at, "
+            "updated_at) VALUES (:vendor_id, :service_name, :category, :price, :duration, "
+            ":description, :features, 0, 0, 0, TRUE, :created_at, :updated_at)"
+        ), inserts)
+    if updates:
+        db.session.execute(db.text(
+            "UPDATE services SET category = :category, price = :price, duration = :duration, "
+            "description = :description, features = :features, updated_at = :updated_at "
+            "WHERE id = :id"
+        ), updates)
+
+    index_vendors(list(written))
+    refresh_vendor_stats(list(written))
+    return written, len(inserts) + len(updates)
+
+
+def _write_chunk(chunk, report):
+    """Commit a chunk; if it fails as a whole (or took too long to keep its
+    stamp within the sync lag), retry row by row to isolate bad rows"""
+    try:
+        stamp = datetime.utcnow()
+        written, services = _upsert_chunk([values for _, values in chunk], stamp)
+        commit_stamped(stamp)
+    except (SQLAlchemyError, StampExpired):
+        db.session.rollback()
+        written, services = {}, 0
+        for line_number, values in chunk:
+            try:
+                # Stamped as it is written, not when the chunk was
+                stamp = datetime.utcnow()
+                row_written, row_services = _upsert_chunk([values], stamp)
+                commit_stamped(stamp)
+            except SQLAlchemyError as e:
+                db.session.rollback()
+                report.errors.append((line_number, f"Database error: {getattr(e, 'orig', None) or e}"))
+                continue
+            except StampExpired as e:
+                db.session.rollback()
+                report.errors.append((line_number, str(e)))
+                continue
+            written.update(row_written)
+            services += row_services
+
+    report.vendors += len(written)
+    report.services += services
+    if written:
+        invalidate('catalog', FACETS_TAG,
+                   *(f'vendor:{vendor_id}' for vendor_id in written),
+                   *(f'user:{user_id}' for user_id in written.values()))
+        forget_vendors(written)
+        vendors_changed(list(written))
+
+
+def import_vendors(stream, fmt, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Import vendors (and nested services) from a text stream; returns an ImportReport"""
+    report = ImportReport()
+    chunk = []
+    for line_number, row in iter_rows(stream, fmt):
+        report.rows += 1
+        if isinstance(row, Exception):
+            report.errors.append((line_number, str(row)))
+            continue
+        try:
+            chunk.append((line_number, validate_row(row)))
+        except ValueError as e:
+            report.errors.append((line_number, str(e)))
+            continue
+        if len(chunk) >= chunk_size:
+            _write_chunk(chunk, report)
+            chunk = []
+    if chunk:
+        _write_chunk(chunk, report)
+    return report
+
+
+class _RawStream(io.RawIOBase):
+    """Adapt a file-like object that only has read() (e.g. gunicorn's request
+    body) to what io.BufferedReader expects"""
+
+    def __init__(self, stream):
+        self._stream = stream
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        data = self._stream.read(len(buffer))
+        buffer[:len(data)] = data
+        return len(data)
+
+
+def open_text_stream(binary_stream, encoding='utf-8'):
+    if not hasattr(binary_stream, 'readable'):
+        binary_stream = io.BufferedReader(_RawStream(binary_stream))
+    return io.TextIOWrapper(binary_stream, encoding=encoding, newline='')
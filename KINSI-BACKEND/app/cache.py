@@ -0,0 +1,276 @@
+# app/cache.py
+"""Response cache for read endpoints, with strong ETags.
+
+Cached views declare the tags their output depends on, e.g. ``vendor:{vendor_id}``.
+Every tag has a version number that is part of the cache key, so write
+handlers invalidate by bumping versions after commit (``invalidate``)
+instead of hunting down keys. A reader that raced a writer stores its
+entry under the old versions, where nobody will look for it again. A
+reader served by a read replica (app/replicas.py) that may not have the
+last invalidated write yet does not store its entry at all.
+
+Two backends are provided: an in-process LRU (default, per worker) and an
+SQLite-file backend that stands in for shared storage so several gunicorn
+workers see each other's entries. Both share version bumps between the
+processes of a host, gunicorn workers and ``flask jobs work`` alike: the
+LRU keeps its tag versions in a memory-mapped stamp file (app/stamps.py,
+one slot per tag checksum), the SQLite backend in its file.
+"""
+import hashlib
+import os
+import pickle
+import sqlite3
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from functools import wraps
+
+from flask import current_app, make_response, request
+
+from app.compression import get_compressor
+from app.engine import replica_snapshot
+from app.stamps import VersionStamps, default_stamp_path
+
+
+@dataclass
+class CachedResponse:
+    body: bytes
+    mimetype: str
+    etag: str
+    headers: list
+    # Compressed copies of body by content coding, filled in as clients ask
+    encoded: dict = field(default_factory=dict)
+
+    def __setstate__(self, state):
+        # Entries pickled before compression existed have no encoded bodies
+        self.__dict__.update({'encoded': {}, **state})
+
+
+class MemoryCacheBackend:
+    """Bounded in-process LRU; tag versions live in stamps shared by the host's processes"""
+
+    # Whether calls do I/O (the ASGI app runs those off the event loop)
+    blocking = False
+
+    def __init__(self, stamps, max_entries=1024):
+        self.stamps = stamps
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def set(self, key, entry):
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def get_versions(self, tags):
+        return [self.stamps.version(_tag_slot(tag)) for tag in tags]
+
+    def bump(self, tags):
+        self.stamps.bump([_tag_slot(tag) for tag in tags])
+
+    def bumped_at(self):
+        return self.stamps.bumped_at()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+def _tag_slot(tag):
+    # Stable across processes, unlike hash()
+    return zlib.crc32(tag.encode())
+
+
+class SQLiteCacheBackend:
+    """Cache in a local SQLite file, shared by every process that opens it"""
+
+    blocking = True
+
+    def __init__(self, path, max_entries=10000):
+        self.path = path
+        self.max_entries = max_entries
+        self._local = threading.local()
+        self._writes = 0
+
+    def _connect(self):
+        # Connections are opened on first use, per thread and per process, so
+        # nothing is opened at start-up or shared with forked workers
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=OFF")
+            conn.execute("CREATE TABLE IF NOT EXISTS cache_entries ("
+                         "key TEXT PRIMARY KEY, value BLOB, used_at INTEGER)")
+            conn.execute("CREATE INDEX IF NOT EXISTS ix_cache_entries_used_at "
+                         "ON cache_entries (used_at)")
+            conn.execute("CREATE TABLE IF NOT EXISTS cache_versions ("
+                         "tag TEXT PRIMARY KEY, version INTEGER NOT NULL)")
+            conn.execute("CREATE TABLE IF NOT EXISTS cache_meta ("
+                         "name TEXT PRIMARY KEY, value REAL NOT NULL)")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def get(self, key):
+        conn = self._connect()
+        row = conn.execute("SELECT value FROM cache_entries WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        conn.execute("UPDATE cache_entries SET used_at = strftime('%s','now') WHERE key = ?", (key,))
+        return pickle.loads(row[0])
+
+    def set(self, key, entry):
+        conn = self._connect()
+        conn.execute("INSERT OR REPLACE INTO cache_entries (key, value, used_at) "
+                     "VALUES (?, ?, strftime('%s','now'))", (key, pickle.dumps(entry)))
+        self._writes += 1
+        if self._writes % 100 == 0:
+            conn.execute("DELETE FROM cache_entries WHERE key IN (SELECT key FROM cache_entries "
+                         "ORDER BY used_at DESC LIMIT -1 OFFSET ?)", (self.max_entries,))
+
+    def get_versions(self, tags):
+        conn = self._connect()
+        placeholders = ','.join('?' * len(tags))
+        rows = dict(conn.execute(
+            f"SELECT tag, version FROM cache_versions WHERE tag IN ({placeholders})", tags))
+        return [rows.get(tag, 0) for tag in tags]
+
+    def bump(self, tags):
+        conn = self._connect()
+        conn.executemany("INSERT INTO cache_versions (tag, version) VALUES (?, 1) "
+                         "ON CONFLICT(tag) DO UPDATE SET version = version + 1",
+                         [(tag,) for tag in tags])
+        conn.execute("INSERT OR REPLACE INTO cache_meta (name, value) VALUES ('bumped_at', ?)",
+                     (time.time(),))
+
+    def bumped_at(self):
+        row = self._connect().execute("SELECT value FROM cache_meta WHERE name = 'bumped_at'").fetchone()
+        return row[0] if row is not None else 0.0
+
+    def clear(self):
+        conn = self._connect()
+        conn.execute("DELETE FROM cache_entries")
+        conn.execute("DELETE FROM cache_versions")
+
+
+def init_cache(app):
+    """Attach the configured backend to the app"""
+    backend = app.config.get('RESPONSE_CACHE_BACKEND', 'memory')
+    if backend == 'memory':
+        path = app.config.get('RESPONSE_CACHE_STAMP_PATH') or \
+            default_stamp_path(app.config['SQLALCHEMY_DATABASE_URI'], 'cache-stamps')
+        stamps = VersionStamps(path, app.config.get('RESPONSE_CACHE_STAMP_SLOTS', 65536))
+        cache = MemoryCacheBackend(stamps, app.config.get('RESPONSE_CACHE_MAX_ENTRIES', 1024))
+    elif backend == 'sqlite':
+        cache = SQLiteCacheBackend(app.config['RESPONSE_CACHE_PATH'],
+                                   app.config.get('RESPONSE_CACHE_MAX_ENTRIES', 10000))
+    elif backend is None:
+        cache = None
+    else:
+        raise ValueError(f"Unknown RESPONSE_CACHE_BACKEND: {backend!r}")
+    app.extensions['response_cache'] = cache
+
+
+def get_cache():
+    return current_app.extensions.get('response_cache')
+
+
+def invalidate(*tags):
+    """Bump tag versions; call after the write has been committed"""
+    cache = get_cache()
+    if cache is not None and tags:
+        cache.bump(list(tags))
+
+
+def lookup_cached(tag_templates, view_args):
+    """Return (cache, key, entry) for the current request; entry is None on a miss.
+
+    Returns None when no cache backend is configured.
+    """
+    cache = get_cache()
+    if cache is None:
+        return None
+    tags = [template.format(**view_args) for template in tag_templates]
+    # Read versions before the view queries the DB (see module docstring)
+    versions = cache.get_versions(tags)
+    key = '|'.join([
+        request.endpoint,
+        repr(sorted(view_args.items())),
+        repr(sorted(request.args.items(multi=True))),
+        *(f'{tag}@{version}' for tag, version in zip(tags, versions)),
+    ])
+    return cache, key, cache.get(key)
+
+
+def respond_cached(cache, key, entry, response=None):
+    """Store the view's ``response`` on a miss or rebuild it from ``entry``,
+    compress it as negotiated, then answer If-None-Match"""
+    if entry is None:
+        if response.status_code != 200 or response.is_streamed:
+            return response
+        snapshot = replica_snapshot()
+        if snapshot is not None and snapshot < cache.bumped_at():
+            return response
+        body = response.get_data()
+        entry = CachedResponse(
+            body=body,
+            mimetype=response.mimetype,
+            etag=hashlib.sha1(body).hexdigest(),
+            headers=[(name, value) for name, value in response.headers
+                     if name not in ('Content-Type', 'Content-Length')],
+        )
+        cache.set(key, entry)
+    else:
+        response = current_app.response_class(
+            entry.body, mimetype=entry.mimetype, headers=entry.headers)
+
+    etag = entry.etag
+    compressor = get_compressor()
+    if compressor is not None and compressor.applies(response, len(entry.body)):
+        response.vary.add('Accept-Encoding')
+        encoding = compressor.negotiate()
+        if encoding is not None:
+            body = entry.encoded.get(encoding)
+            if body is None:
+                body = entry.encoded[encoding] = compressor.compress(encoding, entry.body)
+                cache.set(key, entry)
+            response.set_data(body)
+            response.headers['Content-Encoding'] = encoding
+            etag = f'{etag}-{encoding}'
+
+    response.set_etag(etag)
+    return response.make_conditional(request)
+
+
+def cached_response(*tag_templates):
+    """Cache a GET view's 200 responses and answer If-None-Match with 304.
+
+    Tag templates are formatted with the view arguments, e.g.
+    ``@cached_response('vendor:{vendor_id}')``.
+    """
+    def decorator(view):
+        view._cache_tags = tag_templates
+
+        @wraps(view)
+        def wrapper(**view_args):
+            cached = lookup_cached(tag_templates, view_args)
+            if cached is None:
+                return view(**view_args)
+            cache, key, entry = cached
+            response = make_response(view(**view_args)) if entry is None else None
+            return respond_cached(cache, key, entry, response)
+        return wrapper
+    return decorator
@@ -0,0 +1,102 @@
+# app/compression.py
+"""Negotiated compression of JSON responses.
+
+A 200 response whose mimetype is in COMPRESSION_MIMETYPES and whose body
+is at least COMPRESSION_MIN_SIZE bytes is encoded with the best coding
+the client's Accept-Encoding allows: brotli or zstd when those packages
+are installed, otherwise gzip. Ties in quality go to the first entry of
+COMPRESSION_ENCODINGS. Streamed responses (the NDJSON export) are sent
+as they are.
+
+Responses from the response cache are encoded in app/cache.py instead:
+the encoded body is kept in the cache entry next to the identity body,
+so a repeat hit costs neither serialization nor compression. Each
+encoding gets its own strong ETag (``<etag>-<coding>``), as RFC 9110
+requires for different representations.
+"""
+import gzip
+
+from flask import current_app, request
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+def _gzip(body, level):
+    # mtime=0 keeps the output, and so the ETag, the same for the same body
+    return gzip.compress(body, compresslevel=level, mtime=0)
+
+
+def _brotli(body, level):
+    return brotli.compress(body, quality=level)
+
+
+def _zstd(body, level):
+    return zstandard.ZstdCompressor(level=level).compress(body)
+
+
+ENCODERS = {'gzip': _gzip}
+if brotli is not None:
+    ENCODERS['br'] = _brotli
+if zstandard is not None:
+    ENCODERS['zstd'] = _zstd
+
+
+class Compressor:
+    def __init__(self, encodings, levels=None, min_size=1024, mimetypes=('application/json',)):
+        # Configured codings whose package is missing are dropped
+        self.encodings = [name for name in encodings if name in ENCODERS]
+        self.levels = levels or {}
+        self.min_size = min_size
+        self.mimetypes = frozenset(mimetypes)
+
+    def applies(self, response, size):
+        """Whether a response with a body of ``size`` bytes is sent compressed to
+        clients that accept it (and so varies on Accept-Encoding)"""
+        return (response.status_code == 200
+                and size >= self.min_size
+                and response.mimetype in self.mimetypes
+                and 'Content-Encoding' not in response.headers)
+
+    def negotiate(self):
+        """The coding the current request accepts best, or None for identity"""
+        return request.accept_encodings.best_match(self.encodings)
+
+    def compress(self, encoding, body):
+        return ENCODERS[encoding](body, self.levels.get(encoding, 6))
+
+
+def get_compressor():
+    return current_app.extensions.get('compression')
+
+
+def _after_request(response):
+    compressor = current_app.extensions['compression']
+    if response.is_streamed or not compressor.applies(response, response.calculate_content_length() or 0):
+        return response
+    response.vary.add('Accept-Encoding')
+    encoding = compressor.negotiate()
+    if encoding is not None:
+        response.set_data(compressor.compress(encoding, response.get_data()))
+        response.headers['Content-Encoding'] = encoding
+    return response
+
+
+def init_compression(app):
+    """Compress eligible responses (after init_metrics, so metrics count compressed sizes)"""
+    if not app.config.get('COMPRESSION_ENABLED'):
+        return
+    app.extensions['compression'] = Compressor(
+        app.config.get('COMPRESSION_ENCODINGS', ('br', 'zstd', 'gzip')),
+        levels=app.config.get('COMPRESSION_LEVELS'),
+        min_size=app.config.get('COMPRESSION_MIN_SIZE', 1024),
+        mimetypes=app.config.get('COMPRESSION_MIMETYPES', ('application/json',)),
+    )
+    app.after_request(_after_request)
@@ -1,4 +1,5 @@
 # app/config.py
+import json
 import os
 basedir = os.path.abspath(os.path.dirname(__file__))
 
@@ -11,5 +12,127 @@ class Config:
     
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     
+    # Engine profile: 'production' (pool, pragmas, read pool) or 'default' (see app/engine.py)
+    DB_ENGINE_PROFILE = os.environ.get('DB_ENGINE_PROFILE', 'production')
+    DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', 5))
+    DB_MAX_OVERFLOW = int(os.environ.get('DB_MAX_OVERFLOW', 10))
+    DB_POOL_TIMEOUT = int(os.environ.get('DB_POOL_TIMEOUT', 30))
+    DB_POOL_RECYCLE = int(os.environ.get('DB_POOL_RECYCLE', 3600))
+    DB_POOL_PRE_PING = True
+    DB_READ_POOL = os.environ.get('DB_READ_POOL', '1') == '1'
+    DB_READ_POOL_SIZE = int(os.environ.get('DB_READ_POOL_SIZE', 10))
+    # Read replicas (app/replicas.py), comma-separated; 'production' profile only.
+    # Sticky = how long a client reads from the primary after a write (0 = lag + check)
+    DB_REPLICA_URLS = tuple(url for url in os.environ.get('DATABASE_REPLICA_URLS', '').split(',') if url)
+    DB_REPLICA_MAX_LAG_SECONDS = float(os.environ.get('DB_REPLICA_MAX_LAG_SECONDS', 5.0))
+    DB_REPLICA_CHECK_INTERVAL = float(os.environ.get('DB_REPLICA_CHECK_INTERVAL', 1.0))
+    DB_REPLICA_STICKY_SECONDS = float(os.environ.get('DB_REPLICA_STICKY_SECONDS', 0))
+    SQLITE_BEGIN_IMMEDIATE = True
+    # Connections of the aiosqlite read engine used by the ASGI app (app/asgi.py)
+    ASYNC_DB_POOL_SIZE = int(os.environ.get('ASYNC_DB_POOL_SIZE', 10))
+    SQLITE_PRAGMAS = {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'busy_timeout': int(os.environ.get('SQLITE_BUSY_TIMEOUT_MS', 5000)),
+        'mmap_size': 256 * 1024 * 1024,
+        'cache_size': -64 * 1024,  # negative = KiB, i.e. 64 MiB
+        'temp_store': 'MEMORY',
+    }
+    
     # CORS settings
-    CORS_ORIGINS = ["http://localhost:5173", "http://127.0.0.1:5000"]
\ No newline at end of file
+    CORS_ORIGINS = ["http://localhost:5173", "http://127.0.0.1:5000"]
+    
+    # Response cache: 'memory' (per-process LRU), 'sqlite' (file shared by workers) or 'none'
+    RESPONSE_CACHE_BACKEND = os.environ.get('RESPONSE_CACHE_BACKEND', 'memory')
+    if RESPONSE_CACHE_BACKEND == 'none':
+        RESPONSE_CACHE_BACKEND = None
+    RESPONSE_CACHE_MAX_ENTRIES = int(os.environ.get('RESPONSE_CACHE_MAX_ENTRIES', 1024))
+    RESPONSE_CACHE_PATH = os.environ.get('RESPONSE_CACHE_PATH') or \
+        os.path.join(basedir, '..', 'response_cache.db')
+    # Tag versions of the 'memory' backend, shared by the host's processes; the
+    # stamp file defaults to one per database in the temp dir
+    RESPONSE_CACHE_STAMP_PATH = os.environ.get('RESPONSE_CACHE_STAMP_PATH')
+    RESPONSE_CACHE_STAMP_SLOTS = int(os.environ.get('RESPONSE_CACHE_STAMP_SLOTS', 65536))
+    
+    # Write-behind service counters (seconds between flushes, 0 = write-through)
+    COUNTER_FLUSH_INTERVAL = float(os.environ.get('COUNTER_FLUSH_INTERVAL', 2.0))
+    COUNTER_MAX_BUFFER = int(os.environ.get('COUNTER_MAX_BUFFER', 1000))
+    
+    # Per-worker vendor identity cache (app/vendor_cache.py); workers on one host
+    # share the stamp file, which defaults to one per database in the temp dir
+    VENDOR_CACHE_ENABLED = os.environ.get('VENDOR_CACHE_ENABLED', '1') == '1'
+    VENDOR_CACHE_MAX_ENTRIES = int(os.environ.get('VENDOR_CACHE_MAX_ENTRIES', 10000))
+    VENDOR_CACHE_TTL = float(os.environ.get('VENDOR_CACHE_TTL', 300.0))
+    VENDOR_CACHE_STAMP_PATH = os.environ.get('VENDOR_CACHE_STAMP_PATH')
+    VENDOR_CACHE_STAMP_SLOTS = int(os.environ.get('VENDOR_CACHE_STAMP_SLOTS', 4096))
+    
+    # Delta sync (app/sync.py): rows younger than the lag are held back for the
+    # next call; tombstones, and tokens older than them, expire after the retention
+    SYNC_LAG_SECONDS = float(os.environ.get('SYNC_LAG_SECONDS', 2.0))
+    SYNC_TOMBSTONE_RETENTION_DAYS = float(os.environ.get('SYNC_TOMBSTONE_RETENTION_DAYS', 30))
+    
+    # In-memory leaderboards (entries per board, seconds between full recomputes, 0 = never)
+    LEADERBOARD_SIZE = int(os.environ.get('LEADERBOARD_SIZE', 20))
+    LEADERBOARD_REFRESH_INTERVAL = float(os.environ.get('LEADERBOARD_REFRESH_INTERVAL', 300.0))
+    
+    # Admission control (app/admission.py), off unless ADMISSION_ENABLED=1. Rates
+    # are requests per second per worker: by default 20/s (bursts of 40) per
+    # client, exports and imports far less; ADMISSION_LIMITS_JSON entries replace
+    # the defaults key by key. Clients are told apart by remote address, so
+    # behind a reverse proxy set ADMISSION_CLIENT_HEADER or they share one bucket
+    ADMISSION_ENABLED = os.environ.get('ADMISSION_ENABLED', '0') == '1'
+    ADMISSION_LIMITS = {
+        'default': {'client_rate': 20, 'client_burst': 40},
+        'vendor_bp.get_all_vendors': {'priority': 'low'},
+        'vendor_bp.vendor_changes': {'priority': 'low'},
+        'vendor_bp.export_vendors': {'priority': 'low', 'client_rate': 0.1, 'client_burst': 2,
+                                     'route_rate': 1, 'route_burst': 4},
+        'vendor_bp.bulk_import_vendors': {'priority': 'low', 'client_rate': 0.1, 'client_burst': 2,
+                                          'route_rate': 0.5, 'route_burst': 2},
+        **json.loads(os.environ.get('ADMISSION_LIMITS_JSON') or '{}'),
+    }
+    ADMISSION_MAX_IN_FLIGHT = int(os.environ.get('ADMISSION_MAX_IN_FLIGHT', 32))
+    ADMISSION_PRIORITY_SHARES = {'high': 1.0, 'normal': 0.75, 'low': 0.5}
+    ADMISSION_MAX_QUEUE_WAIT_MS = float(os.environ.get('ADMISSION_MAX_QUEUE_WAIT_MS', 0))  # 0 = off
+    ADMISSION_RETRY_AFTER = int(os.environ.get('ADMISSION_RETRY_AFTER', 1))
+    # e.g. X-Forwarded-For, only behind a proxy that sets it
+    ADMISSION_CLIENT_HEADER = os.environ.get('ADMISSION_CLIENT_HEADER')
+    ADMISSION_MAX_CLIENTS = int(os.environ.get('ADMISSION_MAX_CLIENTS', 10000))
+    ADMISSION_EXEMPT = ('static', 'metrics')
+    
+    # Negotiated compression of JSON bodies of at least COMPRESSION_MIN_SIZE bytes
+    # (app/compression.py); br and zstd are used when brotli/zstandard are installed
+    COMPRESSION_ENABLED = os.environ.get('COMPRESSION_ENABLED', '1') == '1'
+    COMPRESSION_MIN_SIZE = int(os.environ.get('COMPRESSION_MIN_SIZE', 1024))
+    COMPRESSION_ENCODINGS = ('br', 'zstd', 'gzip')  # preference order on equal q
+    COMPRESSION_LEVELS = {'br': 5, 'zstd': 3, 'gzip': 6}
+    COMPRESSION_MIMETYPES = ('application/json',)
+    
+    # Background jobs (app/jobs.py, run by `flask jobs work`). JOB_CONCURRENCY_JSON
+    # caps running jobs per type, e.g. {"import_vendors": 2}, over the handlers' own
+    JOB_WORKER_THREADS = int(os.environ.get('JOB_WORKER_THREADS', 4))
+    JOB_POLL_INTERVAL = float(os.environ.get('JOB_POLL_INTERVAL', 1.0))
+    JOB_LEASE_SECONDS = float(os.environ.get('JOB_LEASE_SECONDS', 60))
+    JOB_MAX_ATTEMPTS = int(os.environ.get('JOB_MAX_ATTEMPTS', 5))
+    JOB_BACKOFF_SECONDS = float(os.environ.get('JOB_BACKOFF_SECONDS', 5))
+    JOB_BACKOFF_MAX_SECONDS = float(os.environ.get('JOB_BACKOFF_MAX_SECONDS', 600))
+    JOB_CONCURRENCY = json.loads(os.environ.get('JOB_CONCURRENCY_JSON') or '{}')
+    JOB_RETENTION_DAYS = float(os.environ.get('JOB_RETENTION_DAYS', 7))
+    # Uploads waiting for their job, e.g. bodies of asynchronous imports
+    JOB_DATA_DIR = os.environ.get('JOB_DATA_DIR') or os.path.join(basedir, '..', 'job_data')
+    
+    # Encode JSON responses with orjson when it is installed
+    FAST_JSON = os.environ.get('FAST_JSON', '1') == '1'
+    
+    # Request metrics at /metrics; with several workers set METRICS_DIR to a
+    # directory they share so the endpoint reports totals for all of them
+    METRICS_ENABLED = os.environ.get('METRICS_ENABLED', '1') == '1'
+    METRICS_DIR = os.environ.get('METRICS_DIR')
+    METRICS_FLUSH_INTERVAL = float(os.environ.get('METRICS_FLUSH_INTERVAL', 5.0))
+    
+    # Development/staging query debugging (app/query_debug.py); strict mode
+    # raises on budget overruns and N+1 patterns instead of logging them
+    QUERY_DEBUG = os.environ.get('QUERY_DEBUG', '0') == '1'
+    QUERY_SLOW_MS = float(os.environ.get('QUERY_SLOW_MS', 100))
+    QUERY_REPEAT_THRESHOLD = int(os.environ.get('QUERY_REPEAT_THRESHOLD', 5))
+    QUERY_BUDGET_STRICT = os.environ.get('QUERY_BUDGET_STRICT', '0') == '1'
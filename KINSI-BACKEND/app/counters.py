@@ -0,0 +1,155 @@
+# app/counters.py
+"""Write-behind buffer for the Service views / inquiries / bookings counters.
+
+Increments are summed in memory per service and written by a background
+thread as one batched ``UPDATE services SET views = views + ?`` inside a
+single transaction, so page views never queue on SQLite's writer lock.
+The same transaction adds the deltas to each vendor's vendor_stats row.
+A flush is triggered every COUNTER_FLUSH_INTERVAL seconds and at
+shutdown. The request that brings the buffer to COUNTER_MAX_BUFFER
+services flushes it itself (waiting for a flush already in progress), so
+the buffer cannot outgrow the limit while the thread is behind.
+Setting COUNTER_FLUSH_INTERVAL to 0 writes every increment immediately.
+"""
+import atexit
+import logging
+import threading
+
+from flask import current_app
+from app import db
+from app.cache import invalidate
+from app.stats import apply_stats_deltas
+from app.leaderboards import vendors_changed
+
+logger = logging.getLogger(__name__)
+
+COUNTER_FIELDS = ('views', 'inquiries', 'bookings')
+
+
+class CounterBuffer:
+    def __init__(self, app, flush_interval=2.0, max_buffer=1000):
+        self.app = app
+        self.flush_interval = flush_interval
+        self.max_buffer = max_buffer
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopping = False
+        self._thread = None
+
+    def add(self, service_id, views=0, inquiries=0, bookings=0):
+        """Queue increments for one service"""
+        with self._lock:
+            totals = self._pending.setdefault(service_id, [0, 0, 0])
+            totals[0] += views
+            totals[1] += inquiries
+            totals[2] += bookings
+            full = len(self._pending) >= self.max_buffer
+
+        if self.flush_interval <= 0 or full:
+            self.flush()
+            return
+        self._ensure_thread()
+
+    def pending(self):
+        with self._lock:
+            return len(self._pending)
+
+    def flush(self):
+        """Write all pending increments in one transaction; returns rows updated"""
+        with self._flush_lock:
+            with self._lock:
+                batch, self._pending = self._pending, {}
+            if not batch:
+                return 0
+
+            params = [
+                {"id": service_id, "views": v, "inquiries": i, "bookings": b}
+                for service_id, (v, i, b) in batch.items()
+            ]
+            with self.app.app_context():
+                try:
+                    db.session.execute(db.text(
+                        "UPDATE services SET views = COALESCE(views, 0) + :views, "
+                        "inquiries = COALESCE(inquiries, 0) + :inquiries, "
+                        "bookings = COALESCE(bookings, 0) + :bookings WHERE id = :id"
+                    ), params)
+                    deltas = self._apply_vendor_deltas(batch)
+                    db.session.commit()
+                except Exception:
+                    db.session.rollback()
+                    logger.exception("Counter flush failed, keeping %d services queued", len(batch))
+                    self._requeue(batch)
+                    return 0
+                finally:
+                    db.session.remove()
+
+                invalidate(*(f'vendor:{vendor_id}' for vendor_id in deltas), 'catalog')
+                vendors_changed([vendor_id for vendor_id, (_, _, bookings) in deltas.items()
+                                 if bookings])
+            return len(params)
+
+    def _apply_vendor_deltas(self, batch):
+        """Roll the batch up into vendor_stats; returns {vendor id: [views, inquiries, bookings]}"""
+        owners = db.session.execute(db.text(
+            "SELECT id, vendor_id FROM services WHERE id IN :ids"
+        ).bindparams(db.bindparam('ids', expanding=True)), {"ids": list(batch)}).all()
+
+        deltas = {}
+        for service_id, vendor_id in owners:
+            totals = deltas.setdefault(vendor_id, [0, 0, 0])
+            for n, value in enumerate(batch[service_id]):
+                totals[n] += value
+        apply_stats_deltas([
+            {"vendor_id": vendor_id, "total_services": 0, "total_views": v,
+             "total_inquiries": i, "total_bookings": b}
+            for vendor_id, (v, i, b) in deltas.items()
+        ])
+        return deltas
+
+    def _requeue(self, batch):
+        with self._lock:
+            for service_id, increments in batch.items():
+                totals = self._pending.setdefault(service_id, [0, 0, 0])
+                for n, value in enumerate(increments):
+                    totals[n] += value
+
+    def _ensure_thread(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            # Started lazily so a preloading parent never forks with a live thread
+            self._thread = threading.Thread(
+                target=self._run, name='counter-flush', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while not self._stopping:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            self.flush()
+
+    def stop(self):
+        """Stop the flush thread and write whatever is still buffered"""
+        self._stopping = True
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join(timeout=10)
+        self.flush()
+
+
+def init_counters(app):
+    buffer = CounterBuffer(
+        app,
+        flush_interval=app.config.get('COUNTER_FLUSH_INTERVAL', 2.0),
+        max_buffer=app.config.get('COUNTER_MAX_BUFFER', 1000),
+    )
+    app.extensions['counter_buffer'] = buffer
+    atexit.register(buffer.stop)
+
+
+def get_counter_buffer():
+    return current_app.extensions['counter_buffer']
@@ -0,0 +1,212 @@
+# app/engine.py
+"""Database engine profile.
+
+With DB_ENGINE_PROFILE = 'production' (the default), create_app:
+
+* sizes the connection pool and turns on pre-ping,
+* applies SQLITE_PRAGMAS (WAL, synchronous=NORMAL, busy_timeout, mmap and
+  cache size) on every new SQLite connection,
+* starts the transactions of write requests (POST, PUT, ...) with BEGIN
+  IMMEDIATE, so a writer waits on busy_timeout up front instead of failing
+  with "database is locked" when it upgrades a read lock. Everything else
+  (threads, commands, job polling, GET requests on the primary) starts
+  with a plain BEGIN and only takes the write lock if it writes; code
+  there that reads and then writes in one transaction calls
+  ``begin_write(session)`` first,
+* adds a separate, query_only connection pool (the ``readonly`` bind) that
+  RoutingSession uses for GET/HEAD requests, so reads never queue behind
+  writers for a pool slot,
+* adds a query_only bind per DB_REPLICA_URLS entry (``replica-0``, ...);
+  when the app has replicas (app/replicas.py), a read request is routed
+  to one of them instead, or to the ``readonly`` bind when none is fit or
+  the request must see the primary.
+
+'default' leaves SQLAlchemy's own engine settings untouched.
+"""
+from flask import current_app, g, has_request_context, request
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import InterfaceError, OperationalError
+
+READ_BIND_KEY = 'readonly'
+REPLICA_BIND_PREFIX = 'replica-'
+READ_METHODS = frozenset(['GET', 'HEAD', 'OPTIONS'])
+# Connection execution option: True/False forces how its transaction begins
+BEGIN_IMMEDIATE_OPTION = 'sqlite_begin_immediate'
+
+
+class RoutingSession(Session):
+    """Session that sends statements issued while serving a read-only
+    request to the read pool or a replica; flushes, and reads after them,
+    always go to the primary"""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and not self._flushing and not self.info.get('flushed') \
+                and _is_read_request():
+            engine = self._db.engines.get(_read_bind_key())
+            if engine is not None:
+                return engine
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+    def execute(self, *args, **kwargs):
+        return self._read_with_fallback(super().execute, args, kwargs)
+
+    def scalars(self, *args, **kwargs):
+        return self._read_with_fallback(super().scalars, args, kwargs)
+
+    def scalar(self, *args, **kwargs):
+        return self._read_with_fallback(super().scalar, args, kwargs)
+
+    def _read_with_fallback(self, method, args, kwargs):
+        """Run a statement; if it failed on a replica's connection, run it
+        once more on the primary's read pool for the rest of the request"""
+        try:
+            return method(*args, **kwargs)
+        except (OperationalError, InterfaceError):
+            if self.info.get('flushed') or not _is_read_request() \
+                    or not is_replica_bind(g.get('_read_bind')):
+                raise
+            # The replica is out of rotation already (app/replicas.py)
+            self.rollback()
+            use_primary()
+            return method(*args, **kwargs)
+
+
+@event.listens_for(RoutingSession, 'after_flush')
+def _after_flush(session, flush_context):
+    # Read your own uncommitted writes
+    session.info['flushed'] = True
+
+
+def _is_read_request():
+    return has_request_context() and request.method in READ_METHODS
+
+
+def _read_bind_key():
+    """The bind this request reads from, chosen on its first read"""
+    key = g.get('_read_bind')
+    if key is None:
+        replicas = current_app.extensions.get('replicas')
+        key, g._read_snapshot = replicas.route() if replicas is not None else (READ_BIND_KEY, None)
+        g._read_bind = key
+    return key
+
+
+def use_primary():
+    """Send the remaining reads of this request to the primary, not a replica"""
+    if has_request_context():
+        g._read_bind, g._read_snapshot = READ_BIND_KEY, None
+
+
+def replica_snapshot():
+    """Wall-clock time the replica this request read from is known to be
+    current up to, or None when it read from the primary. Anything derived
+    from those reads must not be cached past a write made after that time."""
+    return g.get('_read_snapshot') if has_request_context() else None
+
+
+def begin_write(session):
+    """Start the session's transaction on the primary with BEGIN IMMEDIATE.
+
+    Call before the first statement of a transaction that reads and then
+    writes outside a write request.
+    """
+    session.connection(execution_options={BEGIN_IMMEDIATE_OPTION: True})
+
+
+def _begins_immediate(connection):
+    immediate = connection.get_execution_options().get(BEGIN_IMMEDIATE_OPTION)
+    if immediate is not None:
+        return immediate
+    return has_request_context() and request.method not in READ_METHODS
+
+
+def _is_file_sqlite(uri):
+    url = make_url(uri)
+    return url.get_backend_name() == 'sqlite' and url.database not in (None, '', ':memory:')
+
+
+def configure_engine_options(app):
+    """Fill in pool options and the read bind; call before db.init_app"""
+    config = app.config
+    if config.get('DB_ENGINE_PROFILE') != 'production':
+        return
+
+    uri = config['SQLALCHEMY_DATABASE_URI']
+    url = make_url(uri)
+    if url.get_backend_name() == 'sqlite' and not _is_file_sqlite(uri):
+        # In-memory SQLite runs on a single shared connection
+        return
+
+    pool_options = {
+        'pool_size': config['DB_POOL_SIZE'],
+        'max_overflow': config['DB_MAX_OVERFLOW'],
+        'pool_timeout': config['DB_POOL_TIMEOUT'],
+        'pool_recycle': config['DB_POOL_RECYCLE'],
+        'pool_pre_ping': config['DB_POOL_PRE_PING'],
+    }
+    engine_options = config.setdefault('SQLALCHEMY_ENGINE_OPTIONS', {})
+    for key, value in pool_options.items():
+        engine_options.setdefault(key, value)
+
+    binds = config.setdefault('SQLALCHEMY_BINDS', {})
+    if config.get('DB_READ_POOL'):
+        binds.setdefault(READ_BIND_KEY, {
+            **pool_options,
+            'url': uri,
+            'pool_size': config['DB_READ_POOL_SIZE'],
+        })
+    for index, replica_uri in enumerate(config.get('DB_REPLICA_URLS') or ()):
+        binds.setdefault(f'{REPLICA_BIND_PREFIX}{index}', {
+            **pool_options,
+            'url': replica_uri,
+            'pool_size': config['DB_READ_POOL_SIZE'],
+        })
+
+
+def _sqlite_connect_listener(pragmas, read_only, begin_immediate):
+    def on_connect(dbapi_connection, connection_record):
+        # Let the "begin" listener below decide how transactions start
+        dbapi_connection.isolation_level = None
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            if read_only and name == 'journal_mode':
+                continue
+            cursor.execute(f"PRAGMA {name}={value}")
+        if read_only:
+            cursor.execute("PRAGMA query_only=ON")
+        cursor.close()
+
+    def on_begin(connection):
+        if begin_immediate and not read_only and _begins_immediate(connection):
+            connection.exec_driver_sql("BEGIN IMMEDIATE")
+        else:
+            connection.exec_driver_sql("BEGIN")
+
+    return on_connect, on_begin
+
+
+def install_engine_hooks(app, db):
+    """Apply per-connection SQLite settings; call after db.init_app"""
+    if app.config.get('DB_ENGINE_PROFILE') != 'production':
+        return
+    with app.app_context():
+        engines = dict(db.engines)
+
+    for key, engine in engines.items():
+        if engine.dialect.name == 'sqlite':
+            install_sqlite_hooks(engine, app.config['SQLITE_PRAGMAS'],
+                                 read_only=key == READ_BIND_KEY or is_replica_bind(key),
+                                 begin_immediate=app.config['SQLITE_BEGIN_IMMEDIATE'])
+
+
+def is_replica_bind(key):
+    return key is not None and key.startswith(REPLICA_BIND_PREFIX)
+
+
+def install_sqlite_hooks(engine, pragmas, read_only=False, begin_immediate=True):
+    """Apply pragmas on connect and take over transaction start on one engine"""
+    on_connect, on_begin = _sqlite_connect_listener(pragmas, read_only, begin_immediate)
+    event.listen(engine, 'connect', on_connect)
+    event.listen(engine, 'begin', on_begin)
@@ -0,0 +1,104 @@
+# app/facets.py
+"""Facet counts for browsing and filtering vendors.
+
+One statement (four GROUP BY aggregates glued with UNION ALL) counts the
+active vendors matching the same ``q`` / ``category`` filters as search:
+
+* service_types: vendors per Vendor.service_type
+* categories: vendors with an active service in each Service.category
+* price_ranges: vendors with an active service priced in each PRICE_BUCKETS range
+* ratings: vendors per RATING_BANDS band, plus ``unrated``
+
+Every count is a number of vendors, i.e. how many results choosing that
+value would give. The vendor-side aggregates are answered from covering
+indexes; the service-side ones read every active service, so the
+endpoint is cached under the ``facets`` tag, which the vendor, service and
+import write paths bump. Counter flushes do not, as views and bookings
+are not faceted.
+"""
+from app import db
+from app.search import CATEGORY_FILTER, SEARCH_TABLE, build_match_query
+
+FACETS_TAG = 'facets'
+
+# Upper bounds (exclusive) of the price ranges, in KSh; the last range is open
+PRICE_BUCKETS = (500, 1000, 2500, 5000, 10000)
+
+# (lowest rating, label), best band first; rating 0 means no reviews yet
+RATING_BANDS = ((4.5, '4.5+'), (4.0, '4.0-4.5'), (3.0, '3.0-4.0'), (0.0, 'under 3.0'))
+UNRATED = 'unrated'
+
+
+def _price_labels():
+    bounds = (0, *PRICE_BUCKETS)
+    labels = [f"{low}-{high}" for low, high in zip(bounds, bounds[1:])]
+    return labels + [f"{PRICE_BUCKETS[-1]}+"]
+
+
+PRICE_LABELS = _price_labels()
+RATING_LABELS = [label for _, label in RATING_BANDS] + [UNRATED]
+
+_PRICE_CASE = "CASE {} ELSE '{}' END".format(
+    ' '.join(f"WHEN s.price < {high} THEN '{label}'"
+             for high, label in zip(PRICE_BUCKETS, PRICE_LABELS)),
+    PRICE_LABELS[-1])
+_RATING_CASE = "CASE WHEN v.rating IS NULL OR v.rating = 0 THEN '{}' {} END".format(
+    UNRATED, ' '.join(f"WHEN v.rating >= {low} THEN '{label}'" for low, label in RATING_BANDS))
+
+
+def build_facets_query(text=None, category=None):
+    """Return (sql, params) selecting (facet, value, count) rows"""
+    params = {}
+    filters = ''
+    match = build_match_query(text)
+    if match:
+        params["match"] = match
+        filters += (f" AND v.id IN (SELECT rowid FROM {SEARCH_TABLE} "
+                    f"WHERE {SEARCH_TABLE} MATCH :match)")
+    if category:
+        params["category"] = category
+        filters += f" AND {CATEGORY_FILTER}"
+
+    vendors = f"FROM vendors v WHERE v.is_active = TRUE{filters}"
+    services = ("FROM services s JOIN vendors v ON v.id = s.vendor_id "
+                f"WHERE s.is_active = TRUE AND v.is_active = TRUE{filters}")
+    sql = ' UNION ALL '.join([
+        f"SELECT 'service_types' AS facet, v.service_type AS value, COUNT(*) AS count "
+        f"{vendors} GROUP BY v.service_type",
+        f"SELECT 'ratings' AS facet, {_RATING_CASE} AS value, COUNT(*) AS count "
+        f"{vendors} GROUP BY value",
+        f"SELECT 'categories' AS facet, s.category AS value, COUNT(DISTINCT s.vendor_id) AS count "
+        f"{services} GROUP BY s.category",
+        f"SELECT 'price_ranges' AS facet, {_PRICE_CASE} AS value, "
+        f"COUNT(DISTINCT s.vendor_id) AS count {services} GROUP BY value",
+    ])
+    return sql, params
+
+
+def facet_rows_to_dict(rows):
+    """Turn build_facets_query rows into the response dict"""
+    counts = {'service_types': {}, 'ratings': {}, 'categories': {}, 'price_ranges': {}}
+    for facet, value, count in rows:
+        if value:
+            counts[facet][value] = count
+
+    def by_count(values):
+        return [{"value": value, "count": count}
+                for value, count in sorted(values.items(), key=lambda item: (-item[1], item[0]))]
+
+    def in_order(values, labels):
+        return [{"value": label, "count": values.get(label, 0)} for label in labels]
+
+    return {
+        "total": sum(counts['ratings'].values()),
+        "service_types": by_count(counts['service_types']),
+        "categories": by_count(counts['categories']),
+        "price_ranges": in_order(counts['price_ranges'], PRICE_LABELS),
+        "ratings": in_order(counts['ratings'], RATING_LABELS),
+    }
+
+
+def get_facets(text=None, category=None):
+    """Facet counts for the active vendors matching ``text`` and ``category``"""
+    sql, params = build_facets_query(text, category)
+    return facet_rows_to_dict(db.session.execute(db.text(sql), params).all())
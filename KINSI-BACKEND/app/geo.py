@@ -0,0 +1,296 @@
+# app/geo.py
+"""Vendor locations: offline geocoding and nearby search.
+
+Vendors carry latitude/longitude plus ``geo_cell``, the id of the
+GRID_DEGREES x GRID_DEGREES grid cell they fall in. Cells are numbered
+row by row, so the cells of one grid row are consecutive integers and a
+bounding box becomes one ``geo_cell BETWEEN`` range per row. The
+ix_vendors_geo index (geo_cell, latitude, longitude, is_active) answers
+that prefilter without reading the table; the candidates inside the box
+are then refined with the exact haversine distance.
+
+A nearby search starts at NEARBY_START_KM and widens the radius
+NEARBY_GROWTH-fold until ``limit`` vendors are inside it (or the requested
+radius is reached): every vendor within a smaller circle is nearer than
+any vendor outside it, so in dense areas only the cells around the point
+are read.
+
+Geocoding is offline: addresses are matched against the places in
+app/data/places.csv, a neighbourhood winning over the city it belongs to.
+Write paths locate vendors as they are saved; ``flask geocode-vendors``
+fills in the rest.
+"""
+import csv
+import math
+import os
+import re
+from collections import namedtuple
+from datetime import datetime
+from functools import lru_cache
+
+import click
+from flask.cli import with_appcontext
+from app import db
+from app.cache import invalidate
+from app.engine import begin_write
+from app.models.vendors import Vendor
+from app.vendor_cache import forget_vendors
+
+EARTH_RADIUS_KM = 6371.0088
+_KM_PER_DEGREE = math.pi * EARTH_RADIUS_KM / 180
+
+# About 5.5 km of latitude per cell
+GRID_DEGREES = 0.05
+GRID_ROWS = round(180 / GRID_DEGREES)
+GRID_COLUMNS = round(360 / GRID_DEGREES)
+
+NEARBY_START_KM = 0.5
+NEARBY_GROWTH = 4
+
+LOCATION_COLUMNS = ('latitude', 'longitude', 'geo_cell')
+
+PLACES_PATH = os.path.join(os.path.dirname(__file__), 'data', 'places.csv')
+
+Place = namedtuple('Place', 'name parent latitude longitude')
+
+
+def _row(latitude):
+    return min(int((latitude + 90) / GRID_DEGREES), GRID_ROWS - 1)
+
+
+def _column(longitude):
+    return min(int((longitude + 180) / GRID_DEGREES), GRID_COLUMNS - 1)
+
+
+def grid_cell(latitude, longitude):
+    """Grid cell id of a point"""
+    return _row(latitude) * GRID_COLUMNS + _column(longitude)
+
+
+def haversine_km(lat1, lng1, lat2, lng2):
+    """Great-circle distance between two points in km"""
+    lat1, lng1, lat2, lng2 = map(math.radians, (lat1, lng1, lat2, lng2))
+    a = (math.sin((lat2 - lat1) / 2) ** 2
+         + math.cos(lat1) * math.cos(lat2) * math.sin((lng2 - lng1) / 2) ** 2)
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def bounding_box(latitude, longitude, radius_km):
+    """(min lat, max lat, [(west, east), ...]) enclosing a circle.
+
+    The longitude span is split in two when it crosses the antimeridian
+    and covers every longitude when the box reaches a pole.
+    """
+    delta = radius_km / _KM_PER_DEGREE
+    min_lat, max_lat = max(-90.0, latitude - delta), min(90.0, latitude + delta)
+    if min_lat <= -90.0 or max_lat >= 90.0:
+        return min_lat, max_lat, [(-180.0, 180.0)]
+
+    # Widest where the box is farthest from the equator
+    widest = math.cos(math.radians(max(abs(min_lat), abs(max_lat))))
+    delta_lng = delta / widest
+    if delta_lng >= 180.0:
+        return min_lat, max_lat, [(-180.0, 180.0)]
+    west, east = longitude - delta_lng, longitude + delta_lng
+    if west < -180.0:
+        return min_lat, max_lat, [(west + 360.0, 180.0), (-180.0, east)]
+    if east > 180.0:
+        return min_lat, max_lat, [(west, 180.0), (-180.0, east - 360.0)]
+    return min_lat, max_lat, [(west, east)]
+
+
+def cell_ranges(min_lat, max_lat, lng_ranges):
+    """Inclusive (first, last) geo_cell ranges covering a bounding box"""
+    columns = [(_column(west), _column(east)) for west, east in lng_ranges]
+    ranges = []
+    for row in range(_row(min_lat), _row(max_lat) + 1):
+        for west, east in columns:
+            first, last = row * GRID_COLUMNS + west, row * GRID_COLUMNS + east
+            # Full-width rows run into each other
+            if ranges and ranges[-1][1] + 1 == first:
+                ranges[-1] = (ranges[-1][0], last)
+            else:
+                ranges.append((first, last))
+    return ranges
+
+
+def _vendors_within(latitude, longitude, radius_km, category=None):
+    """[(distance km, vendor id)] of the active vendors within radius_km"""
+    min_lat, max_lat, lng_ranges = bounding_box(latitude, longitude, radius_km)
+    params = {"min_lat": min_lat, "max_lat": max_lat}
+    cells = []
+    for n, (first, last) in enumerate(cell_ranges(min_lat, max_lat, lng_ranges)):
+        params[f"cell_{n}"], params[f"cell_{n}_end"] = first, last
+        cells.append(f"v.geo_cell BETWEEN :cell_{n} AND :cell_{n}_end")
+    lngs = []
+    for n, (west, east) in enumerate(lng_ranges):
+        params[f"west_{n}"], params[f"east_{n}"] = west, east
+        lngs.append(f"v.longitude BETWEEN :west_{n} AND :east_{n}")
+
+    category_filter = ''
+    if category:
+        params["category"] = category
+        category_filter = (
+            "AND (v.service_type = :category OR EXISTS (SELECT 1 FROM services s "
+            "WHERE s.category = :category AND s.is_active = TRUE AND s.vendor_id = v.id))"
+        )
+    # The unary + keeps SQLite from preferring ix_vendors_is_active_rating
+    # over one ix_vendors_geo range search per cell range
+    rows = db.session.execute(db.text(
+        f"SELECT v.id, v.latitude, v.longitude FROM vendors v "
+        f"WHERE ({' OR '.join(cells)}) AND v.latitude BETWEEN :min_lat AND :max_lat "
+        f"AND ({' OR '.join(lngs)}) AND +v.is_active = TRUE {category_filter}"
+    ), params)
+
+    hits = []
+    for vendor_id, lat, lng in rows:
+        distance = haversine_km(latitude, longitude, lat, lng)
+        if distance <= radius_km:
+            hits.append((distance, vendor_id))
+    return hits
+
+
+def nearby_vendor_ids(latitude, longitude, radius_km, category=None, limit=20):
+    """[(vendor id, distance km)] of the nearest active vendors, nearest first.
+
+    ``category`` has the same meaning as in search: the vendor's
+    service_type or any active service category equals it.
+    """
+    radius = min(NEARBY_START_KM, radius_km)
+    while True:
+        hits = _vendors_within(latitude, longitude, radius, category)
+        if len(hits) >= limit or radius >= radius_km:
+            break
+        radius = min(radius * NEARBY_GROWTH, radius_km)
+    hits.sort()
+    return [(vendor_id, distance) for distance, vendor_id in hits[:limit]]
+
+
+def parse_coordinates(latitude, longitude):
+    """Validate a latitude/longitude pair; returns floats or raises ValueError"""
+    try:
+        latitude, longitude = float(latitude), float(longitude)
+    except (TypeError, ValueError):
+        raise ValueError("latitude and longitude must be numbers")
+    if not (math.isfinite(latitude) and math.isfinite(longitude)
+            and -90 <= latitude <= 90 and -180 <= longitude <= 180):
+        raise ValueError("latitude must be within [-90, 90] and longitude within [-180, 180]")
+    return latitude, longitude
+
+
+def requested_coordinates(data):
+    """Coordinates given explicitly in a request body, or None if there are none.
+
+    Both keys go together; two nulls clear the location.
+    """
+    if 'latitude' not in data and 'longitude' not in data:
+        return None
+    latitude, longitude = data.get('latitude'), data.get('longitude')
+    if latitude is None and longitude is None:
+        return None, None
+    return parse_coordinates(latitude, longitude)
+
+
+@lru_cache(maxsize=4)
+def load_places(path=PLACES_PATH):
+    """({lower-cased name: Place}, regex matching any place name as a whole word)"""
+    places = {}
+    with open(path, newline='', encoding='utf-8') as f:
+        for row in csv.DictReader(f):
+            places[row['name'].lower()] = Place(row['name'], row['parent'] or None,
+                                                float(row['latitude']), float(row['longitude']))
+    names = sorted(places, key=len, reverse=True)
+    pattern = re.compile(r'\b(' + '|'.join(re.escape(name) for name in names) + r')\b', re.I)
+    return places, pattern
+
+
+def geocode(address):
+    """(latitude, longitude) of the most specific known place in an address, or None"""
+    if not address:
+        return None
+    places, pattern = load_places()
+    matched = [places[name.lower()] for name in pattern.findall(address)]
+    if not matched:
+        return None
+    names = {place.name for place in matched}
+    # A neighbourhood of a city named in the same address, then any neighbourhood
+    best = max(matched, key=lambda place: (place.parent in names, place.parent is not None))
+    return best.latitude, best.longitude
+
+
+def locate(coordinates, address):
+    """Explicit coordinates if given, else the geocoded address, else (None, None)"""
+    if coordinates is not None:
+        return coordinates
+    return geocode(address) or (None, None)
+
+
+def location_values(latitude, longitude):
+    """Column values for a vendor location"""
+    cell = grid_cell(latitude, longitude) if latitude is not None else None
+    return {"latitude": latitude, "longitude": longitude, "geo_cell": cell}
+
+
+def set_location(vendor, latitude, longitude):
+    """Set a vendor's coordinates and grid cell"""
+    for name, value in location_values(latitude, longitude).items():
+        setattr(vendor, name, value)
+
+
+def geocode_vendors(all_vendors=False, chunk_size=1000):
+    """Locate vendors without a grid cell (every vendor with ``all_vendors``).
+
+    Vendors with coordinates but no cell keep them and get their cell; the
+    rest are geocoded from their address. With ``all_vendors`` every
+    address is geocoded again, replacing the coordinates of the vendors it
+    resolves.
+    Returns (vendors located, vendors looked at).
+    """
+    located = seen = 0
+    after = 0
+    pending = '' if all_vendors else 'AND geo_cell IS NULL '
+    while True:
+        begin_write(db.session)
+        rows = db.session.execute(db.text(
+            "SELECT id, user_id, address, latitude, longitude FROM vendors "
+            f"WHERE id > :after {pending}ORDER BY id LIMIT :limit"
+        ), {"after": after, "limit": chunk_size}).all()
+        if not rows:
+            break
+        after = rows[-1].id
+        seen += len(rows)
+
+        updates = []
+        for row in rows:
+            known = (row.latitude, row.longitude) if row.latitude is not None \
+                and row.longitude is not None else None
+            point = geocode(row.address) if all_vendors or known is None else None
+            point = point or known
+            if point is not None:
+                updates.append({"id": row.id, "user_id": row.user_id,
+                                **location_values(*point)})
+        if updates:
+            now = datetime.utcnow()
+            # Typed, so the stamp is stored exactly as the ORM stores it
+            db.session.execute(db.text(
+                "UPDATE vendors SET latitude = :latitude, longitude = :longitude, "
+                "geo_cell = :geo_cell, updated_at = :updated_at WHERE id = :id"
+            ).bindparams(db.bindparam('updated_at', type_=Vendor.__table__.c.updated_at.type)),
+                [{**update, "updated_at": now} for update in updates])
+        db.session.commit()
+        located += len(updates)
+        if updates:
+            invalidate('catalog', *(f"vendor:{update['id']}" for update in updates),
+                       *(f"user:{update['user_id']}" for update in updates))
+            forget_vendors(update['id'] for update in updates)
+    return located, seen
+
+
+@click.command('geocode-vendors')
+@click.option('--all', 'all_vendors', is_flag=True,
+              help="Geocode every vendor again, not only those without a location.")
+@with_appcontext
+def geocode_vendors_command(all_vendors):
+    """Fill in vendor locations from their addresses (offline)."""
+    located, seen = geocode_vendors(all_vendors)
+    click.echo(f"Located {located} of {seen} vendors")
@@ -0,0 +1,420 @@
+# app/jobs.py
+"""Durable background jobs, queued in the app's own database.
+
+A request handler calls ``enqueue()`` before it commits, so the job
+exists exactly when the write that asked for it does, and returns at
+once. ``flask jobs work`` runs a pool of threads that lease jobs from
+the ``jobs`` table, run their handler and acknowledge them:
+
+* Lease: a claim marks jobs ``running`` with an owner and a deadline
+  JOB_LEASE_SECONDS away, and the worker renews the leases it holds
+  while the jobs run. A job whose lease ran out, because its worker
+  died, goes back to the queue on the next claim by any worker.
+* Ack: the handler's writes are committed in the same transaction that
+  marks the job ``done``. A worker that lost the lease rolls them back
+  instead, since the job now belongs to someone else.
+* Retries: a handler that raises is retried after an exponential,
+  jittered backoff (JOB_BACKOFF_SECONDS doubling up to
+  JOB_BACKOFF_MAX_SECONDS) until it has had max_attempts tries. After
+  that it is ``failed`` with the last error kept.
+* Dedup: enqueueing with a ``dedup_key`` while a job with that key is
+  still queued returns that job instead of adding another. A running job
+  does not count, as it may have read the data before the new write.
+* Concurrency: a job type may cap how many of its jobs run at once
+  across all workers, with ``@job(concurrency=...)`` or JOB_CONCURRENCY.
+
+Handlers are registered with ``@job('name')``. They are called with the
+payload as keyword arguments inside an app context, and may enqueue
+further jobs. Whatever they return (JSON) becomes the job's result, shown
+by GET /api/jobs/<id>. A handler that commits part of its work itself,
+like a bulk import committing per chunk, must be safe to start over.
+
+Claims are single write transactions, so ``flask jobs work`` can run in
+several processes at once. Workers are processes of their own; a job's
+cache invalidations reach the web workers through the stamp files both
+caches share between the processes of a host, so run ``flask jobs work``
+next to the web server (or use the ``sqlite`` response cache backend on a
+path both can open).
+"""
+import json
+import logging
+import os
+import random
+import shutil
+import signal
+import socket
+import threading
+import time
+import uuid
+from collections import Counter, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+import click
+from flask import current_app
+from flask.cli import AppGroup
+from sqlalchemy.exc import SQLAlchemyError
+from app import db
+from app.bulk_import import DEFAULT_CHUNK_SIZE, import_vendors
+from app.engine import begin_write
+from app.models.jobs import Job
+from app.search import rebuild_search_index
+from app.stats import rebuild_vendor_stats
+
+logger = logging.getLogger(__name__)
+
+JobType = namedtuple('JobType', 'handler concurrency max_attempts')
+
+# name -> JobType, filled in by @job
+JOB_TYPES = {}
+
+
+def job(name, concurrency=None, max_attempts=None):
+    """Register a handler for a job type (concurrency None means no cap)"""
+    def decorator(handler):
+        JOB_TYPES[name] = JobType(handler, concurrency, max_attempts)
+        return handler
+    return decorator
+
+
+def enqueue(job_type, payload=None, dedup_key=None, delay=0, max_attempts=None):
+    """Queue a job (call before commit); returns its id.
+
+    With ``dedup_key``, a job with that key that is still queued is
+    returned instead of a new one.
+    """
+    if job_type not in JOB_TYPES:
+        raise ValueError(f"Unknown job type: {job_type!r}")
+    if dedup_key is not None:
+        # On the primary: a GET request's reads would go to the read pool
+        existing = db.session.execute(
+            db.select(Job.id).where(Job.dedup_key == dedup_key, Job.status == 'queued').limit(1),
+            bind_arguments={'bind': db.engine}).scalar()
+        if existing is not None:
+            return existing
+    new_job = Job(
+        type=job_type,
+        payload=json.dumps(payload or {}),
+        dedup_key=dedup_key,
+        max_attempts=max_attempts or JOB_TYPES[job_type].max_attempts
+        or current_app.config['JOB_MAX_ATTEMPTS'],
+        run_at=datetime.utcnow() + timedelta(seconds=delay),
+    )
+    db.session.add(new_job)
+    db.session.flush()
+    return new_job.id
+
+
+def store_job_file(stream, suffix=''):
+    """Copy a (request) stream to a new file under JOB_DATA_DIR; returns its path"""
+    directory = current_app.config['JOB_DATA_DIR']
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, uuid.uuid4().hex + suffix)
+    with open(path, 'wb') as target:
+        shutil.copyfileobj(stream, target, 1024 * 1024)
+    return path
+
+
+class JobWorker:
+    """A pool of threads running queued jobs, fed by one claiming loop"""
+
+    def __init__(self, app, threads=4, types=None, owner=None):
+        self.app = app
+        self.threads = threads
+        self.types = {name: JOB_TYPES[name] for name in (types or JOB_TYPES)}
+        overrides = app.config.get('JOB_CONCURRENCY', {})
+        self.limits = {name: overrides.get(name, job_type.concurrency)
+                       for name, job_type in self.types.items()}
+        self.lease = timedelta(seconds=app.config['JOB_LEASE_SECONDS'])
+        self.poll_interval = app.config['JOB_POLL_INTERVAL']
+        self.backoff = app.config['JOB_BACKOFF_SECONDS']
+        self.max_backoff = app.config['JOB_BACKOFF_MAX_SECONDS']
+        self.owner = owner or f'{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}'
+        # done / retried / failed / lost jobs, for the command's summary
+        self.counts = Counter()
+        self._held = set()
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+
+    def run(self, burst=False):
+        """Run jobs until stop() is called, or with ``burst`` until none is ready"""
+        renew_every = self.lease.total_seconds() / 3
+        next_renewal = time.monotonic() + renew_every
+        with ThreadPoolExecutor(self.threads, thread_name_prefix='job') as pool:
+            while not self._stopping.is_set():
+                self._wakeup.clear()
+                claimed = self._claim(self.threads - self._held_count())
+                for row in claimed:
+                    pool.submit(self._execute, row)
+                if time.monotonic() >= next_renewal:
+                    self._renew()
+                    next_renewal = time.monotonic() + renew_every
+                if burst and not claimed and not self._held_count():
+                    break
+                # A full claim may have left more jobs ready; otherwise wait for
+                # a finished job (a free slot, maybe a follow-up job) or the poll
+                if not claimed or self._held_count() >= self.threads:
+                    self._wakeup.wait(self.poll_interval)
+            # Keep the leases of jobs still running until they finish
+            while self._held_count():
+                self._wakeup.wait(renew_every)
+                self._wakeup.clear()
+                self._renew()
+
+    def stop(self):
+        """Stop claiming; run() returns once the running jobs are done"""
+        self._stopping.set()
+        self._wakeup.set()
+
+    def _held_count(self):
+        with self._lock:
+            return len(self._held)
+
+    def _claim(self, free):
+        """Lease up to ``free`` ready jobs, within the per-type limits"""
+        if free <= 0:
+            return []
+        now = datetime.utcnow()
+        with self.app.app_context():
+            try:
+                # An idle poll stays a plain read and never takes the write lock
+                waiting = self._work_waiting(now)
+                db.session.commit()
+                if not waiting:
+                    return []
+                begin_write(db.session)
+                self._reap(now)
+                running = dict(db.session.execute(
+                    db.select(Job.type, db.func.count()).where(Job.status == 'running')
+                    .group_by(Job.type)).all())
+                room = {name: free if limit is None else limit - running.get(name, 0)
+                        for name, limit in self.limits.items()}
+                picked = []
+                claimable = [name for name, left in room.items() if left > 0]
+                while claimable and len(picked) < free:
+                    rows = db.session.execute(
+                        db.select(Job.id, Job.type)
+                        .where(Job.status == 'queued', Job.run_at <= now,
+                               Job.type.in_(claimable), Job.id.not_in(picked))
+                        .order_by(Job.run_at, Job.id)
+                        .limit(free - len(picked))).all()
+                    skipped = False
+                    for job_id, job_type in rows:
+                        if room[job_type] > 0:
+                            picked.append(job_id)
+                            room[job_type] -= 1
+                        else:
+                            skipped = True
+                    # Unless a type ran out of room, the claim is full or the queue dry
+                    if not skipped:
+                        break
+                    claimable = [name for name in claimable if room[name] > 0]
+                if not picked:
+                    db.session.rollback()
+                    return []
+
+                # Only jobs still queued and unleased are taken; what RETURNING
+                # gives back is the claim, whatever was picked
+                claimed = db.session.execute(
+                    db.update(Job).where(Job.id.in_(picked), Job.status == 'queued',
+                                         Job.run_at <= now, Job.leased_until.is_(None))
+                    .values(status='running', lease_owner=self.owner, leased_until=now + self.lease,
+                            attempts=Job.attempts + 1, started_at=now)
+                    .returning(Job.id, Job.type, Job.payload, Job.attempts, Job.max_attempts)
+                    .execution_options(synchronize_session=False)).all()
+                db.session.commit()
+            except SQLAlchemyError:
+                db.session.rollback()
+                logger.exception("Claiming jobs failed")
+                return []
+        with self._lock:
+            self._held.update(row.id for row in claimed)
+        return claimed
+
+    def _work_waiting(self, now):
+        """Whether a claim would find a ready job of ours or an expired lease"""
+        return db.session.execute(db.select(db.or_(
+            db.exists().where(Job.status == 'queued', Job.run_at <= now,
+                              Job.type.in_(list(self.types))),
+            db.exists().where(Job.status == 'running', Job.leased_until < now),
+        ))).scalar()
+
+    def _reap(self, now):
+        """Requeue (or fail, if out of attempts) jobs whose lease expired"""
+        expired = (Job.status == 'running', Job.leased_until < now)
+        released = {'lease_owner': None, 'leased_until': None, 'last_error': "Lease expired"}
+        db.session.execute(
+            db.update(Job).where(*expired, Job.attempts >= Job.max_attempts)
+            .values(status='failed', finished_at=now, **released)
+            .execution_options(synchronize_session=False))
+        db.session.execute(
+            db.update(Job).where(*expired)
+            .values(status='queued', run_at=now, **released)
+            .execution_options(synchronize_session=False))
+
+    def _renew(self):
+        with self._lock:
+            held = list(self._held)
+        if not held:
+            return
+        with self.app.app_context():
+            try:
+                db.session.execute(
+                    db.update(Job).where(Job.id.in_(held), Job.lease_owner == self.owner,
+                                         Job.status == 'running')
+                    .values(leased_until=datetime.utcnow() + self.lease)
+                    .execution_options(synchronize_session=False))
+                db.session.commit()
+            except SQLAlchemyError:
+                db.session.rollback()
+                logger.exception("Renewing job leases failed")
+
+    def _owned(self, job_id):
+        return (Job.id == job_id, Job.lease_owner == self.owner, Job.status == 'running')
+
+    def _execute(self, row):
+        try:
+            with self.app.app_context():
+                try:
+                    result = self.types[row.type].handler(**json.loads(row.payload))
+                except Exception as e:
+                    db.session.rollback()
+                    logger.exception("Job %s (%s) failed on attempt %s", row.id, row.type, row.attempts)
+                    self._retry_or_fail(row, e)
+                else:
+                    self._ack(row, result)
+        finally:
+            with self._lock:
+                self._held.discard(row.id)
+            self._wakeup.set()
+
+    def _ack(self, row, result):
+        """Commit the handler's writes together with the job's completion"""
+        try:
+            acked = db.session.execute(
+                db.update(Job).where(*self._owned(row.id))
+                .values(status='done', finished_at=datetime.utcnow(), lease_owner=None,
+                        leased_until=None,
+                        result=None if result is None else current_app.json.dumps(result))
+                .execution_options(synchronize_session=False)).rowcount
+            if not acked:
+                db.session.rollback()
+                logger.warning("Lost the lease on job %s (%s); its writes were rolled back",
+                               row.id, row.type)
+                self.counts['lost'] += 1
+                return
+            db.session.commit()
+            self.counts['done'] += 1
+        except Exception as e:
+            db.session.rollback()
+            logger.exception("Completing job %s (%s) failed", row.id, row.type)
+            self._retry_or_fail(row, e)
+
+    def _retry_or_fail(self, row, error):
+        now = datetime.utcnow()
+        if row.attempts < row.max_attempts:
+            delay = min(self.max_backoff, self.backoff * 2 ** (row.attempts - 1))
+            values = {'status': 'queued', 'run_at': now + timedelta(seconds=delay * random.uniform(0.5, 1))}
+            outcome = 'retried'
+        else:
+            values = {'status': 'failed', 'finished_at': now}
+            outcome = 'failed'
+        try:
+            db.session.execute(
+                db.update(Job).where(*self._owned(row.id))
+                .values(lease_owner=None, leased_until=None,
+                        last_error=f"{type(error).__name__}: {error}", **values)
+                .execution_options(synchronize_session=False))
+            db.session.commit()
+            self.counts[outcome] += 1
+        except SQLAlchemyError:
+            # The lease runs out and the job is retried from there
+            db.session.rollback()
+            logger.exception("Recording the failure of job %s failed", row.id)
+
+
+def purge_jobs(days):
+    """Delete finished jobs older than ``days``; returns how many"""
+    cutoff = datetime.utcnow() - timedelta(days=days)
+    deleted = Job.query.filter(Job.status.in_(('done', 'failed')), Job.finished_at < cutoff) \
+        .delete(synchronize_session=False)
+    db.session.commit()
+    return deleted
+
+
+@job('rebuild_search_index', concurrency=1)
+def _rebuild_search_index():
+    return {"vendors": rebuild_search_index()}
+
+
+@job('rebuild_vendor_stats', concurrency=1)
+def _rebuild_vendor_stats():
+    return {"vendors": rebuild_vendor_stats()}
+
+
+@job('import_vendors', concurrency=1)
+def _import_vendors(path, format, chunk_size=DEFAULT_CHUNK_SIZE, max_errors=None):
+    # Rows are upserted by user_id, so a retry redoes the chunks already written harmlessly
+    with open(path, encoding='utf-8', newline='') as stream:
+        report = import_vendors(stream, format, chunk_size)
+    os.remove(path)
+    return report.to_dict(max_errors=max_errors)
+
+
+jobs_cli = AppGroup('jobs', help='Run and manage background jobs.')
+
+
+@jobs_cli.command('work')
+@click.option('--threads', type=int, default=None, help="Jobs run at once (JOB_WORKER_THREADS)")
+@click.option('--type', 'types', multiple=True, help="Only run this job type (repeatable)")
+@click.option('--burst', is_flag=True, help="Exit once no job is ready instead of waiting")
+def work_command(threads, types, burst):
+    """Run queued jobs until interrupted."""
+    unknown = set(types) - JOB_TYPES.keys()
+    if unknown:
+        raise click.BadParameter(f"unknown job types: {', '.join(sorted(unknown))}")
+    app = current_app._get_current_object()
+    worker = JobWorker(app, threads or app.config['JOB_WORKER_THREADS'], types=types or None)
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(signum, lambda *_: worker.stop())
+    click.echo(f"Worker {worker.owner} running {', '.join(sorted(worker.types))} "
+               f"with {worker.threads} threads")
+    worker.run(burst=burst)
+    click.echo(', '.join(f"{count} {outcome}" for outcome, count in sorted(worker.counts.items()))
+               or "No jobs run")
+
+
+@jobs_cli.command('enqueue')
+@click.argument('job_type')
+@click.option('--payload', default='{}', help="Handler keyword arguments as a JSON object")
+@click.option('--dedup-key', default=None)
+@click.option('--delay', type=float, default=0, help="Seconds before the job may run")
+def enqueue_command(job_type, payload, dedup_key, delay):
+    """Queue one job."""
+    try:
+        begin_write(db.session)
+        job_id = enqueue(job_type, json.loads(payload), dedup_key=dedup_key, delay=delay)
+    except ValueError as e:
+        raise click.BadParameter(str(e))
+    db.session.commit()
+    click.echo(f"Queued job {job_id}")
+
+
+@jobs_cli.command('status')
+def status_command():
+    """Count jobs by type and status."""
+    rows = db.session.execute(
+        db.select(Job.type, Job.status, db.func.count()).group_by(Job.type, Job.status)
+        .order_by(Job.type, Job.status)).all()
+    for job_type, status, count in rows:
+        click.echo(f"{job_type:<24}{status:<10}{count:>8}")
+    if not rows:
+        click.echo("No jobs")
+
+
+@jobs_cli.command('purge')
+def purge_command():
+    """Drop finished jobs older than JOB_RETENTION_DAYS."""
+    days = current_app.config['JOB_RETENTION_DAYS']
+    click.echo(f"Purged {purge_jobs(days)} jobs finished more than {days:g} days ago")
@@ -0,0 +1,39 @@
+# app/lazy_migrate.py
+"""Flask-Migrate, loaded on demand.
+
+Flask-Migrate imports Alembic, which costs about a quarter of the app's
+import time, and only the ``flask db`` commands need it. LazyMigrate
+registers a ``db`` command group and an ``extensions['migrate']``
+placeholder; the real extension is set up the first time either is used.
+"""
+import click
+
+
+class LazyMigrate:
+    def init_app(self, app, db):
+        app.extensions['migrate'] = _PendingMigrateConfig(app, db)
+        app.cli.add_command(_LazyDbGroup('db', help="Perform database migrations."))
+
+
+class _PendingMigrateConfig:
+    def __init__(self, app, db):
+        self._app = app
+        self._db = db
+
+    def __getattr__(self, name):
+        from flask_migrate import Migrate
+        # Replaces this placeholder in app.extensions
+        Migrate(self._app, self._db)
+        return getattr(self._app.extensions['migrate'], name)
+
+
+class _LazyDbGroup(click.Group):
+    def _group(self):
+        from flask_migrate.cli import db
+        return db
+
+    def list_commands(self, ctx):
+        return self._group().list_commands(ctx)
+
+    def get_command(self, ctx, name):
+        return self._group().get_command(ctx, name)
@@ -0,0 +1,326 @@
+# app/leaderboards.py
+"""In-memory "top rated" and "most booked" vendor leaderboards.
+
+Each worker keeps, per board, one bounded ranking for all vendors and one
+per service_type, holding up to twice LEADERBOARD_SIZE entries. A read
+returns the first entries of a ranking without touching the database
+unless vendors changed since the last read.
+
+Updates are incremental. Write paths call ``vendors_changed(ids)`` after
+committing (counter flushes, service deletes, profile writes, imports,
+and anything that changes ratings), which only records the ids. The next
+read re-reads just those vendors in one query and moves them within the
+rankings they belong to.
+
+A ranking that had to leave vendors out only knows its own members. A
+member whose score falls below its last entry is therefore dropped
+rather than guessed at. Once fewer than LEADERBOARD_SIZE entries are
+left, the whole set is recomputed.
+
+A background thread also recomputes everything every
+LEADERBOARD_REFRESH_INTERVAL seconds, with one window-function query.
+This corrects any drift and picks up writes made by other workers.
+
+Queries never run under the lock readers take: rows are read first and
+the lock is held only to apply them, so a slow query delays the reader
+that runs it, not every leaderboard read of the worker.
+"""
+import atexit
+import bisect
+import logging
+import threading
+import time
+
+from flask import current_app
+from app import db
+from app.engine import use_primary
+
+logger = logging.getLogger(__name__)
+
+BOARDS = ('top_rated', 'most_booked')
+ALL = None
+
+_ENTRY_COLUMNS = ('id', 'business_name', 'service_type', 'rating', 'total_reviews',
+                  'total_bookings')
+_SELECT = (
+    "SELECT v.id, v.business_name, v.service_type, v.rating, v.total_reviews, "
+    "COALESCE(s.total_bookings, 0) AS total_bookings, v.is_active "
+    "FROM vendors v LEFT JOIN vendor_stats s ON s.vendor_id = v.id"
+)
+# Best (capacity + 1) of each board per service_type; the extra row tells
+# whether a ranking had to leave vendors out
+_RECOMPUTE_SQL = (
+    "SELECT * FROM (SELECT v.id, v.business_name, v.service_type, v.rating, v.total_reviews, "
+    "COALESCE(s.total_bookings, 0) AS total_bookings, v.is_active, "
+    "ROW_NUMBER() OVER (PARTITION BY v.service_type "
+    "ORDER BY v.rating DESC, v.total_reviews DESC, v.id) AS rating_rank, "
+    "ROW_NUMBER() OVER (PARTITION BY v.service_type "
+    "ORDER BY COALESCE(s.total_bookings, 0) DESC, v.id) AS booking_rank "
+    "FROM vendors v LEFT JOIN vendor_stats s ON s.vendor_id = v.id WHERE v.is_active = TRUE) "
+    "WHERE rating_rank <= :limit OR booking_rank <= :limit"
+)
+
+
+def ranking_key(board, row):
+    """Sort key of a vendor row on a board (lower is better), or None if unranked"""
+    if not row.is_active:
+        return None
+    if board == 'top_rated':
+        return (-row.rating, -(row.total_reviews or 0), row.id) if row.rating else None
+    return (-row.total_bookings, row.id) if row.total_bookings else None
+
+
+class Ranking:
+    """The best entries of one ranking, sorted by key, at most ``capacity``.
+
+    When ``truncated`` is set, vendors were left out for lack of room and
+    the entries are exactly the overall best len(entries); otherwise they
+    are every ranked vendor.
+    """
+
+    def __init__(self, capacity, truncated=False):
+        self.capacity = capacity
+        self.truncated = truncated
+        self._keys = []
+        self._members = {}
+
+    @classmethod
+    def build(cls, capacity, members, truncated=False):
+        """Ranking of (key, entry) pairs, keeping the best ``capacity``"""
+        ranking = cls(capacity)
+        members = sorted(members, key=lambda member: member[0])
+        for key, entry in members[:capacity]:
+            ranking._keys.append(key)
+            ranking._members[key[-1]] = (key, entry)
+        ranking.truncated = truncated or len(members) > capacity
+        return ranking
+
+    def __len__(self):
+        return len(self._keys)
+
+    def __contains__(self, vendor_id):
+        return vendor_id in self._members
+
+    def offer(self, vendor_id, key, entry):
+        """Insert, move or (with key None) remove a vendor"""
+        self.remove(vendor_id)
+        if key is None:
+            return
+        if self.truncated and (not self._keys or key > self._keys[-1]):
+            # A vendor that was left out may rank higher
+            return
+        bisect.insort(self._keys, key)
+        self._members[vendor_id] = (key, entry)
+        if len(self._keys) > self.capacity:
+            dropped = self._keys.pop()
+            del self._members[dropped[-1]]
+            self.truncated = True
+
+    def remove(self, vendor_id):
+        member = self._members.pop(vendor_id, None)
+        if member is not None:
+            del self._keys[bisect.bisect_left(self._keys, member[0])]
+
+    def top(self, limit):
+        return [self._members[key[-1]][1] for key in self._keys[:limit]]
+
+
+class Leaderboards:
+    """All rankings of one process, plus the changes not applied yet"""
+
+    def __init__(self, app, size=20, refresh_interval=300.0):
+        self.app = app
+        self.size = size
+        self.capacity = 2 * size
+        self.refresh_interval = refresh_interval
+        self._rankings = None
+        self._category = {}
+        self._pending = set()
+        # Changes applied while a background recompute runs, to redo on its result
+        self._replay = None
+        self._lock = threading.Lock()
+        # One full recompute at a time (reads, the refresh thread)
+        self._rebuild_lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._thread = None
+        self.loaded_at = None
+
+    def vendors_changed(self, vendor_ids):
+        """Remember vendors whose score, category or name may have changed"""
+        with self._lock:
+            self._pending.update(vendor_ids)
+
+    def top(self, board, category=ALL, limit=None):
+        """The best ``limit`` (at most LEADERBOARD_SIZE) entries of a board"""
+        limit = self.size if limit is None else min(limit, self.size)
+        self._ensure_thread()
+        with self._lock:
+            stale = bool(self._pending) or self._needs_rebuild()
+        if stale:
+            # Pending vendors were written by this worker; a replica may not have them yet
+            use_primary()
+            self._apply_pending()
+            with self._lock:
+                rebuild = self._needs_rebuild()
+            if rebuild:
+                # Waits for a recompute in progress rather than running another
+                self._rebuild(only_if_needed=True)
+        with self._lock:
+            ranking = self._rankings.get((board, category))
+            return ranking.top(limit) if ranking is not None else []
+
+    def recompute(self):
+        """Rebuild every ranking from the database; returns the vendors ranked"""
+        return self._rebuild()
+
+    def _rebuild(self, only_if_needed=False):
+        with self._rebuild_lock:
+            with self._lock:
+                if only_if_needed and not self._needs_rebuild():
+                    return len(self._category)
+                # Changes marked so far are committed, so the query sees them
+                self._pending.clear()
+                self._replay = set()
+            # Readers keep being served from the old rankings meanwhile
+            try:
+                rows = self._query()
+            except Exception:
+                with self._lock:
+                    self._pending |= self._replay
+                    self._replay = None
+                raise
+            with self._lock:
+                self._install(rows)
+                self._pending |= self._replay
+                self._replay = None
+                return len(self._category)
+
+    def _needs_rebuild(self):
+        return self._rankings is None or any(ranking.truncated and len(ranking) < self.size
+                                             for ranking in self._rankings.values())
+
+    def _query(self):
+        return db.session.execute(db.text(_RECOMPUTE_SQL), {"limit": self.capacity + 1}).all()
+
+    def _install(self, rows):
+        rankings, category = {}, {}
+        for board, rank_column in (('top_rated', 'rating_rank'), ('most_booked', 'booking_rank')):
+            members, truncated = {}, set()
+            for row in rows:
+                rank, key = getattr(row, rank_column), ranking_key(board, row)
+                if key is None or rank > self.capacity + 1:
+                    continue
+                service_type = row.service_type or ''
+                if rank > self.capacity:
+                    truncated.add(service_type)
+                    continue
+                members.setdefault(service_type, []).append((key, _entry(row)))
+                category[row.id] = service_type
+
+            everyone = []
+            for service_type, ranked in members.items():
+                rankings[(board, service_type)] = Ranking.build(
+                    self.capacity, ranked, service_type in truncated)
+                everyone.extend(ranked)
+            # The overall best are among the best of each service_type
+            rankings[(board, ALL)] = Ranking.build(
+                self.capacity, everyone, bool(truncated) or len(everyone) > self.capacity)
+        self._rankings, self._category = rankings, category
+        self.loaded_at = time.monotonic()
+
+    def _apply_pending(self):
+        with self._lock:
+            if self._rankings is None or not self._pending:
+                return
+            ids = list(self._pending)
+            self._pending.clear()
+            if self._replay is not None:
+                self._replay.update(ids)
+        try:
+            rows = {row.id: row for row in db.session.execute(
+                db.text(f"{_SELECT} WHERE v.id IN :ids")
+                .bindparams(db.bindparam('ids', expanding=True)), {"ids": ids})}
+        except Exception:
+            with self._lock:
+                self._pending.update(ids)
+            raise
+        with self._lock:
+            self._apply_rows(ids, rows)
+
+    def _apply_rows(self, ids, rows):
+        for vendor_id in ids:
+            previous = self._category.pop(vendor_id, None)
+            for board in BOARDS:
+                for category in (ALL, previous):
+                    ranking = self._rankings.get((board, category))
+                    if ranking is not None:
+                        ranking.remove(vendor_id)
+
+            row = rows.get(vendor_id)
+            if row is None:
+                continue
+            service_type = row.service_type or ''
+            entry = _entry(row)
+            for board in BOARDS:
+                key = ranking_key(board, row)
+                if key is None:
+                    continue
+                # A service_type nobody was ranked in before starts out complete
+                ranking = self._rankings.setdefault((board, service_type), Ranking(self.capacity))
+                ranking.offer(vendor_id, key, entry)
+                self._rankings[(board, ALL)].offer(vendor_id, key, entry)
+                if vendor_id in ranking:
+                    self._category[vendor_id] = service_type
+
+    def _ensure_thread(self):
+        if self.refresh_interval <= 0 or self._stopped.is_set() \
+                or (self._thread is not None and self._thread.is_alive()):
+            return
+        with self._lock:
+            if self._stopped.is_set() or (self._thread is not None and self._thread.is_alive()):
+                return
+            # Started on first use so a preloading parent never forks with a live thread
+            self._thread = threading.Thread(target=self._run, name='leaderboard-refresh',
+                                            daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while not self._stopped.wait(self.refresh_interval):
+            with self.app.app_context():
+                try:
+                    self.recompute()
+                except Exception:
+                    logger.exception("Leaderboard recompute failed")
+                finally:
+                    db.session.remove()
+
+    def stop(self):
+        """Stop the refresh thread"""
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join(timeout=10)
+
+
+def _entry(row):
+    return {column: getattr(row, column) for column in _ENTRY_COLUMNS}
+
+
+def init_leaderboards(app):
+    leaderboards = Leaderboards(
+        app,
+        size=app.config.get('LEADERBOARD_SIZE', 20),
+        refresh_interval=app.config.get('LEADERBOARD_REFRESH_INTERVAL', 300.0),
+    )
+    app.extensions['leaderboards'] = leaderboards
+    atexit.register(leaderboards.stop)
+
+
+def get_leaderboards():
+    return current_app.extensions['leaderboards']
+
+
+def vendors_changed(vendor_ids):
+    """Queue vendors for a leaderboard update; call after the write has been committed"""
+    leaderboards = current_app.extensions.get('leaderboards')
+    if leaderboards is not None and vendor_ids:
+        leaderboards.vendors_changed(vendor_ids)
@@ -0,0 +1,343 @@
+# app/metrics.py
+"""Per-request metrics in Prometheus text format at ``/metrics``.
+
+For every request we record, labelled by endpoint and method:
+
+* latency (histogram, includes streaming the body),
+* response size in bytes (histogram, streamed bodies are counted as sent),
+* SQL statements run and time spent in the database (histograms, from
+  SQLAlchemy cursor events on every engine),
+* a request counter by status code.
+
+Values live in process memory behind one lock. With gunicorn every worker
+has its own copy, so when METRICS_DIR is set each worker also writes a
+snapshot there (at most every METRICS_FLUSH_INTERVAL seconds, and when
+a process that served requests exits) and ``/metrics`` sums the snapshots
+of all workers that share this worker's master process. gunicorn's
+``child_exit`` hook folds the counters and histograms of a worker that
+exited into an archive snapshot owned by the master and deletes the
+worker's own file, so totals never go down when workers are recycled
+(Prometheus would read the drop as a counter reset); gauges die with the
+worker. Snapshots of an earlier master are deleted too.
+"""
+import atexit
+import bisect
+import json
+import os
+import threading
+import time
+
+from flask import Response, current_app, g, has_request_context, request
+from sqlalchemy import event
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+STATEMENT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 500)
+
+# name: (type, help, buckets)
+METRICS = {
+    'kinsi_http_requests_total': ('counter', 'Requests served', None),
+    'kinsi_http_request_duration_seconds': ('histogram', 'Request latency', LATENCY_BUCKETS),
+    'kinsi_http_response_size_bytes': ('histogram', 'Response body size', SIZE_BUCKETS),
+    'kinsi_db_statements_per_request': ('histogram', 'SQL statements run per request', STATEMENT_BUCKETS),
+    'kinsi_db_time_seconds': ('histogram', 'Time spent in SQL per request', LATENCY_BUCKETS),
+    'kinsi_vendor_cache_lookups_total': ('counter', 'Vendor identity cache lookups by result', None),
+    'kinsi_db_read_routes_total': ('counter', 'Read requests routed to each bind', None),
+}
+
+
+class MetricsRegistry:
+    """Counters and histograms keyed by (metric name, label tuple)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # counter -> float; histogram -> [bucket counts..., +Inf count, sum]
+        self._values = {}
+
+    def inc(self, name, labels, amount=1):
+        key = (name, labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def observe(self, name, labels, value):
+        self.record(labels, ((name, value),))
+
+    def record(self, labels, observations, counter=None):
+        """Observe several histograms (and bump one counter) under one lock"""
+        indexed = [(name, bisect.bisect_left(METRICS[name][2], value), value)
+                   for name, value in observations]
+        with self._lock:
+            values = self._values
+            for name, index, value in indexed:
+                series = values.get((name, labels))
+                if series is None:
+                    series = values[(name, labels)] = [0] * (len(METRICS[name][2]) + 2)
+                series[index] += 1
+                series[-1] += value
+            if counter is not None:
+                values[counter] = values.get(counter, 0) + 1
+
+    def snapshot(self):
+        with self._lock:
+            return [[name, list(labels), value if not isinstance(value, list) else list(value)]
+                    for (name, labels), value in self._values.items()]
+
+
+def merge_snapshots(snapshots):
+    """Sum snapshots from several processes into {(name, labels): value}"""
+    merged = {}
+    for snapshot in snapshots:
+        for name, labels, value in snapshot:
+            key = (name, tuple(tuple(pair) for pair in labels))
+            if isinstance(value, list):
+                total = merged.setdefault(key, [0] * len(value))
+                for n, v in enumerate(value):
+                    total[n] += v
+            else:
+                merged[key] = merged.get(key, 0) + value
+    return merged
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(labels, extra=()):
+    pairs = [*labels, *extra]
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+def render(merged):
+    """Prometheus text exposition (version 0.0.4) of merged values"""
+    lines = []
+    for name, (kind, help_text, buckets) in METRICS.items():
+        series = sorted((labels, value) for (metric, labels), value in merged.items() if metric == name)
+        if not series:
+            continue
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} {kind}')
+        for labels, value in series:
+            if kind == 'counter':
+                lines.append(f'{name}{_format_labels(labels)} {value}')
+                continue
+            cumulative = 0
+            for bound, count in zip((*buckets, '+Inf'), value[:-1]):
+                cumulative += count
+                lines.append(f'{name}_bucket{_format_labels(labels, [("le", bound)])} {cumulative}')
+            lines.append(f'{name}_sum{_format_labels(labels)} {value[-1]}')
+            lines.append(f'{name}_count{_format_labels(labels)} {cumulative}')
+    return '\n'.join(lines) + '\n'
+
+
+class SnapshotStore:
+    """Per-worker snapshot files in a directory shared by all workers"""
+
+    def __init__(self, directory, flush_interval=5.0):
+        self.directory = directory
+        self.flush_interval = flush_interval
+        self._last_write = 0.0
+        self._exit_hook_pid = None
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, master, pid):
+        return _snapshot_path(self.directory, master, pid)
+
+    def write(self, registry, force=False):
+        if self._exit_hook_pid != os.getpid():
+            # Registered by the first write of each serving process, so a
+            # preloading master never writes a snapshot of its own
+            self._exit_hook_pid = os.getpid()
+            atexit.register(self.write, registry, force=True)
+        now = time.monotonic()
+        if not force and now - self._last_write < self.flush_interval:
+            return
+        self._last_write = now
+        path = self._path(os.getppid(), os.getpid())
+        tmp = f'{path}.{threading.get_ident()}.tmp'
+        with open(tmp, 'w') as f:
+            json.dump(registry.snapshot(), f)
+        os.replace(tmp, path)
+
+    def read_all(self):
+        """Snapshots of every worker of this worker's master"""
+        master = os.getppid()
+        snapshots = []
+        for filename in os.listdir(self.directory):
+            if not (filename.startswith('metrics-') and filename.endswith('.json')):
+                continue
+            path = os.path.join(self.directory, filename)
+            try:
+                file_master = int(filename.split('-')[1])
+            except (IndexError, ValueError):
+                continue
+            if file_master != master:
+                if not _pid_alive(file_master):
+                    _remove(path)
+                continue
+            try:
+                with open(path) as f:
+                    snapshots.append(json.load(f))
+            except (OSError, ValueError):
+                continue
+        return snapshots
+
+
+def archive_worker_snapshot(directory, master, pid):
+    """Fold the snapshot of worker ``pid`` into ``master``'s archive and delete it
+
+    Called from gunicorn's child_exit in the master, one worker at a time.
+    Counters and histograms are kept so the totals served by ``/metrics``
+    stay monotonic; gauges (and metrics no longer known) are dropped.
+    """
+    path = _snapshot_path(directory, master, pid)
+    try:
+        with open(path) as f:
+            snapshot = json.load(f)
+    except (OSError, ValueError):
+        snapshot = []
+    kept = [entry for entry in snapshot
+            if entry[0] in METRICS and METRICS[entry[0]][0] != 'gauge']
+    if kept:
+        archive = _snapshot_path(directory, master, 'archive')
+        try:
+            with open(archive) as f:
+                previous = json.load(f)
+        except (OSError, ValueError):
+            previous = []
+        merged = merge_snapshots([previous, kept])
+        tmp = f'{archive}.tmp'
+        with open(tmp, 'w') as f:
+            json.dump([[name, [list(pair) for pair in labels], value]
+                       for (name, labels), value in merged.items()], f)
+        os.replace(tmp, archive)
+    _remove(path)
+
+
+def _snapshot_path(directory, master, pid):
+    # pid is a worker's pid, or 'archive' for the master's retired totals
+    return os.path.join(directory, f'metrics-{master}-{pid}.json')
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+class _RequestState:
+    __slots__ = ('start', 'statements', 'db_seconds', 'size', 'status')
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.statements = 0
+        self.db_seconds = 0.0
+        self.size = 0
+        self.status = None
+
+
+def _before_request():
+    g._metrics = _RequestState()
+
+
+def _after_request(response):
+    state = g.get('_metrics')
+    if state is None:
+        return response
+    state.status = response.status_code
+    if response.is_streamed:
+        def counted(body):
+            try:
+                for chunk in body:
+                    state.size += len(chunk) if isinstance(chunk, bytes) else len(chunk.encode())
+                    yield chunk
+            finally:
+                if hasattr(body, 'close'):
+                    body.close()
+        response.response = counted(response.response)
+    else:
+        state.size = response.calculate_content_length() or 0
+    return response
+
+
+def _teardown_request(exc):
+    state = g.pop('_metrics', None)
+    if state is None or request.endpoint == 'metrics':
+        return
+    registry = current_app.extensions['metrics']
+    labels = (('endpoint', request.endpoint or 'unmatched'), ('method', request.method))
+    status = state.status if state.status is not None else 500
+    registry.record(labels, (
+        ('kinsi_http_request_duration_seconds', time.perf_counter() - state.start),
+        ('kinsi_http_response_size_bytes', state.size),
+        ('kinsi_db_statements_per_request', state.statements),
+        ('kinsi_db_time_seconds', state.db_seconds),
+    ), counter=('kinsi_http_requests_total', (*labels, ('status', str(status)))))
+    store = current_app.extensions.get('metrics_store')
+    if store is not None:
+        store.write(registry)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info['_metrics_start'] = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if has_request_context():
+        state = g.get('_metrics')
+        if state is not None:
+            # Transaction control is timed but not counted as a statement
+            if not statement.startswith(('BEGIN', 'COMMIT', 'ROLLBACK')):
+                state.statements += 1
+            state.db_seconds += time.perf_counter() - conn.info['_metrics_start']
+
+
+def metrics_view():
+    registry = current_app.extensions['metrics']
+    store = current_app.extensions.get('metrics_store')
+    if store is None:
+        merged = merge_snapshots([registry.snapshot()])
+    else:
+        store.write(registry, force=True)
+        merged = merge_snapshots(store.read_all())
+    return Response(render(merged), mimetype='text/plain; version=0.0.4')
+
+
+def init_metrics(app, db):
+    """Wire request hooks, engine events and /metrics; call after db.init_app"""
+    if not app.config.get('METRICS_ENABLED'):
+        return
+    registry = MetricsRegistry()
+    app.extensions['metrics'] = registry
+    directory = app.config.get('METRICS_DIR')
+    if directory:
+        store = SnapshotStore(directory, app.config.get('METRICS_FLUSH_INTERVAL', 5.0))
+        app.extensions['metrics_store'] = store
+
+    app.before_request(_before_request)
+    app.after_request(_after_request)
+    app.teardown_request(_teardown_request)
+    app.add_url_rule('/metrics', 'metrics', metrics_view)
+
+    with app.app_context():
+        engines = list(db.engines.values())
+    for engine in engines:
+        instrument_engine(engine)
+
+
+def instrument_engine(engine):
+    """Count and time statements on an engine created outside Flask-SQLAlchemy"""
+    event.listen(engine, 'before_cursor_execute', _before_cursor_execute)
+    event.listen(engine, 'after_cursor_execute', _after_cursor_execute)
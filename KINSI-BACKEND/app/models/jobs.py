@@ -0,0 +1,44 @@
+from app import db
+from datetime import datetime
+import json
+
+class Job(db.Model):
+    """A unit of background work, leased to one worker at a time (see app/jobs.py)"""
+    __tablename__ = 'jobs'
+    __table_args__ = (
+        # Claiming walks the ready queue; reaping walks the running jobs
+        db.Index('ix_jobs_status_run_at', 'status', 'run_at', 'id'),
+        db.Index('ix_jobs_dedup_key', 'dedup_key', 'status'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    type = db.Column(db.String(50), nullable=False)
+    payload = db.Column(db.Text, nullable=False, default='{}')  # JSON keyword arguments
+    # queued -> running -> done, or back to queued for a retry, or failed
+    status = db.Column(db.String(20), nullable=False, default='queued')
+    dedup_key = db.Column(db.String(200))
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    max_attempts = db.Column(db.Integer, nullable=False, default=5)
+    run_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    lease_owner = db.Column(db.String(100))
+    leased_until = db.Column(db.DateTime)
+    last_error = db.Column(db.Text)
+    result = db.Column(db.Text)  # JSON return value of the handler
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+    
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "type": self.type,
+            "status": self.status,
+            "attempts": self.attempts,
+            "max_attempts": self.max_attempts,
+            "run_at": self.run_at.isoformat() if self.run_at else None,
+            "last_error": self.last_error,
+            "result": json.loads(self.result) if self.result else None,
+            "created_at": self.created_at.isoformat() if self.created_at else None,
+            "started_at": self.started_at.isoformat() if self.started_at else None,
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None,
+        }
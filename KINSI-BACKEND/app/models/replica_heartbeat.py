@@ -0,0 +1,10 @@
+from app import db
+from datetime import datetime
+
+class ReplicaHeartbeat(db.Model):
+    """One row stamped on the primary by `flask replicas heartbeat`/`sync`; its
+    age on a replica is that replica's lag (see app/replicas.py)"""
+    __tablename__ = 'replica_heartbeat'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    beat_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
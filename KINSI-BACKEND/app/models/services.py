@@ -1,8 +1,17 @@
 from app import db
 from datetime import datetime
+import json
 
 class Service(db.Model):
     __tablename__ = 'services'
+    __table_args__ = (
+        # Also serves plain vendor_id lookups (leftmost column)
+        db.Index('ix_services_vendor_id_is_active', 'vendor_id', 'is_active'),
+        # Covers the search category filter without touching the table
+        db.Index('ix_services_category', 'category', 'is_active', 'vendor_id'),
+        # Delta sync (app/sync.py) walks rows in (updated_at, id) order
+        db.Index('ix_services_updated_at', 'updated_at', 'id'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     vendor_id = db.Column(db.Integer, db.ForeignKey('vendors.id'), nullable=False)
@@ -19,21 +28,16 @@ class Service(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
+    def decoded_features(self):
+        """features parsed from JSON, cached on the row until the text changes"""
+        raw = self.features
+        cached = self.__dict__.get('_features_cache')
+        if cached is not None and cached[0] is raw:
+            return cached[1]
+        value = json.loads(raw) if raw else []
+        self._features_cache = (raw, value)
+        return value
+    
     def to_dict(self):
-        import json
-        return {
-            "id": self.id,
-            "vendor_id": self.vendor_id,
-            "service_name": self.service_name,
-            "category": self.category,
-            "price": self.price,
-            "duration": self.duration,
-            "description": self.description,
-            "features": json.loads(self.features) if self.features else [],
-            "views": self.views,
-            "inquiries": self.inquiries,
-            "bookings": self.bookings,
-            "is_active": self.is_active,
-            "created_at": self.created_at.isoformat() if self.created_at else None,
-            "updated_at": self.updated_at.isoformat() if self.updated_at else None,
-        }
\ No newline at end of file
+        from app.serializers import serialize_service
+        return serialize_service(self, native_datetimes=False)
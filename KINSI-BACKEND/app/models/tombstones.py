@@ -0,0 +1,16 @@
+from app import db
+from datetime import datetime
+
+class Tombstone(db.Model):
+    """A deleted vendor or service, kept so delta sync clients learn about
+    the delete (see app/sync.py)"""
+    __tablename__ = 'tombstones'
+    __table_args__ = (
+        db.Index('ix_tombstones_deleted_at', 'deleted_at', 'id'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    table_name = db.Column(db.String(50), nullable=False)
+    record_id = db.Column(db.Integer, nullable=False)
+    vendor_id = db.Column(db.Integer)
+    deleted_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
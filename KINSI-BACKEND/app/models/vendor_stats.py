@@ -0,0 +1,20 @@
+from app import db
+
+class VendorStats(db.Model):
+    """Per-vendor rollup of service counts and counters, kept up to date by
+    the write paths so the stats endpoint is a primary-key lookup"""
+    __tablename__ = 'vendor_stats'
+    
+    vendor_id = db.Column(db.Integer, db.ForeignKey('vendors.id', ondelete='CASCADE'), primary_key=True)
+    total_services = db.Column(db.Integer, nullable=False, default=0)
+    total_views = db.Column(db.Integer, nullable=False, default=0)
+    total_inquiries = db.Column(db.Integer, nullable=False, default=0)
+    total_bookings = db.Column(db.Integer, nullable=False, default=0)
+    
+    def to_dict(self):
+        return {
+            "total_services": self.total_services,
+            "total_views": self.total_views,
+            "total_inquiries": self.total_inquiries,
+            "total_bookings": self.total_bookings,
+        }
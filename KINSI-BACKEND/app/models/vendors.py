@@ -3,6 +3,16 @@ from datetime import datetime
 
 class Vendor(db.Model):
     __tablename__ = 'vendors'
+    __table_args__ = (
+        db.Index('ix_vendors_is_active_rating', 'is_active', 'rating'),
+        db.Index('ix_vendors_service_type', 'service_type'),
+        # Facet counts per service_type (app/facets.py), covering
+        db.Index('ix_vendors_is_active_service_type', 'is_active', 'service_type'),
+        # Nearby search prefilter (app/geo.py), covering
+        db.Index('ix_vendors_geo', 'geo_cell', 'latitude', 'longitude', 'is_active'),
+        # Delta sync (app/sync.py) walks rows in (updated_at, id) order
+        db.Index('ix_vendors_updated_at', 'updated_at', 'id'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, nullable=False, unique=True)
@@ -21,6 +31,9 @@ class Vendor(db.Model):
     is_active = db.Column(db.Boolean, default=True)
     rating = db.Column(db.Float, default=0.0)
     total_reviews = db.Column(db.Integer, default=0)
+    latitude = db.Column(db.Float)
+    longitude = db.Column(db.Float)
+    geo_cell = db.Column(db.Integer)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
@@ -28,24 +41,5 @@ class Vendor(db.Model):
     services = db.relationship('Service', backref='vendor', lazy=True, cascade='all, delete-orphan')
     
     def to_dict(self):
-        return {
-            "id": self.id,
-            "user_id": self.user_id,
-            "business_name": self.business_name,
-            "owner_name": self.owner_name,
-            "email": self.email,
-            "service_type": self.service_type,
-            "description": self.description,
-            "contact_phone": self.contact_phone,
-            "address": self.address,
-            "experience": self.experience,
-            "website": self.website,
-            "instagram": self.instagram,
-            "facebook": self.facebook,
-            "twitter": self.twitter,
-            "is_active": self.is_active,
-            "rating": self.rating,
-            "total_reviews": self.total_reviews,
-            "created_at": self.created_at.isoformat() if self.created_at else None,
-            "updated_at": self.updated_at.isoformat() if self.updated_at else None,
-        }
\ No newline at end of file
+        from app.serializers import serialize_vendor
+        return serialize_vendor(self, native_datetimes=False)
@@ -0,0 +1,161 @@
+# app/query_debug.py
+"""Development/staging query debugging: N+1 detection, slow-query log and
+per-route query budgets.
+
+With QUERY_DEBUG on, every statement a request runs is recorded through
+SQLAlchemy cursor events. When the request ends:
+
+* statements are reduced to a fingerprint (literals, bound values, IN lists
+  and multi-row VALUES collapsed) and any shape run QUERY_REPEAT_THRESHOLD
+  times or more is reported as a likely N+1,
+* statements slower than QUERY_SLOW_MS are logged with their parameters
+  and query plan,
+* the statement count is checked against the route's budget, declared with
+  ``@query_budget(...)`` under the route decorator.
+
+Problems are logged as warnings. With QUERY_BUDGET_STRICT they raise
+QueryBudgetExceeded instead, so a test client request (and
+``flask check-query-plans``) fails. Transaction control (BEGIN, COMMIT,
+ROLLBACK) is not counted.
+"""
+import logging
+import re
+import time
+from collections import Counter
+from functools import lru_cache
+
+from flask import current_app, g, has_request_context, request
+from sqlalchemy import event
+
+logger = logging.getLogger(__name__)
+
+_TRANSACTION_CONTROL = ('BEGIN', 'COMMIT', 'ROLLBACK', 'SAVEPOINT', 'RELEASE')
+
+_STRING_RE = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_RE = re.compile(r'(?<![\w.])-?\d+(?:\.\d+)?\b')
+_NAMED_PARAM_RE = re.compile(r'(?::\w+|%\(\w+\)s|%s|\$\d+)')
+_IN_LIST_RE = re.compile(r'\bIN\s*\(\s*\?(?:\s*,\s*\?)*\s*\)', re.I)
+_VALUES_RE = re.compile(r'(\(\s*\?(?:\s*,\s*\?)*\s*\))(?:\s*,\s*\(\s*\?(?:\s*,\s*\?)*\s*\))+')
+_SPACE_RE = re.compile(r'\s+')
+
+
+class QueryBudgetExceeded(Exception):
+    """A request ran more statements, or repeated a shape more often, than allowed"""
+
+
+@lru_cache(maxsize=2048)
+def fingerprint(statement):
+    """Normalize a statement so executions that differ only in values match"""
+    shape = _STRING_RE.sub('?', statement)
+    shape = _NAMED_PARAM_RE.sub('?', shape)
+    shape = _NUMBER_RE.sub('?', shape)
+    shape = _IN_LIST_RE.sub('IN (...)', shape)
+    shape = _VALUES_RE.sub(r'\1, ...', shape)
+    return _SPACE_RE.sub(' ', shape).strip()
+
+
+def query_budget(statements=None, repeats=True):
+    """Declare how many statements a view may run per request.
+
+    ``repeats=False`` turns off N+1 detection for views that repeat a shape
+    by design (e.g. one batch query per chunk while streaming an export).
+    """
+    def decorator(view):
+        view._query_budget = (statements, repeats)
+        return view
+    return decorator
+
+
+def _before_request():
+    g._query_log = []
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info['_query_debug_start'] = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if not has_request_context():
+        return
+    log = g.get('_query_log')
+    if log is None:
+        return
+    elapsed = time.perf_counter() - conn.info['_query_debug_start']
+    if executemany:
+        parameters = parameters[0] if parameters else ()
+    log.append((statement, parameters, elapsed, conn.engine))
+
+
+def _explain(engine, statement, parameters):
+    from app.query_plans import explain
+    prefix = 'EXPLAIN QUERY PLAN' if engine.dialect.name == 'sqlite' else 'EXPLAIN'
+    connection = engine.raw_connection()
+    try:
+        return explain(connection, statement, parameters, prefix)
+    except Exception as e:
+        return [f"(EXPLAIN failed: {e})"]
+    finally:
+        connection.close()
+
+
+def _is_transaction_control(statement):
+    return statement.lstrip().upper().startswith(_TRANSACTION_CONTROL)
+
+
+def analyze_statements(log, budget=None, allow_repeats=False, repeat_threshold=5):
+    """Return the budget and N+1 problems (messages) of one request's statements"""
+    counted = [entry for entry in log if not _is_transaction_control(entry[0])]
+    problems = []
+    if budget is not None and len(counted) > budget:
+        problems.append(f"ran {len(counted)} statements, budget is {budget}")
+    if not allow_repeats:
+        shapes = Counter(fingerprint(entry[0]) for entry in counted)
+        for shape, count in shapes.most_common():
+            if count < repeat_threshold:
+                break
+            problems.append(f"possible N+1: ran {count} times: {shape}")
+    return problems
+
+
+def _teardown_request(exc):
+    log = g.pop('_query_log', None)
+    if log is None:
+        return
+    config = current_app.config
+    endpoint = request.endpoint or 'unmatched'
+
+    slow_seconds = config.get('QUERY_SLOW_MS', 100) / 1000
+    for statement, parameters, elapsed, engine in log:
+        if elapsed >= slow_seconds and not _is_transaction_control(statement):
+            plan = '\n    '.join(_explain(engine, statement, parameters))
+            logger.warning("Slow query in %s (%.1f ms): %s\n  parameters: %r\n  plan:\n    %s",
+                           endpoint, elapsed * 1000, statement, parameters, plan)
+
+    view = current_app.view_functions.get(request.endpoint)
+    budget, repeats = getattr(view, '_query_budget', (None, True))
+    problems = analyze_statements(log, budget, allow_repeats=not repeats,
+                                  repeat_threshold=config.get('QUERY_REPEAT_THRESHOLD', 5))
+    if not problems:
+        return
+    message = f"{request.method} {request.path} ({endpoint}): " + '; '.join(problems)
+    if config.get('QUERY_BUDGET_STRICT'):
+        raise QueryBudgetExceeded(message)
+    logger.warning(message)
+
+
+def init_query_debug(app, db):
+    """Record statements per request when QUERY_DEBUG is on; call after db.init_app"""
+    if not app.config.get('QUERY_DEBUG'):
+        return
+    app.before_request(_before_request)
+    app.teardown_request(_teardown_request)
+    with app.app_context():
+        engines = list(db.engines.values())
+    for engine in engines:
+        instrument_engine(engine)
+
+
+def instrument_engine(engine):
+    """Record statements of an engine created outside Flask-SQLAlchemy"""
+    event.listen(engine, 'before_cursor_execute', _before_cursor_execute)
+    event.listen(engine, 'after_cursor_execute', _after_cursor_execute)
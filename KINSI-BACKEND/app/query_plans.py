@@ -0,0 +1,232 @@
+# app/query_plans.py
+"""Query-plan regression check.
+
+``flask check-query-plans`` replays a fixed set of API requests against a
+scratch SQLite database, records every statement the requests issue and
+runs ``EXPLAIN QUERY PLAN`` on each. Query budgets and N+1 detection
+(app/query_debug.py) run in strict mode, so overruns fail the check too. Any full table scan is reported and
+makes the command exit non-zero, so a dropped index or a filter that stops
+being sargable shows up before it reaches a large catalog. Scans that are
+intentional (the export reads every vendor) are listed in ALLOWED_SCANS.
+
+The routes of the app the command runs under are mirrored onto the scratch
+app, so views registered outside the blueprints are checked too.
+"""
+import os
+import re
+import tempfile
+from contextlib import contextmanager
+
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from sqlalchemy import event
+from werkzeug.exceptions import HTTPException
+
+# Plan rows that read a whole table, e.g. "SCAN vendors" or "SCAN s"
+_SCAN_RE = re.compile(r'^SCAN (?!CONSTANT ROW|\d+ CONSTANT ROWS)(\w+)(?!.*VIRTUAL TABLE)')
+_SKIP_RE = re.compile(r'^\s*(BEGIN|COMMIT|ROLLBACK|PRAGMA|SAVEPOINT|RELEASE|EXPLAIN|CREATE)\b', re.I)
+
+# endpoint -> tables that endpoint is expected to scan in full
+ALLOWED_SCANS = {
+    'vendor_bp.export_vendors': {'vendors'},
+    # Facet counts aggregate every active service; the response is cached
+    'vendor_bp.vendor_facets': {'s'},
+}
+
+# Endpoints that never touch the database
+_NO_DB_ENDPOINTS = {'static', 'core_bp.hello', 'core_bp.test', 'metrics'}
+
+_IMPORT_BODY = (
+    '{"user_id": 3, "business_name": "Imported Blooms", "service_type": "Flowers", '
+    '"services": [{"service_name": "Table Flowers", "category": "Flowers", "price": 300}]}\n'
+    '{"user_id": 1, "business_name": "Golden Hour Photography"}\n'
+)
+
+# (method, path, request kwargs); ids refer to rows the earlier requests create
+SCENARIOS = [
+    ('POST', '/api/vendor/profile', {'json': {
+        'user_id': 1, 'business_name': 'Golden Hour Photography',
+        'service_type': 'Photography', 'description': 'Candid wedding photography',
+        'address': '12 Waiyaki Way, Westlands, Nairobi'}}),
+    ('POST', '/api/vendor/profile', {'json': {
+        'user_id': 2, 'business_name': 'Sweet Layers Cakes', 'service_type': 'Catering',
+        'latitude': -1.2921, 'longitude': 36.8219}}),
+    ('POST', '/api/vendor/profile', {'json': {'user_id': 1, 'owner_name': 'Ana'}}),
+    ('POST', '/api/vendor/services', {'json': {
+        'vendor_id': 1, 'service_name': 'Full Day Coverage', 'category': 'Photography',
+        'price': 2500, 'features': ['Second shooter', 'Album']}}),
+    ('POST', '/api/vendor/services', {'json': {
+        'vendor_id': 2, 'service_name': 'Three Tier Cake', 'category': 'Catering', 'price': 600}}),
+    ('PUT', '/api/vendor/services/1', {'json': {'price': 2700}}),
+    ('POST', '/api/vendor/services/1/counters', {'json': {'views': 3, 'inquiries': 1}}),
+    ('POST', '/api/vendor/services/counters', {'json': {'increments': [
+        {'service_id': 1, 'views': 1}, {'service_id': 2, 'bookings': 1}]}}),
+    ('POST', '/api/vendors/import', {'data': _IMPORT_BODY, 'content_type': 'application/x-ndjson'}),
+    ('POST', '/api/vendors/import?async=1', {'data': _IMPORT_BODY, 'content_type': 'application/x-ndjson'}),
+    ('GET', '/api/jobs/1', {}),
+    ('GET', '/api/vendor/profile/1', {}),
+    ('GET', '/api/vendor/profile/1?fields=id,business_name', {}),
+    ('GET', '/api/vendor/stats/1', {}),
+    ('GET', '/api/vendor/dashboard/1', {}),
+    ('GET', '/api/vendor/services/1', {}),
+    ('GET', '/api/vendors?limit=1', {}),
+    ('GET', '/api/vendors?limit=1&cursor=1', {}),
+    ('GET', '/api/vendors/search?q=photo', {}),
+    ('GET', '/api/vendors/search?category=Photography', {}),
+    ('GET', '/api/vendors/search?q=cake&category=Catering', {}),
+    ('GET', '/api/vendors/facets', {}),
+    ('GET', '/api/vendors/facets?q=photo&category=Photography', {}),
+    ('GET', '/api/vendors/nearby?lat=-1.2864&lng=36.8172', {}),
+    ('GET', '/api/vendors/nearby?lat=-1.2864&lng=36.8172&radius_km=50&category=Catering', {}),
+    ('GET', '/api/vendors/leaderboards/top_rated', {}),
+    ('GET', '/api/vendors/changes', {}),
+    ('GET', '/api/vendors/changes?limit=1', {}),
+    ('GET', '/api/vendors/export', {}),
+    ('DELETE', '/api/vendor/services/2', {}),
+    ('GET', '/api/vendors/leaderboards/most_booked?service_type=Catering', {}),
+]
+
+
+def scan_tables(plan_details):
+    """Names of the tables (or aliases) a plan reads in full"""
+    tables = []
+    for detail in plan_details:
+        match = _SCAN_RE.match(detail)
+        if match:
+            tables.append(match.group(1))
+    return tables
+
+
+def explain(connection, statement, parameters, prefix='EXPLAIN QUERY PLAN'):
+    """Return the last column of each plan row for a DBAPI statement"""
+    cursor = connection.cursor()
+    try:
+        cursor.execute(f"{prefix} {statement}", parameters)
+        return [row[-1] for row in cursor.fetchall()]
+    finally:
+        cursor.close()
+
+
+@contextmanager
+def capture_statements(engines):
+    """Collect (statement, parameters) for everything executed on the engines"""
+    captured = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if _SKIP_RE.match(statement):
+            return
+        if executemany:
+            parameters = parameters[0] if parameters else ()
+        captured.append((statement, parameters))
+
+    for engine in engines:
+        event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        yield captured
+    finally:
+        for engine in engines:
+            event.remove(engine, 'before_cursor_execute', before_cursor_execute)
+
+
+def _scratch_app(source_app, database_path):
+    from app import create_app
+    from app.config import Config
+    from app.schema import create_schema
+
+    config = type('QueryPlanConfig', (Config,), {
+        'SQLALCHEMY_DATABASE_URI': 'sqlite:///' + database_path,
+        'RESPONSE_CACHE_BACKEND': None,
+        'COUNTER_FLUSH_INTERVAL': 0,
+        'LEADERBOARD_REFRESH_INTERVAL': 0,
+        'ADMISSION_ENABLED': False,
+        'JOB_DATA_DIR': os.path.join(os.path.dirname(database_path), 'jobs'),
+        'QUERY_DEBUG': True,
+        'QUERY_BUDGET_STRICT': True,
+        'QUERY_SLOW_MS': 60_000,
+        'TESTING': True,
+    })
+    app = create_app(config)
+    for rule in source_app.url_map.iter_rules():
+        if rule.endpoint not in app.view_functions and rule.endpoint != 'static':
+            app.add_url_rule(rule.rule, rule.endpoint, source_app.view_functions[rule.endpoint],
+                             methods=rule.methods)
+    with app.app_context():
+        create_schema()
+    return app
+
+
+def check_query_plans(source_app, scenarios=SCENARIOS, allowed_scans=ALLOWED_SCANS):
+    """Run the scenarios on a scratch database.
+
+    Returns (problems, budget violations, uncovered endpoints, skipped
+    scenarios); each problem is (method, path, statement, plan details,
+    scanned tables). Scenarios whose route the app does not have are
+    skipped.
+    """
+    from app import db
+    from app.query_debug import QueryBudgetExceeded
+
+    problems, violations, hit, skipped = [], [], set(), []
+    with tempfile.TemporaryDirectory() as tmp:
+        app = _scratch_app(source_app, os.path.join(tmp, 'plans.db'))
+        client = app.test_client()
+        with app.app_context():
+            engines = list(db.engines.values())
+        for method, path, kwargs in scenarios:
+            try:
+                endpoint = app.url_map.bind('localhost').match(path.split('?')[0], method=method)[0]
+            except HTTPException:
+                skipped.append(f"{method} {path}")
+                continue
+            hit.add(endpoint)
+            with capture_statements(engines) as statements:
+                try:
+                    response = client.open(path, method=method, **kwargs)
+                    response.get_data()
+                except QueryBudgetExceeded as e:
+                    violations.append(str(e))
+                    continue
+            if response.status_code >= 500:
+                raise click.ClickException(
+                    f"{method} {path} failed with {response.status_code}: {response.get_data(as_text=True)}")
+
+            with app.app_context():
+                connection = db.engine.raw_connection()
+                try:
+                    for statement, parameters in statements:
+                        details = explain(connection, statement, parameters)
+                        scanned = [table for table in scan_tables(details)
+                                   if table not in allowed_scans.get(endpoint, ())]
+                        if scanned:
+                            problems.append((method, path, statement, details, scanned))
+                finally:
+                    connection.close()
+        for engine in engines:
+            engine.dispose()
+
+        uncovered = sorted(rule.endpoint for rule in app.url_map.iter_rules()
+                           if rule.endpoint not in hit and rule.endpoint not in _NO_DB_ENDPOINTS)
+    return problems, violations, uncovered, skipped
+
+
+@click.command('check-query-plans')
+@with_appcontext
+def check_query_plans_command():
+    """Fail if any API request plans a full table scan."""
+    problems, violations, uncovered, skipped = check_query_plans(current_app._get_current_object())
+    for scenario in skipped:
+        click.echo(f"warning: skipped {scenario}, route not registered")
+    for endpoint in uncovered:
+        click.echo(f"warning: no scenario covers {endpoint}")
+    for method, path, statement, details, scanned in problems:
+        click.echo(f"\n{method} {path} scans {', '.join(scanned)}:\n  {statement}")
+        for detail in details:
+            click.echo(f"    {detail}")
+    for violation in violations:
+        click.echo(f"\nquery budget exceeded: {violation}")
+    if problems or violations:
+        raise click.ClickException(f"{len(problems)} statements scan a full table, "
+                                   f"{len(violations)} requests exceed their query budget")
+    click.echo(f"Checked {len(SCENARIOS) - len(skipped)} requests, "
+               "no full table scans or query budget overruns")
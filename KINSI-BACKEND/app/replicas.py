@@ -0,0 +1,276 @@
+# app/replicas.py
+"""Read replicas: routing, lag tolerance and fallback to the primary.
+
+Every DB_REPLICA_URLS entry gets a query_only bind (app/engine.py). The
+first read of a GET/HEAD request picks one replica, round robin among
+those that are fit, and the rest of the request reads from it. Writes,
+and reads after a flush, go to the primary. When no replica is fit the
+request reads from the primary's ``readonly`` pool, so a broken or
+lagging replica costs capacity, not availability. A replica whose query
+fails is taken out of rotation at once, and the request runs that
+statement again, and the rest of its reads, on the primary's read pool.
+
+Lag is measured the pt-heartbeat way: ``flask replicas heartbeat`` (or
+``sync``) stamps one row on the primary every few seconds, and a monitor
+thread in each worker reads it back from every replica each
+DB_REPLICA_CHECK_INTERVAL seconds. A replica's lag is the age of the stamp
+it has, so it keeps growing between checks and when replication or the
+heartbeat stops. Replicas more than DB_REPLICA_MAX_LAG_SECONDS behind,
+or whose check or queries failed (until a check succeeds again), are
+skipped.
+
+Read-your-writes: a successful write request sets a cookie that sends
+the client's reads to the primary for DB_REPLICA_STICKY_SECONDS, longer
+than a fit replica can be behind. CORS allows credentials for
+CORS_ORIGINS, so the SPA gets the cookie back when it sends its requests
+with credentials. Code whose reads must see the primary
+(the delta sync feed, in-process state rebuilt after this worker's own
+writes) calls ``engine.use_primary()``. The response cache and the vendor
+identity cache do not store what was read from a replica older than
+their last invalidation (``engine.replica_snapshot``).
+
+``flask replicas sync`` stands in for replication with local SQLite
+files: it stamps the heartbeat and copies the primary into every SQLite
+replica with the online backup API, every ``--interval`` seconds.
+"""
+import logging
+import sqlite3
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timezone
+from itertools import count
+
+import click
+from flask import current_app, request
+from flask.cli import AppGroup
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+
+from app import db
+from app.engine import READ_BIND_KEY, begin_write, is_replica_bind
+from app.models.replica_heartbeat import ReplicaHeartbeat
+
+logger = logging.getLogger(__name__)
+
+STICKY_COOKIE = 'kinsi_primary_until'
+WRITE_METHODS = frozenset(['POST', 'PUT', 'PATCH', 'DELETE'])
+
+
+def _epoch(value):
+    return value.replace(tzinfo=timezone.utc).timestamp() if value is not None else None
+
+
+class Replica:
+    """What the monitor last learned about one replica bind"""
+
+    def __init__(self, key, engine):
+        self.key = key
+        self.engine = engine
+        self.beat = None  # heartbeat it has replicated, in epoch seconds
+        self.healthy = False
+        self.error = None
+        self.checked_at = None
+
+    def lag(self, now=None):
+        return None if self.beat is None else max(0.0, (now or time.time()) - self.beat)
+
+    def to_dict(self):
+        lag = self.lag()
+        return {
+            "bind": self.key,
+            "url": self.engine.url.render_as_string(hide_password=True),
+            "healthy": self.healthy,
+            "lag_seconds": round(lag, 3) if lag is not None else None,
+            "error": self.error,
+        }
+
+
+class ReplicaSet:
+    """The replicas of one process and the thread that checks them"""
+
+    def __init__(self, engines, max_lag=5.0, check_interval=1.0, sticky_seconds=6.0):
+        self.replicas = [Replica(key, engine) for key, engine in sorted(engines.items())]
+        self.max_lag = max_lag
+        self.check_interval = check_interval
+        self.sticky_seconds = sticky_seconds
+        # Reads routed per bind key, 'readonly' being the primary
+        self.counts = Counter()
+        self._turn = count()
+        self._lock = threading.Lock()
+        self._thread = None
+        for replica in self.replicas:
+            event.listen(replica.engine, 'handle_error', self._on_error(replica))
+
+    def route(self):
+        """(bind key, replicated heartbeat) for the current request"""
+        if request.cookies.get(STICKY_COOKIE, type=float, default=0.0) > time.time():
+            return self._count(READ_BIND_KEY), None
+        return self.choose()
+
+    def choose(self):
+        """A fit replica round robin, or the primary's read pool"""
+        self._ensure_thread()
+        now = time.time()
+        fit = [replica for replica in self.replicas
+               if replica.healthy and replica.lag(now) <= self.max_lag]
+        if not fit:
+            return self._count(READ_BIND_KEY), None
+        replica = fit[next(self._turn) % len(fit)]
+        return self._count(replica.key), replica.beat
+
+    def _count(self, key):
+        with self._lock:
+            self.counts[key] += 1
+        registry = current_app.extensions.get('metrics')
+        if registry is not None:
+            registry.inc('kinsi_db_read_routes_total', (('bind', key),))
+        return key
+
+    def check(self):
+        """Read every replica's heartbeat; a failure marks it unhealthy"""
+        for replica in self.replicas:
+            try:
+                with replica.engine.connect() as connection:
+                    beat = connection.execute(
+                        db.select(ReplicaHeartbeat.beat_at).where(ReplicaHeartbeat.id == 1)).scalar()
+            except Exception as e:
+                if replica.healthy or replica.error is None:
+                    logger.warning("Replica %s failed its check: %s", replica.key, e)
+                replica.healthy, replica.error = False, str(e)
+            else:
+                replica.beat = _epoch(beat)
+                replica.healthy, replica.error = beat is not None, \
+                    None if beat is not None else "no heartbeat replicated yet"
+            replica.checked_at = time.time()
+
+    def _on_error(self, replica):
+        def handle_error(context):
+            dbapi = context.dialect.dbapi
+            if dbapi is not None and isinstance(context.original_exception,
+                                                (dbapi.OperationalError, dbapi.InterfaceError)):
+                # Out of rotation until the next successful check
+                replica.healthy, replica.error = False, str(context.original_exception)
+        return handle_error
+
+    def status(self):
+        with self._lock:
+            counts = dict(self.counts)
+        return {"replicas": [replica.to_dict() for replica in self.replicas], "reads": counts}
+
+    def _ensure_thread(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            # Started on first use so a preloading parent never forks with a live thread
+            self._thread = threading.Thread(target=self._run, name='replica-monitor', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            try:
+                self.check()
+            except Exception:
+                logger.exception("Replica check failed")
+            time.sleep(self.check_interval)
+
+
+def _sticky_after_write(response):
+    replicas = current_app.extensions.get('replicas')
+    if replicas is not None and request.method in WRITE_METHODS and response.status_code < 400:
+        response.set_cookie(STICKY_COOKIE, f'{time.time() + replicas.sticky_seconds:.3f}',
+                            max_age=int(replicas.sticky_seconds) + 1, httponly=True, samesite='Lax')
+    return response
+
+
+def init_replicas(app):
+    """Set up routing to the replica binds; call after db.init_app"""
+    with app.app_context():
+        engines = {key: engine for key, engine in db.engines.items() if is_replica_bind(key)}
+    if not engines:
+        app.extensions['replicas'] = None
+        return
+    max_lag = app.config.get('DB_REPLICA_MAX_LAG_SECONDS', 5.0)
+    check_interval = app.config.get('DB_REPLICA_CHECK_INTERVAL', 1.0)
+    sticky = app.config.get('DB_REPLICA_STICKY_SECONDS') or max_lag + check_interval
+    app.extensions['replicas'] = ReplicaSet(engines, max_lag, check_interval, sticky)
+    app.after_request(_sticky_after_write)
+
+
+def get_replicas():
+    return current_app.extensions.get('replicas')
+
+
+def stamp_heartbeat():
+    """Stamp the heartbeat row on the primary and commit"""
+    begin_write(db.session)
+    heartbeat = db.session.get(ReplicaHeartbeat, 1)
+    if heartbeat is None:
+        db.session.add(ReplicaHeartbeat(id=1, beat_at=datetime.utcnow()))
+    else:
+        heartbeat.beat_at = datetime.utcnow()
+    db.session.commit()
+
+
+def copy_to_sqlite_replicas():
+    """Copy the primary file into every SQLite replica; returns the paths written"""
+    source = sqlite3.connect(make_url(current_app.config['SQLALCHEMY_DATABASE_URI']).database)
+    written = []
+    try:
+        for uri in current_app.config.get('DB_REPLICA_URLS') or ():
+            url = make_url(uri)
+            if url.get_backend_name() != 'sqlite' or url.database in (None, '', ':memory:'):
+                continue
+            target = sqlite3.connect(url.database, timeout=30)
+            try:
+                source.backup(target)
+            finally:
+                target.close()
+            written.append(url.database)
+    finally:
+        source.close()
+    return written
+
+
+replicas_cli = AppGroup('replicas', help="Read replica heartbeat, local sync and status.")
+
+
+@replicas_cli.command('heartbeat')
+@click.option('--interval', type=float, default=1.0, show_default=True)
+def heartbeat_command(interval):
+    """Stamp the heartbeat on the primary every INTERVAL seconds."""
+    while True:
+        stamp_heartbeat()
+        time.sleep(interval)
+
+
+@replicas_cli.command('sync')
+@click.option('--interval', type=float, default=0,
+              help="Repeat every INTERVAL seconds (default: once).")
+def sync_command(interval):
+    """Stamp the heartbeat, then copy the primary into the SQLite replicas."""
+    while True:
+        stamp_heartbeat()
+        start = time.perf_counter()
+        written = copy_to_sqlite_replicas()
+        if not interval:
+            click.echo(f"Copied to {len(written)} replicas in {time.perf_counter() - start:.2f} s")
+            return
+        time.sleep(max(0.0, interval - (time.perf_counter() - start)))
+
+
+@replicas_cli.command('status')
+def status_command():
+    """Check every replica once and print its health and lag."""
+    replicas = get_replicas()
+    if replicas is None:
+        click.echo("No replicas configured (DATABASE_REPLICA_URLS)")
+        return
+    replicas.check()
+    for replica in replicas.replicas:
+        state = replica.to_dict()
+        click.echo(f"{state['bind']}: {'healthy' if state['healthy'] else 'unhealthy'}, "
+                   f"lag {state['lag_seconds']} s{', ' + state['error'].splitlines()[0] if state['error'] else ''}"
+                   f" ({state['url']})")
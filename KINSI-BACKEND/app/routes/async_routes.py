@@ -0,0 +1,129 @@
+# app/routes/async_routes.py
+"""Async versions of the hot read endpoints, served by app/asgi.py.
+
+Each coroutine is registered under the endpoint name of its sync view and
+shares that view's request parsing, query builders and response helpers,
+so the two return the same JSON, statuses and error messages; only the
+statements are awaited. It runs inside a Flask request context and gets
+an AsyncSession on the read-only aiosqlite engine. Response caching is
+applied by the caller, with the sync view's tags.
+"""
+from flask import jsonify, request
+from sqlalchemy import text
+from app.facets import build_facets_query, facet_rows_to_dict
+from app.search import build_search_query
+from app.stats import VENDOR_STATS_ROW_SQL, stats_row_to_dict
+from app.routes.service_routes import active_services_query
+from app.routes.vendor_routes import (catalog_page, catalog_query, catalog_request, facets_request,
+                                      profile_not_found, search_request, search_response,
+                                      search_results_query, vendor_stats_response)
+from app.serializers import SERVICE_FIELDS, VENDOR_FIELDS, parse_fields, serialize_service
+from app.vendor_cache import lookup_vendor, project, remember_vendor, vendor_query
+
+async def find_vendor(session, vendor_id=None, user_id=None):
+    """app.vendor_cache.find_vendor with the miss's query on the async session"""
+    record, generation = lookup_vendor(vendor_id, user_id)
+    if record is not None:
+        return record
+    vendor = (await session.scalars(vendor_query(vendor_id, user_id))).first()
+    return remember_vendor(vendor, generation)
+
+async def get_vendor_profile(session, user_id):
+    """Get vendor profile by user_id (``?fields=`` selects columns)"""
+    try:
+        fields, _ = parse_fields(request.args.get('fields'), VENDOR_FIELDS)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    
+    try:
+        vendor = await find_vendor(session, user_id=user_id)
+        
+        if not vendor:
+            return profile_not_found()
+        
+        return jsonify(project(vendor, fields)), 200
+    
+    except Exception as e:
+        return jsonify({"error": f"Database error: {str(e)}"}), 500
+
+async def get_vendor_stats(session, vendor_id):
+    """Get vendor statistics from the vendor_stats rollup"""
+    try:
+        row = (await session.execute(text(VENDOR_STATS_ROW_SQL), {"id": vendor_id})).first()
+        return vendor_stats_response(stats_row_to_dict(row))
+    
+    except Exception as e:
+        return jsonify({"error": f"Database error: {str(e)}"}), 500
+
+async def get_all_vendors(session):
+    """Get one page of vendors with their services (keyset-paginated on id)"""
+    try:
+        try:
+            limit, cursor, fields, service_fields = catalog_request()
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        vendors = (await session.scalars(catalog_query(limit, cursor, fields, service_fields))).all()
+        return catalog_page(vendors, limit, fields, service_fields)
+    
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+async def search_vendors(session):
+    """Full-text search over vendors and their services, best match first"""
+    try:
+        query, category, limit, offset, fields, service_fields = search_request()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    
+    try:
+        sql, params = build_search_query(query, category=category, limit=limit, offset=offset)
+        vendor_ids = (await session.execute(text(sql), params)).scalars().all()
+        vendors = (await session.scalars(
+            search_results_query(vendor_ids, fields, service_fields))).all() if vendor_ids else []
+        return search_response(vendor_ids, vendors, fields, service_fields)
+    
+    except Exception as e:
+        return jsonify({"error": f"Database error: {str(e)}"}), 500
+
+async def vendor_facets(session):
+    """Vendor counts per service type, category, price range and rating band"""
+    try:
+        query, category = facets_request()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    
+    try:
+        sql, params = build_facets_query(query, category)
+        rows = (await session.execute(text(sql), params)).all()
+        return jsonify(facet_rows_to_dict(rows)), 200
+    
+    except Exception as e:
+        return jsonify({"error": f"Database error: {str(e)}"}), 500
+
+async def get_vendor_services(session, vendor_id):
+    """Get all active services for a vendor (``?fields=`` selects columns)"""
+    try:
+        fields, _ = parse_fields(request.args.get('fields'), SERVICE_FIELDS)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    
+    try:
+        if not await find_vendor(session, vendor_id):
+            return jsonify({"error": "Vendor not found"}), 404
+        
+        services = (await session.scalars(active_services_query(vendor_id, fields))).all()
+        return jsonify([serialize_service(service, fields) for service in services]), 200
+    
+    except Exception as e:
+        return jsonify({"error": f"Database error: {str(e)}"}), 500
+
+# Sync endpoint name -> async handler
+ASYNC_VIEWS = {
+    'vendor_bp.get_vendor_profile': get_vendor_profile,
+    'vendor_bp.get_vendor_stats': get_vendor_stats,
+    'vendor_bp.get_all_vendors': get_all_vendors,
+    'vendor_bp.search_vendors': search_vendors,
+    'vendor_bp.vendor_facets': vendor_facets,
+    'service_bp.get_vendor_services': get_vendor_services,
+}
@@ -0,0 +1,30 @@
+from flask import Blueprint, jsonify
+from app import db
+
+core_bp = Blueprint("core_bp", __name__)
+
+@core_bp.route('/')
+def hello():
+    return "Welcome to the Wedding Vendor API!"
+
+@core_bp.route('/api/test')
+def test():
+    return jsonify({
+        "message": "API is working!",
+        "status": "success",
+        "endpoints": [
+            "GET /api/vendor/profile/<user_id>",
+            "POST /api/vendor/profile",
+            "GET /api/vendor/stats/<vendor_id>",
+            "GET /api/vendors?limit=&cursor="
+        ]
+    })
+
+@core_bp.app_errorhandler(404)
+def not_found(error):
+    return jsonify({"error": "Endpoint not found"}), 404
+
+@core_bp.app_errorhandler(500)
+def internal_error(error):
+    db.session.rollback()
+    return jsonify({"error": "Internal server error"}), 500
@@ -0,0 +1,20 @@
+from flask import Blueprint, jsonify
+from app import db
+from app.models.jobs import Job
+from app.query_debug import query_budget
+
+job_bp = Blueprint("job_bp", __name__)
+
+@job_bp.route('/jobs/<int:job_id>', methods=['GET'])
+@query_budget(1)
+def get_job(job_id):
+    """Status of a background job, with its result once it is done"""
+    try:
+        job = db.session.get(Job, job_id)
+        if job is None:
+            return jsonify({"error": "Job not found"}), 404
+        
+        return jsonify(job.to_dict()), 200
+        
+    except Exception as e:
+        return jsonify({"error": f"Database error: {str(e)}"}), 500
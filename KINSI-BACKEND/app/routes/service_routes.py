@@ -1,26 +1,48 @@
 from flask import Blueprint, request, jsonify
 from app import db
 from app.models.services import Service
-from app.models.vendors import Vendor
+from app.search import index_vendor
+from app.cache import cached_response, invalidate
+from app.query_debug import query_budget
+from app.facets import FACETS_TAG
+from app.counters import COUNTER_FIELDS, get_counter_buffer
+from app.stats import apply_stats_delta
+from app.leaderboards import vendors_changed
+from app.sync import record_deletion
+from app.vendor_cache import find_vendor
+from app.serializers import SERVICE_FIELDS, load_columns, parse_fields, serialize_service
+from sqlalchemy import select
+from sqlalchemy.orm import load_only
 import json
 
 service_bp = Blueprint("service_bp", __name__)
 
 @service_bp.route('/vendor/services/<int:vendor_id>', methods=['GET'])
+@query_budget(2)
+@cached_response('vendor:{vendor_id}')
 def get_vendor_services(vendor_id):
-    """Get all services for a vendor"""
+    """Get all active services for a vendor (``?fields=`` selects columns)"""
     try:
-        vendor = Vendor.query.get(vendor_id)
-        if not vendor:
+        fields, _ = parse_fields(request.args.get('fields'), SERVICE_FIELDS)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    
+    try:
+        if not find_vendor(vendor_id):
             return jsonify({"error": "Vendor not found"}), 404
         
-        services = Service.query.filter_by(vendor_id=vendor_id, is_active=True).all()
-        return jsonify([service.to_dict() for service in services]), 200
+        services = db.session.scalars(active_services_query(vendor_id, fields)).all()
+        return jsonify([serialize_service(service, fields) for service in services]), 200
         
     except Exception as e:
         return jsonify({"error": f"Database error: {str(e)}"}), 500
 
+def active_services_query(vendor_id, fields):
+    return select(Service).options(load_only(*load_columns(Service, fields))) \
+        .filter_by(vendor_id=vendor_id, is_active=True)
+
 @service_bp.route('/vendor/services', methods=['POST'])
+@query_budget(8)
 def create_vendor_service():
     """Create a new service for a vendor"""
     try:
@@ -33,9 +55,13 @@ def create_vendor_service():
         if not vendor_id:
             return jsonify({"error": "vendor_id is required"}), 400
         
+        try:
+            vendor_id = int(vendor_id)
+        except (TypeError, ValueError):
+            return jsonify({"error": "vendor_id must be an integer"}), 400
+        
         # Check if vendor exists
-        vendor = Vendor.query.get(vendor_id)
-        if not vendor:
+        if not find_vendor(vendor_id):
             return jsonify({"error": "Vendor not found"}), 404
         
         # Create new service
@@ -50,7 +76,11 @@ def create_vendor_service():
         )
         
         db.session.add(new_service)
+        db.session.flush()
+        index_vendor(new_service.vendor_id)
+        apply_stats_delta(new_service.vendor_id, services=1)
         db.session.commit()
+        invalidate(f'vendor:{new_service.vendor_id}', 'catalog', FACETS_TAG)
         
         return jsonify({
             "message": "Service created successfully",
@@ -63,6 +93,7 @@ def create_vendor_service():
         return jsonify({"error": f"Database error: {str(e)}"}), 500
 
 @service_bp.route('/vendor/services/<int:service_id>', methods=['PUT'])
+@query_budget(7)
 def update_service(service_id):
     """Update a service"""
     try:
@@ -76,7 +107,10 @@ def update_service(service_id):
         service.description = data.get('description', service.description)
         service.features = json.dumps(data.get('features', json.loads(service.features or '[]')))
         
+        db.session.flush()
+        index_vendor(service.vendor_id)
         db.session.commit()
+        invalidate(f'vendor:{service.vendor_id}', 'catalog', FACETS_TAG)
         
         return jsonify({
             "message": "Service updated successfully",
@@ -88,15 +122,80 @@ def update_service(service_id):
         return jsonify({"error": f"Database error: {str(e)}"}), 500
 
 @service_bp.route('/vendor/services/<int:service_id>', methods=['DELETE'])
+@query_budget(8)
 def delete_service(service_id):
     """Delete a service"""
     try:
-        service = Service.query.get_or_404(service_id)
-        db.session.delete(service)
+        # The counters as the delete finds them, in the write transaction: a
+        # counter flush may have added to the row since it could be loaded
+        deleted = db.session.execute(
+            db.delete(Service).where(Service.id == service_id)
+            .returning(Service.vendor_id, Service.views, Service.inquiries, Service.bookings)
+            .execution_options(synchronize_session=False)).first()
+        if deleted is None:
+            db.session.rollback()
+            return jsonify({"error": "Service not found"}), 404
+        vendor_id = deleted.vendor_id
+        record_deletion('services', service_id, vendor_id)
+        db.session.flush()
+        index_vendor(vendor_id)
+        apply_stats_delta(vendor_id, services=-1, views=-(deleted.views or 0),
+                          inquiries=-(deleted.inquiries or 0),
+                          bookings=-(deleted.bookings or 0))
         db.session.commit()
+        invalidate(f'vendor:{vendor_id}', 'catalog', FACETS_TAG)
+        vendors_changed([vendor_id])
         
         return jsonify({"message": "Service deleted successfully"}), 200
         
     except Exception as e:
         db.session.rollback()
-        return jsonify({"error": f"Database error: {str(e)}"}), 500
\ No newline at end of file
+        return jsonify({"error": f"Database error: {str(e)}"}), 500
+
+def _parse_increments(data):
+    """Validate counter increments; returns (dict, error message)"""
+    increments = {}
+    for field in COUNTER_FIELDS:
+        value = data.get(field, 0)
+        if not isinstance(value, int) or isinstance(value, bool) or value < 0:
+            return None, f"{field} must be a non-negative integer"
+        increments[field] = value
+    if not any(increments.values()):
+        return None, "At least one of views, inquiries or bookings is required"
+    return increments, None
+
+@service_bp.route('/vendor/services/<int:service_id>/counters', methods=['POST'])
+@query_budget(0)
+def increment_service_counters(service_id):
+    """Queue view/inquiry/booking increments for a service"""
+    data = request.get_json(silent=True) or {}
+    increments, error = _parse_increments(data)
+    if error:
+        return jsonify({"error": error}), 400
+    
+    get_counter_buffer().add(service_id, **increments)
+    return jsonify({"message": "Increments queued"}), 202
+
+@service_bp.route('/vendor/services/counters', methods=['POST'])
+@query_budget(0)
+def increment_service_counters_batch():
+    """Queue counter increments for many services at once"""
+    data = request.get_json(silent=True) or {}
+    items = data.get('increments')
+    if not isinstance(items, list) or not items:
+        return jsonify({"error": "increments must be a non-empty list"}), 400
+    
+    batch = []
+    for index, item in enumerate(items):
+        service_id = item.get('service_id') if isinstance(item, dict) else None
+        if not isinstance(service_id, int) or isinstance(service_id, bool):
+            return jsonify({"error": f"increments[{index}].service_id is required"}), 400
+        increments, error = _parse_increments(item)
+        if error:
+            return jsonify({"error": f"increments[{index}]: {error}"}), 400
+        batch.append((service_id, increments))
+    
+    buffer = get_counter_buffer()
+    for service_id, increments in batch:
+        buffer.add(service_id, **increments)
+    return jsonify({"message": "Increments queued", "count": len(batch)}), 202
\ No newline at end of file
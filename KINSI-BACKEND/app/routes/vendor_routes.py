@@ -1,29 +1,75 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, Response, current_app, request, jsonify, stream_with_context, url_for
 from app import db
 from app.models.vendors import Vendor
+from app.models.services import Service
+from app.search import build_match_query, index_vendor, search_vendor_ids
+from app.facets import FACETS_TAG, get_facets
+from app.leaderboards import ALL, BOARDS, get_leaderboards, vendors_changed
+from app.sync import SyncTokenExpired, get_changes
+from app.geo import locate, nearby_vendor_ids, parse_coordinates, requested_coordinates, set_location
+from app.cache import cached_response, invalidate
+from app.query_debug import query_budget
+from app.stats import apply_stats_delta, get_vendor_stats_row
+from app.bulk_import import import_vendors, open_text_stream
+from app.jobs import enqueue, store_job_file
+from app.vendor_cache import find_vendor, project
+from app.serializers import (SERVICE_FIELDS, VENDOR_FIELDS, load_columns, parse_fields,
+                             serialize_service, serialize_vendor, serialize_vendors,
+                             vendor_load_options)
+from sqlalchemy import and_, select
 from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import contains_eager, load_only
 from datetime import datetime
 
 vendor_bp = Blueprint("vendor_bp", __name__)
 
+# Page size bounds for GET /api/vendors
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+# Rows fetched per round trip while streaming the catalog export
+EXPORT_BATCH_SIZE = 500
+
+# Per-row errors echoed back by the bulk import endpoint
+IMPORT_MAX_REPORTED_ERRORS = 1000
+
+# Rows per stream in one GET /api/vendors/changes page
+DEFAULT_SYNC_PAGE_SIZE = 500
+MAX_SYNC_PAGE_SIZE = 2000
+
+# Search radius bounds for GET /api/vendors/nearby, in km
+DEFAULT_NEARBY_RADIUS_KM = 10.0
+MAX_NEARBY_RADIUS_KM = 100.0
+
 @vendor_bp.route('/vendor/profile/<int:user_id>', methods=['GET'])
+@query_budget(1)
+@cached_response('user:{user_id}')
 def get_vendor_profile(user_id):
-    """Get vendor profile by user_id"""
+    """Get vendor profile by user_id (``?fields=`` selects columns)"""
     try:
-        vendor = Vendor.query.filter_by(user_id=user_id).first()
+        fields, _ = parse_fields(request.args.get('fields'), VENDOR_FIELDS)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    
+    try:
+        vendor = find_vendor(user_id=user_id)
         
         if not vendor:
-            return jsonify({
-                "error": "Vendor profile not found", 
-                "message": "No vendor profile exists for this user"
-            }), 404
+            return profile_not_found()
         
-        return jsonify(vendor.to_dict()), 200
+        return jsonify(project(vendor, fields)), 200
         
     except Exception as e:
         return jsonify({"error": f"Database error: {str(e)}"}), 500
 
+def profile_not_found():
+    return jsonify({
+        "error": "Vendor profile not found", 
+        "message": "No vendor profile exists for this user"
+    }), 404
+
 @vendor_bp.route('/vendor/profile', methods=['POST'])
+@query_budget(8)
 def create_or_update_vendor_profile():
     """Create or update vendor profile"""
     try:
@@ -36,6 +82,11 @@ def create_or_update_vendor_profile():
         if not user_id:
             return jsonify({"error": "user_id is required"}), 400
         
+        try:
+            coordinates = requested_coordinates(data)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        
         # Check if vendor already exists
         existing_vendor = Vendor.query.filter_by(user_id=user_id).first()
         
@@ -53,9 +104,15 @@ def create_or_update_vendor_profile():
             existing_vendor.instagram = data.get('instagram', existing_vendor.instagram)
             existing_vendor.facebook = data.get('facebook', existing_vendor.facebook)
             existing_vendor.twitter = data.get('twitter', existing_vendor.twitter)
+            if coordinates is not None or 'address' in data:
+                set_location(existing_vendor, *locate(coordinates, existing_vendor.address))
             existing_vendor.updated_at = datetime.utcnow()
             
+            db.session.flush()
+            index_vendor(existing_vendor.id)
             db.session.commit()
+            invalidate(f'user:{user_id}', f'vendor:{existing_vendor.id}', 'catalog', FACETS_TAG)
+            vendors_changed([existing_vendor.id])
             
             return jsonify({
                 "message": "Vendor profile updated successfully", 
@@ -78,9 +135,15 @@ def create_or_update_vendor_profile():
                 facebook=data.get('facebook', ''),
                 twitter=data.get('twitter', '')
             )
+            set_location(new_vendor, *locate(coordinates, new_vendor.address))
             
             db.session.add(new_vendor)
+            db.session.flush()
+            index_vendor(new_vendor.id)
+            apply_stats_delta(new_vendor.id)
             db.session.commit()
+            invalidate(f'user:{user_id}', f'vendor:{new_vendor.id}', 'catalog', FACETS_TAG)
+            vendors_changed([new_vendor.id])
             
             return jsonify({
                 "message": "Vendor profile created successfully", 
@@ -95,26 +158,335 @@ def create_or_update_vendor_profile():
         return jsonify({"error": f"Database error: {str(e)}"}), 500
 
 @vendor_bp.route('/vendor/stats/<int:vendor_id>', methods=['GET'])
+@query_budget(1)
+@cached_response('vendor:{vendor_id}')
 def get_vendor_stats(vendor_id):
-    """Get vendor statistics"""
+    """Get vendor statistics from the vendor_stats rollup"""
     try:
-        from app.models.services import Service
+        return vendor_stats_response(get_vendor_stats_row(vendor_id))
         
-        vendor = Vendor.query.get(vendor_id)
+    except Exception as e:
+        return jsonify({"error": f"Database error: {str(e)}"}), 500
+
+def vendor_stats_response(stats):
+    if stats is None:
+        return jsonify({"error": "Vendor not found"}), 404
+    return jsonify(stats), 200
+
+@vendor_bp.route('/vendor/dashboard/<int:user_id>', methods=['GET'])
+@query_budget(2)
+def get_vendor_dashboard(user_id):
+    """Profile, active services and stats of a vendor in one response.
+
+    Replaces the profile -> services -> stats request chain of the vendor
+    dashboard: one query loads the vendor joined with its active services,
+    a second reads the vendor_stats rollup. ``?fields=`` works as on the
+    catalog, ``services.<field>`` selecting service columns.
+    """
+    try:
+        fields, nested = parse_fields(request.args.get('fields'), VENDOR_FIELDS,
+                                      {'services': SERVICE_FIELDS})
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    service_fields = nested.get('services', SERVICE_FIELDS)
+    
+    try:
+        # user_id is unique; .first() would LIMIT the joined services to one
+        active_services = and_(Service.vendor_id == Vendor.id, Service.is_active == True)
+        vendors = Vendor.query \
+            .outerjoin(Service, active_services) \
+            .options(load_only(*load_columns(Vendor, fields)),
+                     contains_eager(Vendor.services).load_only(*load_columns(Service, service_fields))) \
+            .filter(Vendor.user_id == user_id) \
+            .order_by(Service.id) \
+            .populate_existing() \
+            .all()
+        
+        vendor = vendors[0] if vendors else None
         if not vendor:
-            return jsonify({"error": "Vendor not found"}), 404
+            return profile_not_found()
         
-        # Calculate stats from services
-        services = Service.query.filter_by(vendor_id=vendor_id).all()
+        return jsonify({
+            "profile": serialize_vendor(vendor, fields),
+            "services": [serialize_service(service, service_fields) for service in vendor.services],
+            "stats": get_vendor_stats_row(vendor.id),
+        }), 200
         
-        stats = {
-            "total_services": len(services),
-            "total_views": sum(service.views for service in services),
-            "total_inquiries": sum(service.inquiries for service in services),
-            "total_bookings": sum(service.bookings for service in services)
-        }
+    except Exception as e:
+        return jsonify({"error": f"Database error: {str(e)}"}), 500
+
+@vendor_bp.route('/vendors', methods=['GET'])
+@query_budget(2)
+@cached_response('catalog')
+def get_all_vendors():
+    """Get one page of vendors with their services.
+
+    Pages are keyset-paginated on vendor id: pass the ``X-Next-Cursor``
+    header of a response back as ``?cursor=`` to fetch the next page.
+    Services are loaded with one extra query per page, not one per vendor.
+    ``?fields=id,business_name,services.price`` limits the columns loaded.
+    """
+    try:
+        try:
+            limit, cursor, fields, service_fields = catalog_request()
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
         
-        return jsonify(stats), 200
+        vendors = db.session.scalars(catalog_query(limit, cursor, fields, service_fields)).all()
+        return catalog_page(vendors, limit, fields, service_fields)
+    
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+def catalog_request():
+    """(limit, cursor, vendor fields, service fields) of a catalog request; raises ValueError"""
+    limit = request.args.get('limit', DEFAULT_PAGE_SIZE, type=int)
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    cursor = request.args.get('cursor', 0, type=int)
+    fields, nested = parse_fields(request.args.get('fields'), VENDOR_FIELDS,
+                                  {'services': SERVICE_FIELDS})
+    return limit, cursor, fields, nested.get('services')
+
+def catalog_query(limit, cursor, fields, service_fields):
+    # One extra row tells whether another page exists
+    return select(Vendor).options(*vendor_load_options(fields, service_fields)) \
+        .filter(Vendor.id > cursor).order_by(Vendor.id).limit(limit + 1)
+
+def catalog_page(vendors, limit, fields, service_fields):
+    """Response for the rows of catalog_query"""
+    has_more = len(vendors) > limit
+    vendors = vendors[:limit]
+    return catalog_page_response(serialize_vendors(vendors, fields, service_fields),
+                                 vendors[-1].id if has_more else None, limit)
+
+def catalog_page_response(vendors_data, next_cursor, limit):
+    """JSON response for one catalog page, with next-page headers if there is one"""
+    response = jsonify(vendors_data)
+    if next_cursor is not None:
+        response.headers['X-Next-Cursor'] = str(next_cursor)
+        response.headers['Link'] = f'</api/vendors?limit={limit}&cursor={next_cursor}>; rel="next"'
+    return response
+
+@vendor_bp.route('/vendors/search', methods=['GET'])
+@query_budget(3)
+def search_vendors():
+    """Full-text search over vendors and their services, best match first"""
+    try:
+        query, category, limit, offset, fields, service_fields = search_request()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    
+    try:
+        vendor_ids = search_vendor_ids(query, category=category, limit=limit, offset=offset)
+        vendors = db.session.scalars(
+            search_results_query(vendor_ids, fields, service_fields)).all() if vendor_ids else []
+        return search_response(vendor_ids, vendors, fields, service_fields)
         
     except Exception as e:
+        return jsonify({"error": f"Database error: {str(e)}"}), 500
+
+def search_request():
+    """(q, category, limit, offset, vendor fields, service fields) of a search; raises ValueError"""
+    fields, nested = parse_fields(request.args.get('fields'), VENDOR_FIELDS,
+                                  {'services': SERVICE_FIELDS})
+    query = request.args.get('q', '').strip()
+    category = request.args.get('category', '').strip() or None
+    if not query and not category:
+        raise ValueError("q or category is required")
+    check_search_terms(query)
+    limit = max(1, min(request.args.get('limit', 20, type=int), 100))
+    offset = max(0, request.args.get('offset', 0, type=int))
+    return query, category, limit, offset, fields, nested.get('services')
+
+def check_search_terms(query):
+    """Raise ValueError for a q without terms, which would match every vendor"""
+    if query and not build_match_query(query):
+        raise ValueError("q has no searchable terms")
+
+def search_results_query(vendor_ids, fields, service_fields):
+    return select(Vendor) \
+        .options(*vendor_load_options(fields, service_fields, active_services_only=True)) \
+        .filter(Vendor.id.in_(vendor_ids))
+
+def search_response(vendor_ids, vendors, fields, service_fields):
+    """Response listing ``vendors`` (rows of search_results_query) in search order"""
+    by_id = {vendor.id: vendor for vendor in vendors}
+    results = serialize_vendors([by_id[vendor_id] for vendor_id in vendor_ids],
+                                fields, service_fields, active_services_only=True)
+    return jsonify(results), 200
+
+@vendor_bp.route('/vendors/facets', methods=['GET'])
+@query_budget(1)
+@cached_response(FACETS_TAG)
+def vendor_facets():
+    """Vendor counts per service type, category, price range and rating band.
+
+    Takes the ``q`` and ``category`` filters of /api/vendors/search, so the
+    counts describe the vendors a search with those filters would return.
+    """
+    try:
+        query, category = facets_request()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    
+    try:
+        return jsonify(get_facets(query, category)), 200
+        
+    except Exception as e:
+        return jsonify({"error": f"Database error: {str(e)}"}), 500
+
+def facets_request():
+    """(q, category) of a facets request; raises ValueError like search_request"""
+    query = request.args.get('q', '').strip()
+    check_search_terms(query)
+    return query, request.args.get('category', '').strip() or None
+
+@vendor_bp.route('/vendors/nearby', methods=['GET'])
+@query_budget(7)
+def nearby_vendors():
+    """Active vendors within ``radius_km`` of ``lat``/``lng``, nearest first"""
+    try:
+        fields, nested = parse_fields(request.args.get('fields'), VENDOR_FIELDS,
+                                      {'services': SERVICE_FIELDS})
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    service_fields = nested.get('services')
+    
+    if request.args.get('lat') is None or request.args.get('lng') is None:
+        return jsonify({"error": "lat and lng are required"}), 400
+    try:
+        latitude, longitude = parse_coordinates(request.args['lat'], request.args['lng'])
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    radius_km = request.args.get('radius_km', DEFAULT_NEARBY_RADIUS_KM, type=float)
+    if not 0 < radius_km <= MAX_NEARBY_RADIUS_KM:
+        return jsonify({"error": f"radius_km must be between 0 and {MAX_NEARBY_RADIUS_KM:g}"}), 400
+    
+    try:
+        category = request.args.get('category', '').strip() or None
+        limit = max(1, min(request.args.get('limit', 20, type=int), 100))
+        
+        nearest = nearby_vendor_ids(latitude, longitude, radius_km, category=category, limit=limit)
+        vendor_ids = [vendor_id for vendor_id, _ in nearest]
+        vendors = Vendor.query \
+            .options(*vendor_load_options(fields, service_fields, active_services_only=True)) \
+            .filter(Vendor.id.in_(vendor_ids)).all() if vendor_ids else []
+        by_id = {vendor.id: vendor for vendor in vendors}
+        
+        results = serialize_vendors([by_id[vendor_id] for vendor_id in vendor_ids],
+                                    fields, service_fields, active_services_only=True)
+        for vendor_data, (_, distance) in zip(results, nearest):
+            vendor_data['distance_km'] = round(distance, 3)
+        return jsonify(results), 200
+        
+    except Exception as e:
+        return jsonify({"error": f"Database error: {str(e)}"}), 500
+
+@vendor_bp.route('/vendors/leaderboards/<board>', methods=['GET'])
+@query_budget(2)
+def vendor_leaderboard(board):
+    """Top rated or most booked vendors, overall or for one ``service_type``"""
+    if board not in BOARDS:
+        return jsonify({"error": "Unknown leaderboard"}), 404
+    try:
+        service_type = request.args.get('service_type', '').strip() or ALL
+        limit = max(1, request.args.get('limit', current_app.config['LEADERBOARD_SIZE'], type=int))
+        
+        entries = get_leaderboards().top(board, service_type, limit)
+        return jsonify([{"rank": rank, **entry} for rank, entry in enumerate(entries, 1)]), 200
+        
+    except Exception as e:
+        return jsonify({"error": f"Database error: {str(e)}"}), 500
+
+@vendor_bp.route('/vendors/changes', methods=['GET'])
+@query_budget(3)
+def vendor_changes():
+    """Vendors, services and deletes since the ``since`` sync token (see app/sync.py)"""
+    limit = max(1, min(request.args.get('limit', DEFAULT_SYNC_PAGE_SIZE, type=int),
+                       MAX_SYNC_PAGE_SIZE))
+    try:
+        return jsonify(get_changes(request.args.get('since'), limit)), 200
+    except SyncTokenExpired as e:
+        return jsonify({"error": str(e)}), 410
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": f"Database error: {str(e)}"}), 500
+
+def _iter_vendor_records(fields, service_fields):
+    """Yield every vendor with its services, one batch of rows in memory at a time"""
+    stmt = db.select(Vendor) \
+        .options(*vendor_load_options(fields, service_fields)) \
+        .order_by(Vendor.id) \
+        .execution_options(yield_per=EXPORT_BATCH_SIZE)
+    for vendor in db.session.scalars(stmt):
+        vendor_data, = serialize_vendors([vendor], fields, service_fields)
+        # Let the vendor and its services be freed as soon as they are sent
+        db.session.expunge(vendor)
+        yield vendor_data
+
+@vendor_bp.route('/vendors/export', methods=['GET'])
+@query_budget(repeats=False)
+def export_vendors():
+    """Stream the whole catalog as NDJSON (default) or a chunked JSON array"""
+    export_format = request.args.get('format', 'ndjson')
+    try:
+        fields, nested = parse_fields(request.args.get('fields'), VENDOR_FIELDS,
+                                      {'services': SERVICE_FIELDS})
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    records = _iter_vendor_records(fields, nested.get('services'))
+    dumps = current_app.json.dumps
+    
+    if export_format == 'ndjson':
+        def generate():
+            for vendor_data in records:
+                yield dumps(vendor_data) + '\n'
+        mimetype = 'application/x-ndjson'
+    elif export_format == 'json':
+        def generate():
+            separator = '['
+            for vendor_data in records:
+                yield separator + dumps(vendor_data)
+                separator = ','
+            yield ']' if separator == ',' else '[]'
+        mimetype = 'application/json'
+    else:
+        return jsonify({"error": "format must be 'ndjson' or 'json'"}), 400
+    
+    return Response(stream_with_context(generate()), mimetype=mimetype)
+
+@vendor_bp.route('/vendors/import', methods=['POST'])
+@query_budget(repeats=False)
+def bulk_import_vendors():
+    """Bulk create or update vendors (and services) from a CSV or NDJSON body.
+
+    With ``?async=1`` or ``Prefer: respond-async`` the body is saved and
+    imported by a background job; the 202 response points at its status.
+    """
+    mimetype = request.mimetype
+    if mimetype in ('text/csv', 'application/csv'):
+        import_format = 'csv'
+    elif mimetype in ('application/x-ndjson', 'application/ndjson', 'application/jsonlines'):
+        import_format = 'ndjson'
+    else:
+        return jsonify({"error": "Content-Type must be text/csv or application/x-ndjson"}), 415
+    
+    try:
+        chunk_size = max(1, min(request.args.get('chunk_size', 500, type=int), 5000))
+        if request.args.get('async') == '1' or 'respond-async' in request.headers.get('Prefer', ''):
+            path = store_job_file(request.stream, f'.{import_format}')
+            job_id = enqueue('import_vendors', {'path': path, 'format': import_format,
+                                                'chunk_size': chunk_size,
+                                                'max_errors': IMPORT_MAX_REPORTED_ERRORS})
+            db.session.commit()
+            response = jsonify({"message": "Import queued", "job_id": job_id})
+            response.headers['Location'] = url_for('job_bp.get_job', job_id=job_id)
+            return response, 202
+        
+        report = import_vendors(open_text_stream(request.stream), import_format, chunk_size)
+        return jsonify(report.to_dict(max_errors=IMPORT_MAX_REPORTED_ERRORS)), 200
+        
+    except Exception as e:
+        db.session.rollback()
         return jsonify({"error": f"Database error: {str(e)}"}), 500
\ No newline at end of file
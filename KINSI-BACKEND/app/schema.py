@@ -0,0 +1,41 @@
+# app/schema.py
+"""Explicit schema creation.
+
+Nothing creates tables at import or app start-up any more; run
+``flask create-db`` once against a new database instead. It creates the
+missing tables and the FTS5 search index, and backfills vendor_stats the
+first time that table sits next to existing vendors. It is safe to run
+again. Databases managed with Alembic use ``flask db upgrade``.
+"""
+import click
+from flask.cli import with_appcontext
+
+from app import db
+from app.models.jobs import Job  # noqa: F401 (registers the table)
+from app.models.replica_heartbeat import ReplicaHeartbeat  # noqa: F401 (registers the table)
+from app.models.tombstones import Tombstone  # noqa: F401 (registers the table)
+from app.models.vendor_stats import VendorStats
+from app.models.vendors import Vendor
+from app.search import create_search_index
+from app.stats import rebuild_vendor_stats
+
+
+def create_schema():
+    """Create missing tables and the search index; returns the table names"""
+    db.create_all()
+    create_search_index()
+
+    # Backfill the stats rollup the first time its table exists
+    if not VendorStats.query.first() and Vendor.query.first():
+        rebuild_vendor_stats()
+    db.session.commit()
+    return db.inspect(db.engine).get_table_names()
+
+
+@click.command('create-db')
+@with_appcontext
+def create_db_command():
+    """Create missing tables and the search index."""
+    tables = create_schema()
+    click.echo("✅ Database tables created successfully!")
+    click.echo(f"📋 Tables in database: {tables}")
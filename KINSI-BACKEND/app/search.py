@@ -0,0 +1,162 @@
+# app/search.py
+"""Full-text vendor search backed by an SQLite FTS5 index.
+
+One FTS row is kept per vendor (rowid = vendors.id) holding the vendor's
+own text plus the text of its active services. Handlers that write vendors
+or services call index_vendor / remove_vendor before committing so the
+index changes in the same transaction as the rows it describes.
+"""
+import json
+import re
+
+import click
+from flask.cli import with_appcontext
+from app import db
+
+SEARCH_TABLE = 'vendor_search'
+
+# bm25() weights, in column order
+COLUMN_WEIGHTS = (10.0, 2.0, 5.0, 5.0, 3.0, 1.0)
+
+_TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+# Vendors (aliased v) whose service_type or any active service category is :category
+CATEGORY_FILTER = (
+    "v.id IN (SELECT id FROM vendors WHERE service_type = :category "
+    "UNION SELECT vendor_id FROM services WHERE category = :category AND is_active = TRUE)"
+)
+
+
+def create_search_index():
+    """Create the FTS5 table if it does not exist yet"""
+    db.session.execute(db.text(
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_TABLE} USING fts5("
+        "business_name, description, service_type, "
+        "service_names, categories, features, "
+        "tokenize = 'unicode61 remove_diacritics 2')"
+    ))
+    db.session.commit()
+
+
+def _vendor_documents(vendor_ids):
+    """Build the indexed text for the given vendors that should be indexed"""
+    vendors = db.session.execute(db.text(
+        "SELECT id, business_name, description, service_type FROM vendors "
+        "WHERE id IN :ids AND is_active = TRUE"
+    ).bindparams(db.bindparam('ids', expanding=True)), {"ids": vendor_ids}).all()
+    if not vendors:
+        return []
+
+    services_by_vendor = {}
+    for service in db.session.execute(db.text(
+        "SELECT vendor_id, service_name, category, features FROM services "
+        "WHERE vendor_id IN :ids AND is_active = TRUE"
+    ).bindparams(db.bindparam('ids', expanding=True)), {"ids": [v.id for v in vendors]}):
+        services_by_vendor.setdefault(service.vendor_id, []).append(service)
+
+    documents = []
+    for vendor in vendors:
+        services = services_by_vendor.get(vendor.id, [])
+        features = []
+        for service in services:
+            if service.features:
+                features.extend(str(f) for f in json.loads(service.features))
+        documents.append({
+            "rowid": vendor.id,
+            "business_name": vendor.business_name or '',
+            "description": vendor.description or '',
+            "service_type": vendor.service_type or '',
+            "service_names": ' '.join(s.service_name or '' for s in services),
+            "categories": ' '.join(s.category or '' for s in services),
+            "features": ' '.join(features),
+        })
+    return documents
+
+
+def remove_vendor(vendor_id):
+    """Drop a vendor from the index (call before commit)"""
+    db.session.execute(
+        db.text(f"DELETE FROM {SEARCH_TABLE} WHERE rowid = :id"), {"id": vendor_id}
+    )
+
+
+def index_vendors(vendor_ids, chunk_size=500):
+    """(Re)index vendors and their services in a few queries per chunk of ids"""
+    vendor_ids = list(vendor_ids)
+    for start in range(0, len(vendor_ids), chunk_size):
+        chunk = vendor_ids[start:start + chunk_size]
+        db.session.execute(db.text(
+            f"DELETE FROM {SEARCH_TABLE} WHERE rowid IN :ids"
+        ).bindparams(db.bindparam('ids', expanding=True)), {"ids": chunk})
+        documents = _vendor_documents(chunk)
+        if documents:
+            db.session.execute(db.text(
+                f"INSERT INTO {SEARCH_TABLE} (rowid, business_name, description, service_type, "
+                "service_names, categories, features) VALUES (:rowid, :business_name, "
+                ":description, :service_type, :service_names, :categories, :features)"
+            ), documents)
+
+
+def index_vendor(vendor_id):
+    """(Re)index a vendor and its services (call after flush, before commit)"""
+    index_vendors([vendor_id])
+
+
+def rebuild_search_index():
+    """Recreate the index from the vendors and services tables"""
+    create_search_index()
+    db.session.execute(db.text(f"DELETE FROM {SEARCH_TABLE}"))
+    vendor_ids = db.session.execute(db.text("SELECT id FROM vendors")).scalars().all()
+    index_vendors(vendor_ids)
+    db.session.commit()
+    return len(vendor_ids)
+
+
+def build_match_query(text):
+    """Turn free user input into a safe FTS5 query (every term, prefix-matched)"""
+    terms = _TOKEN_RE.findall(text or '')
+    return ' '.join(f'"{term}"*' for term in terms)
+
+
+def build_search_query(text, category=None, limit=20, offset=0):
+    """Return (sql, params) selecting matching vendor ids, best match first"""
+    params = {"limit": limit, "offset": offset}
+    category_filter = ''
+    if category:
+        params["category"] = category
+        category_filter = f"AND {CATEGORY_FILTER}"
+
+    match = build_match_query(text)
+    if not match:
+        # Category-only browse: no relevance, best rated first
+        sql = (
+            "SELECT v.id FROM vendors v WHERE v.is_active = TRUE "
+            f"{category_filter} ORDER BY v.rating DESC, v.id LIMIT :limit OFFSET :offset"
+        )
+    else:
+        params["match"] = match
+        weights = ', '.join(str(w) for w in COLUMN_WEIGHTS)
+        sql = (
+            f"SELECT v.id FROM {SEARCH_TABLE} JOIN vendors v ON v.id = {SEARCH_TABLE}.rowid "
+            f"WHERE {SEARCH_TABLE} MATCH :match {category_filter} "
+            f"ORDER BY bm25({SEARCH_TABLE}, {weights}) LIMIT :limit OFFSET :offset"
+        )
+    return sql, params
+
+
+def search_vendor_ids(text, category=None, limit=20, offset=0):
+    """Return vendor ids matching ``text``, best BM25 score first.
+
+    ``category`` restricts results to vendors whose service_type or any
+    active service category equals it exactly.
+    """
+    sql, params = build_search_query(text, category, limit, offset)
+    return db.session.execute(db.text(sql), params).scalars().all()
+
+
+@click.command('rebuild-search-index')
+@with_appcontext
+def rebuild_search_index_command():
+    """Rebuild the vendor full-text search index."""
+    count = rebuild_search_index()
+    click.echo(f"Indexed {count} vendors")
@@ -0,0 +1,181 @@
+# app/serializers.py
+"""Serialization for vendors and services.
+
+Serializers are generated once per (model, field list) and cached, so a
+row costs one dict literal instead of a chain of attribute lookups and
+branches. ``?fields=`` projections are parsed by parse_fields and turned
+into load_only() options, so columns that are not asked for are never
+SELECTed. When the orjson provider is active, timestamps are handed to the
+encoder as datetimes and formatted in C instead of via isoformat().
+"""
+from functools import lru_cache
+
+from flask import current_app
+from flask.json.provider import DefaultJSONProvider
+from sqlalchemy.orm import load_only, selectinload
+from app.models.services import Service
+from app.models.vendors import Vendor
+
+# Field order matches the historical to_dict() output
+VENDOR_FIELDS = (
+    'id', 'user_id', 'business_name', 'owner_name', 'email', 'service_type',
+    'description', 'contact_phone', 'address', 'experience', 'website',
+    'instagram', 'facebook', 'twitter', 'is_active', 'rating', 'total_reviews',
+    'created_at', 'updated_at', 'latitude', 'longitude',
+)
+SERVICE_FIELDS = (
+    'id', 'vendor_id', 'service_name', 'category', 'price', 'duration',
+    'description', 'features', 'views', 'inquiries', 'bookings', 'is_active',
+    'created_at', 'updated_at',
+)
+
+# Columns always loaded so identity and relationships keep working
+_REQUIRED_COLUMNS = {Vendor: ('id',), Service: ('id', 'vendor_id')}
+_DATETIME_FIELDS = ('created_at', 'updated_at')
+
+
+def _isoformat(value):
+    return value.isoformat() if value is not None else None
+
+
+@lru_cache(maxsize=128)
+def compile_serializer(model, fields, native_datetimes=False):
+    """Build ``row -> dict`` for the given model and tuple of field names"""
+    items = []
+    for name in fields:
+        if model is Service and name == 'features':
+            items.append(f'{name!r}: o.decoded_features()')
+        elif name in _DATETIME_FIELDS and not native_datetimes:
+            items.append(f'{name!r}: _isoformat(o.{name})')
+        else:
+            items.append(f'{name!r}: o.{name}')
+    source = 'lambda o: {' + ', '.join(items) + '}'
+    return eval(source, {'_isoformat': _isoformat})
+
+
+def _native_datetimes():
+    return getattr(current_app.json, 'native_datetimes', False) if current_app else False
+
+
+def serialize_vendor(vendor, fields=VENDOR_FIELDS, native_datetimes=None):
+    if native_datetimes is None:
+        native_datetimes = _native_datetimes()
+    return compile_serializer(Vendor, tuple(fields), native_datetimes)(vendor)
+
+
+def serialize_service(service, fields=SERVICE_FIELDS, native_datetimes=None):
+    if native_datetimes is None:
+        native_datetimes = _native_datetimes()
+    return compile_serializer(Service, tuple(fields), native_datetimes)(service)
+
+
+def serialize_vendors(vendors, fields=VENDOR_FIELDS, service_fields=None, active_services_only=False):
+    """Serialize vendors, nesting their services when service_fields is given"""
+    native = _native_datetimes()
+    vendor_fn = compile_serializer(Vendor, tuple(fields), native)
+    if service_fields is None:
+        return [vendor_fn(vendor) for vendor in vendors]
+
+    service_fn = compile_serializer(Service, tuple(service_fields), native)
+    results = []
+    for vendor in vendors:
+        vendor_data = vendor_fn(vendor)
+        vendor_data['services'] = [
+            service_fn(service) for service in vendor.services
+            if not active_services_only or service.is_active
+        ]
+        results.append(vendor_data)
+    return results
+
+
+def parse_fields(raw, allowed, nested=None, nested_default=True):
+    """Parse ``?fields=a,b,services.c`` into (fields, {relation: fields}).
+
+    Without ``raw`` every field is returned, and nested relations are
+    included in full if ``nested_default``. A bare relation name
+    (``services``) includes all of its fields. Raises ValueError on
+    unknown names.
+    """
+    nested = nested or {}
+    if not raw:
+        return tuple(allowed), {name: tuple(sub) for name, sub in nested.items() if nested_default}
+
+    top, children = [], {}
+    for name in (part.strip() for part in raw.split(',')):
+        if not name:
+            continue
+        relation, _, child = name.partition('.')
+        if relation in nested:
+            selected = children.setdefault(relation, [])
+            if child:
+                if child not in nested[relation]:
+                    raise ValueError(f"Unknown field: {name}")
+                selected.append(child)
+        elif name in allowed:
+            top.append(name)
+        else:
+            raise ValueError(f"Unknown field: {name}")
+
+    ordered_top = tuple(f for f in allowed if f in top)
+    ordered_children = {
+        relation: tuple(f for f in nested[relation] if f in selected) if selected else tuple(nested[relation])
+        for relation, selected in children.items()
+    }
+    return ordered_top, ordered_children
+
+
+def load_columns(model, fields):
+    """load_only() columns for a field list (plus keys the ORM needs)"""
+    names = dict.fromkeys((*_REQUIRED_COLUMNS[model], *fields))
+    return [getattr(model, name) for name in names]
+
+
+def vendor_load_options(fields, service_fields=None, active_services_only=False):
+    """Loader options that SELECT only what serialize_vendors will read"""
+    options = [load_only(*load_columns(Vendor, fields))]
+    if service_fields is not None:
+        columns = load_columns(Service, service_fields)
+        if active_services_only:
+            columns.append(Service.is_active)
+        options.append(selectinload(Vendor.services).load_only(*columns))
+    return options
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    """JSON provider backed by orjson; output matches the default provider's
+    key order and datetime format for what our serializers produce"""
+
+    native_datetimes = True
+
+    def __init__(self, app):
+        super().__init__(app)
+        import orjson
+        self._orjson = orjson
+
+    def dumps(self, obj, **kwargs):
+        option = self._orjson.OPT_NON_STR_KEYS
+        if kwargs.pop('sort_keys', self.sort_keys):
+            option |= self._orjson.OPT_SORT_KEYS
+        return self._orjson.dumps(obj, default=self.default, option=option).decode()
+
+    def loads(self, s, **kwargs):
+        return self._orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(
+            self._orjson.dumps(obj, default=self.default,
+                               option=self._orjson.OPT_NON_STR_KEYS | self._orjson.OPT_SORT_KEYS),
+            mimetype=self.mimetype,
+        )
+
+
+def init_json(app):
+    """Switch to the orjson provider when FAST_JSON is on and orjson is installed"""
+    if not app.config.get('FAST_JSON'):
+        return
+    try:
+        import orjson  # noqa: F401
+    except ImportError:
+        return
+    app.json = OrjsonProvider(app)
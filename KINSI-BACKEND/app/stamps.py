@@ -0,0 +1,90 @@
+# app/stamps.py
+"""Version counters shared by every process of one host through a
+memory-mapped file.
+
+The vendor identity cache (app/vendor_cache.py) keys them by vendor id,
+the response cache's memory backend (app/cache.py) by a checksum of the
+tag. Keys share a slot modulo the slot count; a bump then also
+invalidates the other keys of its slot, which costs a miss, never a
+stale hit.
+
+Bumps are serialised across processes with flock. Where fcntl is missing
+(Windows, e.g. the ``python app.py`` dev server) only the threads of one
+process are serialised; run a single process there.
+"""
+import hashlib
+import mmap
+import os
+import struct
+import tempfile
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - not POSIX
+    fcntl = None
+
+_STAMP = struct.Struct('<Q')
+_HEADER = 2  # global counter, last bump time
+
+
+class VersionStamps:
+    """Write counters in a file shared by the workers of one host.
+
+    Index 0 is the global counter, 1 the time of the last bump in
+    microseconds; key ``i`` uses slot ``2 + i % slots``.
+    The file is mapped lazily and again after a fork, so every worker has
+    its own descriptor for flock (when fcntl is available).
+    """
+
+    def __init__(self, path, slots=4096):
+        self.path = path
+        self.slots = slots
+        self._map = None
+        self._fd = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def _mapped(self):
+        if self._pid != os.getpid():
+            with self._lock:
+                if self._pid != os.getpid():
+                    size = (self.slots + _HEADER) * _STAMP.size
+                    fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+                    if os.fstat(fd).st_size < size:
+                        os.ftruncate(fd, size)
+                    self._map = mmap.mmap(fd, size)
+                    self._fd = fd
+                    self._pid = os.getpid()
+        return self._map
+
+    def generation(self):
+        return _STAMP.unpack_from(self._mapped(), 0)[0]
+
+    def version(self, key):
+        return _STAMP.unpack_from(self._mapped(), (_HEADER + key % self.slots) * _STAMP.size)[0]
+
+    def bumped_at(self):
+        return _STAMP.unpack_from(self._mapped(), _STAMP.size)[0] / 1e6
+
+    def bump(self, keys):
+        mapped = self._mapped()
+        offsets = sorted({(_HEADER + key % self.slots) * _STAMP.size for key in keys})
+        with self._lock:
+            if fcntl is not None:
+                fcntl.flock(self._fd, fcntl.LOCK_EX)
+            try:
+                # Global first: a reader that saw a new slot value also sees a new generation
+                for offset in (0, *offsets):
+                    _STAMP.pack_into(mapped, offset, _STAMP.unpack_from(mapped, offset)[0] + 1)
+                _STAMP.pack_into(mapped, _STAMP.size, int(time.time() * 1e6))
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+
+def default_stamp_path(database_uri, name):
+    """One stamp file per database and use, so apps on different databases never share slots"""
+    digest = hashlib.sha1(database_uri.encode()).hexdigest()[:16]
+    return os.path.join(tempfile.gettempdir(), f'kinsi-{name}-{digest}')
@@ -0,0 +1,30 @@
+# app/startup.py
+"""Process start-up hooks for pre-forking servers (see gunicorn.conf.py).
+
+warm_up() does the one-off work the first request would otherwise pay
+for, without touching the database, so workers forked from a preloaded
+parent start warm. reset_after_fork() runs in each worker and forgets
+pooled connections inherited from the parent.
+"""
+from sqlalchemy.orm import configure_mappers
+
+from app import db
+from app.models.services import Service
+from app.models.vendors import Vendor
+from app.serializers import SERVICE_FIELDS, VENDOR_FIELDS, compile_serializer
+
+
+def warm_up(app):
+    """Configure ORM mappers and compile the default serializers"""
+    configure_mappers()
+    native = getattr(app.json, 'native_datetimes', False)
+    compile_serializer(Vendor, VENDOR_FIELDS, native)
+    compile_serializer(Service, SERVICE_FIELDS, native)
+
+
+def reset_after_fork(app):
+    """Drop the parent's pooled connections without closing them under it"""
+    with app.app_context():
+        engines = list(db.engines.values())
+    for engine in engines:
+        engine.dispose(close=False)
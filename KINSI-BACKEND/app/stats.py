@@ -0,0 +1,125 @@
+# app/stats.py
+"""Incrementally maintained vendor_stats rollup.
+
+Write paths call apply_stats_delta inside their transaction. The
+rebuild / verify commands recompute everything with one GROUP BY so drift
+between the rollup and the services table can be detected and repaired.
+"""
+import click
+from flask.cli import AppGroup
+from app import db
+from app.models.vendor_stats import VendorStats
+
+STATS_COLUMNS = ('total_services', 'total_views', 'total_inquiries', 'total_bookings')
+
+_RECOMPUTE_SELECT = (
+    "SELECT v.id AS vendor_id, COUNT(s.id) AS total_services, "
+    "COALESCE(SUM(s.views), 0) AS total_views, "
+    "COALESCE(SUM(s.inquiries), 0) AS total_inquiries, "
+    "COALESCE(SUM(s.bookings), 0) AS total_bookings "
+    "FROM vendors v LEFT JOIN services s ON s.vendor_id = v.id"
+)
+_RECOMPUTE_SQL = f"{_RECOMPUTE_SELECT} GROUP BY v.id"
+
+
+def apply_stats_delta(vendor_id, services=0, views=0, inquiries=0, bookings=0):
+    """Add to a vendor's rollup row, creating it if needed (call before commit)"""
+    apply_stats_deltas([{
+        "vendor_id": vendor_id, "total_services": services, "total_views": views,
+        "total_inquiries": inquiries, "total_bookings": bookings,
+    }])
+
+
+def apply_stats_deltas(rows):
+    """Batch form of apply_stats_delta; rows are dicts keyed like STATS_COLUMNS"""
+    if not rows:
+        return
+    updates = ', '.join(f"{column} = {column} + excluded.{column}" for column in STATS_COLUMNS)
+    db.session.execute(db.text(
+        f"INSERT INTO vendor_stats (vendor_id, {', '.join(STATS_COLUMNS)}) "
+        f"VALUES (:vendor_id, {', '.join(':' + column for column in STATS_COLUMNS)}) "
+        f"ON CONFLICT (vendor_id) DO UPDATE SET {updates}"
+    ), rows)
+
+
+VENDOR_STATS_ROW_SQL = (
+    f"SELECT v.id, {', '.join('s.' + column for column in STATS_COLUMNS)} "
+    "FROM vendors v LEFT JOIN vendor_stats s ON s.vendor_id = v.id WHERE v.id = :id"
+)
+
+
+def stats_row_to_dict(row):
+    """Turn a VENDOR_STATS_ROW_SQL row into the response dict (None if no vendor)"""
+    if row is None:
+        return None
+    return {column: getattr(row, column) or 0 for column in STATS_COLUMNS}
+
+
+def get_vendor_stats_row(vendor_id):
+    """Return the vendor's stats dict, or None if the vendor does not exist"""
+    row = db.session.execute(db.text(VENDOR_STATS_ROW_SQL), {"id": vendor_id}).first()
+    return stats_row_to_dict(row)
+
+
+def refresh_vendor_stats(vendor_ids, chunk_size=500):
+    """Recompute the rollup rows of just these vendors (call before commit)"""
+    vendor_ids = list(vendor_ids)
+    updates = ', '.join(f"{column} = excluded.{column}" for column in STATS_COLUMNS)
+    for start in range(0, len(vendor_ids), chunk_size):
+        db.session.execute(db.text(
+            f"INSERT INTO vendor_stats (vendor_id, {', '.join(STATS_COLUMNS)}) "
+            f"{_RECOMPUTE_SELECT} WHERE v.id IN :ids GROUP BY v.id "
+            f"ON CONFLICT (vendor_id) DO UPDATE SET {updates}"
+        ).bindparams(db.bindparam('ids', expanding=True)),
+            {"ids": vendor_ids[start:start + chunk_size]})
+
+
+def rebuild_vendor_stats():
+    """Replace the rollup with a fresh GROUP BY over services"""
+    db.session.execute(db.text("DELETE FROM vendor_stats"))
+    db.session.execute(db.text(
+        f"INSERT INTO vendor_stats (vendor_id, {', '.join(STATS_COLUMNS)}) {_RECOMPUTE_SQL}"
+    ))
+    db.session.commit()
+    return db.session.execute(db.text("SELECT COUNT(*) FROM vendor_stats")).scalar()
+
+
+def verify_vendor_stats():
+    """Return {vendor_id: (stored, expected)} for every vendor whose rollup drifted"""
+    expected = {
+        row.vendor_id: tuple(getattr(row, column) for column in STATS_COLUMNS)
+        for row in db.session.execute(db.text(_RECOMPUTE_SQL))
+    }
+    stored = {
+        row.vendor_id: tuple(getattr(row, column) for column in STATS_COLUMNS)
+        for row in VendorStats.query.all()
+    }
+    zero = (0,) * len(STATS_COLUMNS)
+    drift = {}
+    for vendor_id in expected.keys() | stored.keys():
+        have = stored.get(vendor_id, zero)
+        want = expected.get(vendor_id)
+        if have != want:
+            drift[vendor_id] = (have, want)
+    return drift
+
+
+stats_cli = AppGroup('vendor-stats', help='Maintain the vendor_stats rollup.')
+
+
+@stats_cli.command('rebuild')
+def rebuild_command():
+    """Recompute every vendor's stats from the services table."""
+    count = rebuild_vendor_stats()
+    click.echo(f"Rebuilt stats for {count} vendors")
+
+
+@stats_cli.command('verify')
+def verify_command():
+    """Compare the rollup with a fresh GROUP BY; exit 1 on drift."""
+    drift = verify_vendor_stats()
+    for vendor_id, (have, want) in sorted(drift.items()):
+        click.echo(f"vendor {vendor_id}: stored {have}, expected {want}")
+    if drift:
+        raise SystemExit(1)
+    click.echo("vendor_stats is consistent")
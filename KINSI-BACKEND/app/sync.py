@@ -0,0 +1,189 @@
+# app/sync.py
+"""Delta sync of the vendor catalog.
+
+GET /api/vendors/changes?since=<token> returns the vendors and services
+whose updated_at moved past the token, the tombstones of rows deleted
+since, and a ``next`` token to send the following time. A client keeps a
+local replica by upserting rows by id and dropping the rows named in
+``deleted`` (unless its copy is newer than ``deleted_at``, as happens when
+SQLite reuses the id of a deleted row). Without ``since`` the first calls
+page through the whole catalog; ``has_more`` means "call again now".
+
+A token holds one keyset position (updated_at, id) per stream: vendors,
+services and tombstones. Each stream is walked in that order on its
+(updated_at, id) index, so a call costs one index range per stream.
+Positions only move forward, which makes tokens monotonic.
+
+Writers stamp updated_at just before they commit, so a row stamped a
+moment ago might still be invisible to this read while a newer one is
+already there. Only rows stamped at least SYNC_LAG_SECONDS ago are
+returned, which keeps a late commit from landing behind a position that
+was already handed out. Write paths must commit within that time of
+stamping. Bulk imports stamp each chunk (and each row they retry alone)
+as it is written and commit through commit_stamped, which rolls back
+instead of committing a stamp that has already aged past the lag.
+
+Service counters (views, inquiries, bookings) are not synced. They change
+on every page view without touching updated_at; /api/vendor/stats has
+them. ``flask purge-tombstones`` drops tombstones older than
+SYNC_TOMBSTONE_RETENTION_DAYS; a token older than that gets a 410 and the
+client starts over without ``since``.
+"""
+from datetime import datetime, timedelta
+
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from sqlalchemy import tuple_
+from sqlalchemy.orm import load_only
+from app import db
+from app.counters import COUNTER_FIELDS
+from app.engine import use_primary
+from app.models.services import Service
+from app.models.tombstones import Tombstone
+from app.models.vendors import Vendor
+from app.serializers import SERVICE_FIELDS, VENDOR_FIELDS, load_columns, serialize_service, serialize_vendor
+
+SYNC_SERVICE_FIELDS = tuple(field for field in SERVICE_FIELDS if field not in COUNTER_FIELDS)
+
+_EPOCH = datetime(1970, 1, 1)
+_MICROSECOND = timedelta(microseconds=1)
+
+# (name, model, stamp column) of each stream, in token order
+_STREAMS = (
+    ('vendors', Vendor, Vendor.updated_at),
+    ('services', Service, Service.updated_at),
+    ('deleted', Tombstone, Tombstone.deleted_at),
+)
+
+
+class SyncTokenExpired(Exception):
+    """The token is older than the tombstones still kept"""
+
+
+class StampExpired(Exception):
+    """Rows were stamped too long ago to commit without the feed skipping them"""
+
+
+def commit_stamped(stamp):
+    """Commit the session's rows stamped ``stamp``, or raise StampExpired if the
+    stamp is SYNC_LAG_SECONDS old already (the caller rolls back and restamps)"""
+    age = datetime.utcnow() - stamp
+    if age >= timedelta(seconds=current_app.config['SYNC_LAG_SECONDS']):
+        raise StampExpired(f"Rows stamped {age.total_seconds():.1f} s before their commit, "
+                           f"more than SYNC_LAG_SECONDS")
+    db.session.commit()
+
+
+def _micros(stamp):
+    return (stamp - _EPOCH) // _MICROSECOND
+
+
+def encode_token(positions):
+    """Token for {stream: (stamp, last id or None)}; None means every row at stamp was sent"""
+    parts = []
+    for name, _, _ in _STREAMS:
+        stamp, last_id = positions[name]
+        parts.append(f"{_micros(stamp)}" if last_id is None else f"{_micros(stamp)}-{last_id}")
+    return '.'.join(parts)
+
+
+def decode_token(token):
+    """Inverse of encode_token; raises ValueError on anything malformed"""
+    parts = token.split('.')
+    if len(parts) != len(_STREAMS):
+        raise ValueError("Invalid sync token")
+    positions = {}
+    try:
+        for (name, _, _), part in zip(_STREAMS, parts):
+            micros, _, last_id = part.partition('-')
+            stamp = _EPOCH + int(micros) * _MICROSECOND
+            positions[name] = (stamp, int(last_id) if last_id else None)
+    except (ValueError, OverflowError):
+        raise ValueError("Invalid sync token")
+    return positions
+
+
+def _after(column, model, position):
+    stamp, last_id = position
+    if last_id is None:
+        return column > stamp
+    return tuple_(column, model.id) > tuple_(stamp, last_id)
+
+
+def _tombstone_dict(tombstone):
+    return {"table": tombstone.table_name, "id": tombstone.record_id,
+            "vendor_id": tombstone.vendor_id, "deleted_at": tombstone.deleted_at.isoformat()}
+
+
+def get_changes(token=None, limit=500):
+    """Changes after ``token`` (everything if None), up to ``limit`` rows per stream.
+
+    Raises ValueError for a malformed token and SyncTokenExpired for one
+    older than the tombstone retention.
+    """
+    # A lagging read replica could let positions move past rows it has not
+    # received yet, which SYNC_LAG_SECONDS does not cover
+    use_primary()
+    now = datetime.utcnow()
+    until = now - timedelta(seconds=current_app.config['SYNC_LAG_SECONDS'])
+    if token:
+        positions = decode_token(token)
+        retention = timedelta(days=current_app.config['SYNC_TOMBSTONE_RETENTION_DAYS'])
+        if positions['deleted'][0] < now - retention:
+            raise SyncTokenExpired("Sync token expired, sync again without since")
+    else:
+        # A new replica has nothing to delete
+        positions = {'vendors': (_EPOCH, None), 'services': (_EPOCH, None),
+                     'deleted': (until, None)}
+
+    options = {
+        'vendors': [load_only(*load_columns(Vendor, VENDOR_FIELDS))],
+        'services': [load_only(*load_columns(Service, SYNC_SERVICE_FIELDS))],
+        'deleted': [],
+    }
+    changes, has_more = {}, False
+    for name, model, column in _STREAMS:
+        position = positions[name]
+        rows = model.query.options(*options[name]) \
+            .filter(_after(column, model, position), column <= until) \
+            .order_by(column, model.id) \
+            .limit(limit + 1).all()
+        if len(rows) > limit:
+            rows = rows[:limit]
+            positions[name] = (getattr(rows[-1], column.key), rows[-1].id)
+            has_more = True
+        elif until > position[0]:
+            positions[name] = (until, None)
+        changes[name] = rows
+
+    return {
+        "vendors": [serialize_vendor(vendor) for vendor in changes['vendors']],
+        "services": [serialize_service(service, SYNC_SERVICE_FIELDS)
+                     for service in changes['services']],
+        "deleted": [_tombstone_dict(tombstone) for tombstone in changes['deleted']],
+        "next": encode_token(positions),
+        "has_more": has_more,
+    }
+
+
+def record_deletion(table_name, record_id, vendor_id=None):
+    """Leave a tombstone for a deleted row (call before commit)"""
+    db.session.add(Tombstone(table_name=table_name, record_id=record_id, vendor_id=vendor_id))
+
+
+def purge_tombstones(days):
+    """Delete tombstones older than ``days``; returns how many"""
+    cutoff = datetime.utcnow() - timedelta(days=days)
+    deleted = Tombstone.query.filter(Tombstone.deleted_at < cutoff).delete(synchronize_session=False)
+    db.session.commit()
+    return deleted
+
+
+@click.command('purge-tombstones')
+@with_appcontext
+def purge_tombstones_command():
+    """Drop delete tombstones older than SYNC_TOMBSTONE_RETENTION_DAYS."""
+    # Tokens are refused past the same age, so no client can miss a purged delete
+    days = current_app.config['SYNC_TOMBSTONE_RETENTION_DAYS']
+    click.echo(f"Purged {purge_tombstones(days)} tombstones older than {days:g} days")
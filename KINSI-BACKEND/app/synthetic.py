@@ -0,0 +1,207 @@
+# app/synthetic.py
+"""Deterministic synthetic catalog for local load testing.
+
+generate_catalog(n_services, seed) writes vendors and their services with
+distributions shaped like the real marketplace: a few categories dominate,
+vendors mostly sell within their own service_type, prices are log-normal
+per category, features are drawn from per-category pools with a
+popularity skew, views / inquiries / bookings are heavy-tailed, and
+vendors are scattered around the city in their address. The
+same seed always produces the same rows; new rows are appended after the
+highest existing vendor id and user_id.
+"""
+import json
+import random
+from datetime import datetime, timedelta
+
+from app import db
+from app.engine import begin_write
+from app.geo import grid_cell, load_places
+from app.models.vendors import Vendor
+
+SCALES = {'1k': 1_000, '100k': 100_000, '1m': 1_000_000}
+
+# Bump whenever the generated rows change, so cached benchmark catalogs are rebuilt
+CATALOG_VERSION = 3
+
+# category: (share of vendors, median price, service names, features)
+CATEGORY_PROFILES = {
+    'Photography': (18, 2200, ['Full Day Coverage', 'Engagement Shoot', 'Half Day Coverage',
+                               'Photo Booth', 'Album Design'],
+                    ['Second shooter', 'Online gallery', 'Printed album', 'Drone shots',
+                     'Same-day edits', 'Raw files', 'Travel included']),
+    'Catering': (16, 4500, ['Buffet Dinner', 'Plated Dinner', 'Cocktail Hour', 'Wedding Cake',
+                            'Dessert Table', 'Brunch Menu'],
+                 ['Tasting session', 'Vegan options', 'Halal', 'Staff included',
+                  'Bar service', 'Rentals included', 'Late-night snacks']),
+    'Venue': (12, 9000, ['Garden Ceremony', 'Ballroom Reception', 'Barn Package',
+                         'Beach Ceremony', 'Rooftop Reception'],
+              ['Parking', 'Bridal suite', 'Tables and chairs', 'Sound system',
+               'Wheelchair access', 'Overnight rooms', 'Rain backup']),
+    'Decoration': (12, 1800, ['Ceremony Arch', 'Table Centerpieces', 'Lighting Package',
+                              'Full Venue Styling', 'Backdrop Wall'],
+                   ['Setup and teardown', 'Custom signage', 'Fairy lights', 'Draping',
+                    'Candles', 'Lounge furniture']),
+    'Music & Entertainment': (10, 1500, ['DJ Package', 'Live Band', 'String Quartet',
+                                         'Ceremony Musician', 'MC Services'],
+                              ['Sound system', 'Dance floor lighting', 'Wireless mics',
+                               'Custom playlist', 'Overtime available']),
+    'Flowers': (9, 1200, ['Bridal Bouquet', 'Ceremony Flowers', 'Reception Flowers',
+                          'Boutonnieres', 'Flower Wall'],
+                ['Seasonal blooms', 'Delivery', 'Preservation', 'Dried flowers',
+                 'Setup included']),
+    'Event Planning': (8, 3500, ['Full Planning', 'Day-of Coordination', 'Partial Planning',
+                                 'Destination Planning'],
+                       ['Vendor sourcing', 'Budget tracking', 'Timeline', 'Rehearsal',
+                        'Guest management']),
+    'Transportation': (5, 800, ['Classic Car', 'Limousine', 'Guest Shuttle', 'Horse Carriage'],
+                       ['Chauffeur', 'Decorations', 'Champagne', 'Airport pickup']),
+    'Videography': (5, 2600, ['Highlight Film', 'Full Ceremony Film', 'Drone Video'],
+                    ['4K', 'Same-day edit', 'Livestream', 'Raw footage']),
+    'Makeup & Hair': (5, 600, ['Bridal Makeup', 'Bridal Party Hair', 'Trial Session'],
+                      ['On-site', 'Airbrush', 'Touch-up kit', 'Lashes']),
+}
+CATEGORIES = list(CATEGORY_PROFILES)
+_CATEGORY_WEIGHTS = [profile[0] for profile in CATEGORY_PROFILES.values()]
+
+ADJECTIVES = ['Golden', 'Rustic', 'Elegant', 'Modern', 'Classic', 'Garden', 'Coastal',
+              'Vintage', 'Royal', 'Bright', 'Evergreen', 'Silver', 'Blush', 'Urban']
+CITIES = ['Nairobi', 'Mombasa', 'Kisumu', 'Nakuru', 'Eldoret', 'Thika', 'Naivasha', 'Malindi']
+DURATIONS = ['2 hours', '4 hours', '6 hours', '8 hours', 'Full day', 'Per event']
+DESCRIPTION_WORDS = ['wedding', 'bespoke', 'memorable', 'experienced', 'friendly', 'premium',
+                     'affordable', 'luxury', 'intimate', 'outdoor', 'traditional', 'modern',
+                     'destination', 'family-run', 'award-winning', 'creative']
+
+VENDOR_COLUMNS = ('id', 'user_id', 'business_name', 'owner_name', 'email', 'service_type',
+                  'description', 'contact_phone', 'address', 'experience', 'website',
+                  'instagram', 'is_active', 'rating', 'total_reviews', 'created_at',
+                  'updated_at', 'latitude', 'longitude', 'geo_cell')
+SERVICE_COLUMNS = ('vendor_id', 'service_name', 'category', 'price', 'duration',
+                   'description', 'features', 'views', 'inquiries', 'bookings',
+                   'is_active', 'created_at', 'updated_at')
+
+# Vendors sit around their city centre with this spread (about 4.5 km)
+CITY_SPREAD_DEGREES = 0.04
+
+# Fixed reference point so timestamps do not depend on when the generator runs
+EPOCH = datetime(2025, 1, 1)
+
+
+def _services_per_vendor(rng):
+    # Mostly 2-5 services, a long tail of large vendors
+    return max(1, min(30, int(rng.lognormvariate(1.2, 0.6))))
+
+
+def _features(rng, pool):
+    # Earlier features in a pool are more common
+    count = rng.randint(1, min(5, len(pool)))
+    weights = [1 / (rank + 1) for rank in range(len(pool))]
+    chosen = []
+    while len(chosen) < count:
+        feature = rng.choices(pool, weights)[0]
+        if feature not in chosen:
+            chosen.append(feature)
+    return chosen
+
+
+def _vendor_row(rng, geo_rng, vendor_id, user_id, category, stamp):
+    name = f"{rng.choice(ADJECTIVES)} {rng.choice(CITIES)} {category} {vendor_id}"
+    reviews = 0 if rng.random() < 0.15 else int(rng.paretovariate(1.3) * 3)
+    rating = 0.0 if not reviews else round(min(5.0, max(1.0, rng.gauss(4.3, 0.5))), 1)
+    created = stamp(EPOCH - timedelta(days=rng.randint(0, 3 * 365)))
+    description = ' '.join(rng.choices(DESCRIPTION_WORDS, k=rng.randint(8, 25)))
+    phone = f"+2547{rng.randint(10_000_000, 99_999_999)}"
+    street = rng.randint(1, 400)
+    city = rng.choice(CITIES)
+    return (
+        vendor_id, user_id, name, f"Owner {user_id}", f"vendor{user_id}@example.com", category,
+        description, phone, f"{street} Main Road, {city}",
+        f"{rng.randint(1, 20)} years", f"https://vendor{user_id}.example.com",
+        f"@vendor{user_id}", rng.random() > 0.03, rating, reviews, created, created,
+        *_location(geo_rng, city),
+    )
+
+
+def _location(rng, city):
+    """(latitude, longitude, geo_cell) scattered around a city centre"""
+    centre = load_places()[0][city.lower()]
+    latitude = round(centre.latitude + rng.gauss(0, CITY_SPREAD_DEGREES), 6)
+    longitude = round(centre.longitude + rng.gauss(0, CITY_SPREAD_DEGREES), 6)
+    return latitude, longitude, grid_cell(latitude, longitude)
+
+
+def _service_row(rng, vendor_id, vendor_category, stamp):
+    # Vendors sell mostly, but not only, within their own category
+    category = vendor_category if rng.random() < 0.8 else rng.choices(CATEGORIES, _CATEGORY_WEIGHTS)[0]
+    _, median_price, names, pool = CATEGORY_PROFILES[category]
+    views = int(rng.paretovariate(1.1) * 10) - 10
+    inquiries = int(views * rng.betavariate(1, 12))
+    bookings = int(inquiries * rng.betavariate(1, 4))
+    created = stamp(EPOCH - timedelta(days=rng.randint(0, 2 * 365)))
+    return (
+        vendor_id, rng.choice(names), category,
+        round(median_price * rng.lognormvariate(0, 0.5), -1), rng.choice(DURATIONS),
+        ' '.join(rng.choices(DESCRIPTION_WORDS, k=rng.randint(6, 18))),
+        json.dumps(_features(rng, pool)), views, inquiries, bookings,
+        rng.random() > 0.07, created, created,
+    )
+
+
+def _insert(table, columns, rows):
+    connection = db.session.connection()
+    placeholder = '?' if connection.dialect.paramstyle == 'qmark' else '%s'
+    connection.exec_driver_sql(
+        f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join([placeholder] * len(columns))})",
+        rows,
+    )
+
+
+def generate_catalog(n_services, seed=42, batch_size=10_000):
+    """Append vendors until ``n_services`` services were written; returns (vendors, services).
+
+    Rows go straight to the driver in batches of about ``batch_size``
+    services, one transaction per batch. The search index and vendor_stats
+    are not touched; rebuild them afterwards.
+    """
+    rng = random.Random(seed)
+    # Locations come from their own stream so the other columns stay as they were
+    geo_rng = random.Random(f'{seed}:locations')
+    datetime_type = Vendor.__table__.c.created_at.type.dialect_impl(db.engine.dialect)
+    to_db = datetime_type.bind_processor(db.engine.dialect)
+    stamp = to_db or (lambda value: value)
+
+    # The ids below are taken from this read, so hold the write lock from it on
+    begin_write(db.session)
+    last_id, last_user_id = db.session.execute(
+        db.text("SELECT COALESCE(MAX(id), 0), COALESCE(MAX(user_id), 0) FROM vendors")).one()
+    n_vendors = written = 0
+    vendors, services = [], []
+    while written < n_services:
+        n_vendors += 1
+        vendor_id = last_id + n_vendors
+        category = rng.choices(CATEGORIES, _CATEGORY_WEIGHTS)[0]
+        vendors.append(_vendor_row(rng, geo_rng, vendor_id, last_user_id + n_vendors, category, stamp))
+        for _ in range(min(_services_per_vendor(rng), n_services - written)):
+            services.append(_service_row(rng, vendor_id, category, stamp))
+            written += 1
+
+        if len(services) >= batch_size or written >= n_services:
+            _insert('vendors', VENDOR_COLUMNS, vendors)
+            _insert('services', SERVICE_COLUMNS, services)
+            db.session.commit()
+            vendors, services = [], []
+    return n_vendors, written
+
+
+def parse_scale(value):
+    """'100k' -> 100000; plain integers are accepted too"""
+    key = str(value).lower()
+    if key in SCALES:
+        return SCALES[key]
+    try:
+        count = int(key)
+    except ValueError:
+        raise ValueError(f"Unknown scale {value!r}; use one of {', '.join(SCALES)} or a number")
+    if count <= 0:
+        raise ValueError("Scale must be positive")
+    return count
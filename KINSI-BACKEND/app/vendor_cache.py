@@ -0,0 +1,203 @@
+# app/vendor_cache.py
+"""In-process identity cache of vendor records, by id and by user_id.
+
+Profile, service and service-creation handlers resolve a vendor on every
+request just to serialize it or check that it exists. find_vendor answers
+from a bounded LRU of serialized records (every VENDOR_FIELDS column) that
+expire after VENDOR_CACHE_TTL seconds, and falls back to one query.
+
+Each gunicorn worker has its own LRU, so entries are validated against
+version stamps (app/stamps.py): a small file of 8-byte counters,
+memory-mapped by every worker of the host, with one global counter, the
+time of the last bump and VENDOR_CACHE_STAMP_SLOTS per-vendor slots
+(vendor id modulo slots).
+A write bumps the global counter and then the vendor's slot after its
+commit; a hit costs one read of the slot. A miss reads the global counter
+before (lookup_vendor) and after (remember_vendor) its query and only
+stores the record when no write was bumped in between, so an entry can never carry a newer version than its
+data. Nor does it store a record read from a read replica that may
+predate the last bump.
+
+Writes through the ORM are picked up by mapper events (updates, and
+deletes, including cascades) and forgotten after the session commits.
+Raw-SQL writers call forget_vendors themselves, next to invalidate().
+"""
+import threading
+import time
+from collections import Counter, OrderedDict
+
+from flask import current_app, has_app_context
+from sqlalchemy import event, select
+from sqlalchemy.orm import load_only, object_session
+
+from app import db
+from app.engine import RoutingSession, replica_snapshot
+from app.models.vendors import Vendor
+from app.serializers import VENDOR_FIELDS, load_columns, serialize_vendor
+from app.stamps import VersionStamps, default_stamp_path
+
+_PENDING_KEY = 'vendor_cache_forget'
+
+
+class VendorCache:
+    """Bounded LRU of serialized vendor records keyed by id, with a user_id index"""
+
+    def __init__(self, stamps, max_entries=10000, ttl=300.0):
+        self.stamps = stamps
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.counts = Counter()
+        # id -> (record, slot version, expiry on the monotonic clock)
+        self._entries = OrderedDict()
+        self._by_user = {}
+        self._lock = threading.Lock()
+
+    def get(self, vendor_id=None, user_id=None):
+        """Return (record, outcome), outcome being 'hit', 'miss' or 'stale'"""
+        with self._lock:
+            if user_id is not None:
+                vendor_id = self._by_user.get(user_id)
+            entry = self._entries.get(vendor_id)
+            if entry is None:
+                outcome, record = 'miss', None
+            elif entry[2] < time.monotonic() or entry[1] != self.stamps.version(vendor_id):
+                self._drop(vendor_id)
+                outcome, record = 'stale', None
+            else:
+                self._entries.move_to_end(vendor_id)
+                outcome, record = 'hit', entry[0]
+            self.counts[outcome] += 1
+            return record, outcome
+
+    def put(self, record, version):
+        vendor_id = record['id']
+        with self._lock:
+            self._drop(vendor_id)
+            self._entries[vendor_id] = (record, version, time.monotonic() + self.ttl)
+            self._by_user[record['user_id']] = vendor_id
+            while len(self._entries) > self.max_entries:
+                self._drop(next(iter(self._entries)))
+
+    def forget(self, vendor_ids):
+        """Drop vendors here and bump their stamps for the other workers"""
+        vendor_ids = list(vendor_ids)
+        if not vendor_ids:
+            return
+        self.stamps.bump(vendor_ids)
+        with self._lock:
+            for vendor_id in vendor_ids:
+                self._drop(vendor_id)
+
+    def _drop(self, vendor_id):
+        entry = self._entries.pop(vendor_id, None)
+        if entry is not None and self._by_user.get(entry[0]['user_id']) == vendor_id:
+            del self._by_user[entry[0]['user_id']]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._by_user.clear()
+
+    def stats(self):
+        with self._lock:
+            return {'entries': len(self._entries), **self.counts}
+
+
+def init_vendor_cache(app):
+    """Attach the cache to the app and hook vendor writes; call after db.init_app"""
+    if not app.config.get('VENDOR_CACHE_ENABLED'):
+        app.extensions['vendor_cache'] = None
+        return
+    path = app.config.get('VENDOR_CACHE_STAMP_PATH') or \
+        default_stamp_path(app.config['SQLALCHEMY_DATABASE_URI'], 'vendor-stamps')
+    stamps = VersionStamps(path, app.config.get('VENDOR_CACHE_STAMP_SLOTS', 4096))
+    app.extensions['vendor_cache'] = VendorCache(stamps,
+                                                 app.config.get('VENDOR_CACHE_MAX_ENTRIES', 10000),
+                                                 app.config.get('VENDOR_CACHE_TTL', 300.0))
+    if not event.contains(Vendor, 'after_update', _vendor_written):
+        event.listen(Vendor, 'after_update', _vendor_written)
+        event.listen(Vendor, 'after_delete', _vendor_written)
+        event.listen(RoutingSession, 'after_commit', _forget_committed)
+        event.listen(RoutingSession, 'after_rollback', _discard_pending)
+
+
+def get_vendor_cache():
+    return current_app.extensions.get('vendor_cache')
+
+
+def forget_vendors(vendor_ids):
+    """Invalidate cached vendors; call after the write has been committed"""
+    cache = get_vendor_cache()
+    if cache is not None:
+        cache.forget(vendor_ids)
+
+
+def vendor_query(vendor_id=None, user_id=None):
+    """The select() a cache miss runs, by id or user_id"""
+    query = select(Vendor).options(load_only(*load_columns(Vendor, VENDOR_FIELDS)))
+    if user_id is not None:
+        return query.filter(Vendor.user_id == user_id).limit(1)
+    return query.filter(Vendor.id == vendor_id).limit(1)
+
+
+def lookup_vendor(vendor_id=None, user_id=None):
+    """(cached record or None, token for remember_vendor after a miss's query)"""
+    cache = get_vendor_cache()
+    if cache is None:
+        return None, None
+    record, outcome = cache.get(vendor_id, user_id)
+    registry = current_app.extensions.get('metrics')
+    if registry is not None:
+        registry.inc('kinsi_vendor_cache_lookups_total', (('result', outcome),))
+    return record, None if record is not None else cache.stamps.generation()
+
+
+def remember_vendor(vendor, generation):
+    """Serialize what a miss's vendor_query returned (None if no vendor) and
+    cache it unless a vendor write was bumped since lookup_vendor"""
+    if vendor is None:
+        return None
+    record = serialize_vendor(vendor)
+    cache = get_vendor_cache()
+    if cache is not None and generation is not None:
+        version = cache.stamps.version(vendor.id)
+        snapshot = replica_snapshot()
+        if cache.stamps.generation() == generation and \
+                (snapshot is None or snapshot >= cache.stamps.bumped_at()):
+            cache.put(record, version)
+    return record
+
+
+def find_vendor(vendor_id=None, user_id=None):
+    """The serialized vendor (every VENDOR_FIELDS column) by id or user_id, or None.
+
+    The record may be shared with other requests and must not be modified.
+    """
+    record, generation = lookup_vendor(vendor_id, user_id)
+    if record is not None:
+        return record
+    vendor = db.session.scalars(vendor_query(vendor_id, user_id)).first()
+    return remember_vendor(vendor, generation)
+
+
+def project(record, fields):
+    """The ``?fields=`` projection of a cached record"""
+    if fields == VENDOR_FIELDS:
+        return record
+    return {field: record[field] for field in fields}
+
+
+def _vendor_written(mapper, connection, vendor):
+    session = object_session(vendor)
+    if session is not None:
+        session.info.setdefault(_PENDING_KEY, set()).add(vendor.id)
+
+
+def _forget_committed(session):
+    vendor_ids = session.info.pop(_PENDING_KEY, None)
+    if vendor_ids and has_app_context():
+        forget_vendors(vendor_ids)
+
+
+def _discard_pending(session):
+    session.info.pop(_PENDING_KEY, None)
@@ -0,0 +1,170 @@
+# benchmarks/bench_admission.py
+"""Overload: admission control off vs. on, against a local gunicorn.
+
+A copy of the seeded catalog is served by gthread workers with
+ADMISSION_CLIENT_HEADER=X-Forwarded-For, so every simulated client gets
+its own address. For ``--seconds`` each, with admission off and then on,
+closed-loop threads (each sends its next request as soon as the last one
+is answered, ignoring Retry-After, as a misbehaving client would) run:
+
+* scrapers: ``--scrapers`` threads sharing four addresses, paging through
+  /api/vendors?limit=200 (low priority, and over the per-client rate)
+* browsers: ``--browsers`` threads, one address each, searching and
+  opening profiles (normal priority)
+* vendors: ``--vendors`` threads, one address each, alternating
+  /api/vendor/dashboard loads (normal) and profile updates (high)
+
+Per class it prints the requests answered by status and p50/p99 latency
+of the successful ones and of every response. Without admission every
+class waits in the same queue and p99 grows with it; with admission the
+scrapers' excess is refused cheaply (429, then 503 once low-priority
+slots are full) and vendor p99 stays bounded. Closed-loop vendor threads
+run far above the default 20 requests/s per client, so some of them are
+refused too.
+
+    python benchmarks/bench_admission.py --scale 100k
+"""
+import argparse
+import http.client
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+
+from bench_http import WORDS, GunicornTarget, catalog_ids, catalog_path, percentile
+
+
+def scraper(rng, ids, index):
+    return 'GET', f"/api/vendors?limit=200&cursor={rng.randint(0, ids['vendors'])}", None, f'10.1.0.{index % 4}'
+
+
+def browser(rng, ids, index):
+    if rng.random() < 0.5:
+        path = f"/api/vendors/search?q={rng.choice(WORDS)}"
+    else:
+        path = f"/api/vendor/profile/{rng.randint(1, ids['users'])}"
+    return 'GET', path, None, f'10.2.{index // 250}.{index % 250}'
+
+
+def vendor(rng, ids, index):
+    user_id = rng.randint(1, ids['users'])
+    address = f'10.3.{index // 250}.{index % 250}'
+    if rng.random() < 0.5:
+        return 'GET', f'/api/vendor/dashboard/{user_id}', None, address
+    return 'POST', '/api/vendor/profile', {'user_id': user_id, 'description': f'Updated {rng.random()}'}, address
+
+
+CLASSES = {'scrapers': scraper, 'browsers': browser, 'vendors': vendor}
+
+
+def run_load(port, counts, seconds, seed):
+    """Closed-loop load for ``seconds``; returns {class: [(status, ms)]}"""
+    results = {name: [] for name in CLASSES}
+    lock = threading.Lock()
+    deadline = time.monotonic() + seconds
+    ids = counts.pop('ids')
+
+    def run(name, index):
+        build = CLASSES[name]
+        rng = random.Random(f'{seed}-{name}-{index}')
+        conn = http.client.HTTPConnection('127.0.0.1', port, timeout=300)
+        samples = []
+        while time.monotonic() < deadline:
+            method, path, body, address = build(rng, ids, index)
+            headers = {'X-Forwarded-For': address}
+            payload = None
+            if body is not None:
+                payload, headers['Content-Type'] = json.dumps(body).encode(), 'application/json'
+            start = time.perf_counter()
+            try:
+                conn.request(method, path, body=payload, headers=headers)
+                response = conn.getresponse()
+                response.read()
+                status = response.status
+            except (OSError, http.client.HTTPException):
+                conn.close()
+                conn = http.client.HTTPConnection('127.0.0.1', port, timeout=300)
+                status = 599
+            samples.append((status, (time.perf_counter() - start) * 1000))
+        conn.close()
+        with lock:
+            results[name].extend(samples)
+
+    threads = [threading.Thread(target=run, args=(name, index))
+               for name, count in counts.items() for index in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+def report(label, results, seconds):
+    print(label)
+    print(f"  {'':<10}{'req/s':>8}{'2xx':>8}{'429':>8}{'503':>8}{'other':>8}"
+          f"{'ok p50/p99 ms':>20}{'all p50/p99 ms':>20}")
+    for name, samples in results.items():
+        statuses = Counter(status for status, _ in samples)
+        ok = sorted(ms for status, ms in samples if status < 400)
+        every = sorted(ms for _, ms in samples)
+        other = sum(count for status, count in statuses.items()
+                    if status >= 400 and status not in (429, 503))
+
+        def pair(values):
+            if not values:
+                return f"{'-':>20}"
+            return f"{percentile(values, 0.50):>11.1f}/{percentile(values, 0.99):<8.1f}"
+        print(f"  {name:<10}{len(samples) / seconds:>8.0f}{len(ok):>8}{statuses[429]:>8}"
+              f"{statuses[503]:>8}{other:>8}{pair(ok)}{pair(every)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--scale', default='100k', help="Catalog size: 1k, 100k, 1m or a service count")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--seconds', type=float, default=15.0, help="Load duration per mode")
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--threads', type=int, default=8, help="gthread threads per worker")
+    parser.add_argument('--max-in-flight', type=int, default=4, help="ADMISSION_MAX_IN_FLIGHT")
+    parser.add_argument('--scrapers', type=int, default=16)
+    parser.add_argument('--browsers', type=int, default=8)
+    parser.add_argument('--vendors', type=int, default=4)
+    args = parser.parse_args()
+
+    print(f"{args.scale} catalog, {args.workers} workers x {args.threads} threads, "
+          f"{args.scrapers} scrapers, {args.browsers} browsers, {args.vendors} vendors, "
+          f"{args.seconds:g} s per mode")
+    with tempfile.TemporaryDirectory() as tmp:
+        baseline = None
+        for enabled in (False, True):
+            # A fresh copy each time, so both modes start from the same catalog
+            db_path = os.path.join(tmp, f'catalog-{int(enabled)}.db')
+            shutil.copyfile(catalog_path(args.scale, args.seed), db_path)
+            ids = catalog_ids(db_path, 0)
+            target = GunicornTarget(db_path, None, args.workers, args.threads, env={
+                'ADMISSION_ENABLED': '1' if enabled else '0',
+                'ADMISSION_CLIENT_HEADER': 'X-Forwarded-For',
+                'ADMISSION_MAX_IN_FLIGHT': str(args.max_in_flight),
+            })
+            try:
+                if baseline is None:
+                    # Vendors alone, to show what an unloaded p99 looks like
+                    baseline = run_load(target.port, {'ids': ids, 'vendors': args.vendors},
+                                        min(args.seconds, 5.0), args.seed)
+                    report("vendors alone", {'vendors': baseline['vendors']}, min(args.seconds, 5.0))
+                results = run_load(target.port, {'ids': ids, 'scrapers': args.scrapers,
+                                                 'browsers': args.browsers, 'vendors': args.vendors},
+                                   args.seconds, args.seed)
+            finally:
+                target.close()
+            report(f"admission {'on' if enabled else 'off'}", results, args.seconds)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
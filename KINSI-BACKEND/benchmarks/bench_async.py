@@ -0,0 +1,204 @@
+# benchmarks/bench_async.py
+"""Sync (gunicorn) vs async (uvicorn, app/asgi.py) serving under high concurrency.
+
+Both servers are started on copies of the same seeded catalog and driven
+by an asyncio client holding ``--clients`` keep-alive connections open at
+once, each sending the same seeded mix of read requests (profile, stats,
+services, search) back to back for ``--duration`` seconds. Reports
+requests/sec, latency percentiles and errors per mode. The response cache
+is off by default so every request reaches the database.
+
+    python benchmarks/bench_async.py --scale 100k --clients 500 --duration 20
+"""
+import argparse
+import asyncio
+import http.client
+import json
+import os
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+from bench_http import CATEGORIES, ROOT, WORDS, catalog_ids, catalog_path, percentile
+
+READ_MIX = [
+    (4, lambda rng, ids: f"/api/vendor/profile/{rng.randint(1, ids['users'])}"),
+    (2, lambda rng, ids: f"/api/vendor/stats/{rng.randint(1, ids['vendors'])}"),
+    (2, lambda rng, ids: f"/api/vendor/services/{rng.randint(1, ids['vendors'])}"),
+    (1, lambda rng, ids: f"/api/vendors/search?q={rng.choice(WORDS)}&limit=10"),
+    (1, lambda rng, ids: f"/api/vendors/search?category={rng.choice(CATEGORIES)}&limit=10"),
+]
+
+
+def build_paths(ids, count, seed):
+    rng = random.Random(seed)
+    weights = [weight for weight, _ in READ_MIX]
+    builders = [build for _, build in READ_MIX]
+    return [rng.choices(builders, weights)[0](rng, ids) for _ in range(count)]
+
+
+class Server:
+    """A local server process on a free port"""
+
+    def __init__(self, command, db_path, cache_backend):
+        with socket.socket() as sock:
+            sock.bind(('127.0.0.1', 0))
+            self.port = sock.getsockname()[1]
+        env = {**os.environ, 'DATABASE_URL': 'sqlite:///' + db_path,
+               'RESPONSE_CACHE_BACKEND': cache_backend or 'none', 'METRICS_ENABLED': '0',
+               'ADMISSION_ENABLED': '0'}
+        self.proc = subprocess.Popen([arg.format(port=self.port) for arg in command],
+                                     env=env, cwd=ROOT)
+        self._wait_ready()
+
+    def _wait_ready(self, timeout=60):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if self.proc.poll() is not None:
+                raise RuntimeError("server exited during startup")
+            try:
+                conn = http.client.HTTPConnection('127.0.0.1', self.port, timeout=5)
+                conn.request('GET', '/api/vendor/stats/1')
+                conn.getresponse().read()
+                conn.close()
+                return
+            except OSError:
+                time.sleep(0.2)
+        raise RuntimeError("server did not start")
+
+    def close(self):
+        self.proc.terminate()
+        self.proc.wait(timeout=30)
+
+
+def _parse_head(head):
+    lines = head.decode('latin-1').split('\r\n')
+    status = int(lines[0].split(' ', 2)[1])
+    length, close = None, False
+    for line in lines[1:]:
+        name, _, value = line.partition(':')
+        name = name.strip().lower()
+        if name == 'content-length':
+            length = int(value)
+        elif name == 'connection' and value.strip().lower() == 'close':
+            close = True
+    if length is None:
+        raise ValueError("response without Content-Length")
+    return status, length, close
+
+
+async def _client(port, paths, offset, deadline, measure_from, stats):
+    reader = writer = None
+    n = offset
+    while time.perf_counter() < deadline:
+        if writer is None:
+            try:
+                reader, writer = await asyncio.open_connection('127.0.0.1', port)
+            except OSError:
+                stats['errors'].append(599)
+                await asyncio.sleep(0.05)
+                continue
+        path = paths[n % len(paths)]
+        n += 1
+        start = time.perf_counter()
+        try:
+            writer.write(f"GET {path} HTTP/1.1\r\nHost: 127.0.0.1\r\n\r\n".encode())
+            status, length, close = _parse_head(await reader.readuntil(b'\r\n\r\n'))
+            await reader.readexactly(length)
+        except (OSError, ValueError, asyncio.IncompleteReadError, asyncio.LimitOverrunError):
+            status, close = 599, True
+        if start >= measure_from:
+            stats['latencies'].append((time.perf_counter() - start) * 1000)
+            if status >= 400:
+                stats['errors'].append(status)
+        if close:
+            writer.close()
+            writer = None
+    if writer is not None:
+        writer.close()
+
+
+async def _drive(port, paths, clients, duration, warmup):
+    stats = {'latencies': [], 'errors': []}
+    start = time.perf_counter()
+    measure_from = start + warmup
+    deadline = measure_from + duration
+    stride = max(1, len(paths) // clients)
+    await asyncio.gather(*(_client(port, paths, i * stride, deadline, measure_from, stats)
+                           for i in range(clients)))
+    return stats, time.perf_counter() - measure_from
+
+
+def measure(port, paths, clients, duration, warmup):
+    stats, seconds = asyncio.run(_drive(port, paths, clients, duration, warmup))
+    latencies = sorted(stats['latencies'])
+    return {
+        'requests': len(latencies),
+        'errors': len(stats['errors']),
+        'throughput': len(latencies) / seconds if seconds else 0.0,
+        'p50_ms': percentile(latencies, 0.50),
+        'p95_ms': percentile(latencies, 0.95),
+        'p99_ms': percentile(latencies, 0.99),
+    }
+
+
+def server_commands(workers, threads):
+    return {
+        'sync': [sys.executable, '-m', 'gunicorn', '--workers', str(workers),
+                 '--threads', str(threads), '--bind', '127.0.0.1:{port}',
+                 '--log-level', 'warning', 'app:create_app()'],
+        'async': [sys.executable, '-m', 'uvicorn', '--factory', 'app.asgi:create_asgi_app',
+                  '--workers', str(workers), '--host', '127.0.0.1', '--port', '{port}',
+                  '--log-level', 'warning', '--no-access-log'],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--scale', default='1k', help="Catalog size: 1k, 100k, 1m or a service count")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--modes', default='sync,async')
+    parser.add_argument('--clients', type=int, default=500, help="Concurrent connections")
+    parser.add_argument('--duration', type=float, default=10.0, help="Measured seconds per mode")
+    parser.add_argument('--warmup', type=float, default=2.0)
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--threads', type=int, default=8, help="gunicorn threads per worker")
+    parser.add_argument('--cache', choices=['memory', 'sqlite', 'none'], default='none',
+                        help="Response cache backend")
+    parser.add_argument('--output', help="Write results to this JSON file")
+    args = parser.parse_args()
+
+    source = catalog_path(args.scale, args.seed)
+    paths = build_paths(catalog_ids(source, 0), 20_000, args.seed)
+    commands = server_commands(args.workers, args.threads)
+    cache = None if args.cache == 'none' else args.cache
+
+    results = {'scale': args.scale, 'clients': args.clients, 'workers': args.workers,
+               'threads': args.threads, 'cache': args.cache, 'modes': {}}
+    print(f"{args.clients} clients, {args.workers} workers, {args.duration:.0f}s per mode")
+    print(f"{'mode':<8}{'req/s':>10}{'p50':>9}{'p95':>9}{'p99':>9}{'errors':>8}")
+    for mode in args.modes.split(','):
+        with tempfile.TemporaryDirectory() as tmp:
+            db_path = os.path.join(tmp, 'catalog.db')
+            shutil.copyfile(source, db_path)
+            server = Server(commands[mode], db_path, cache)
+            try:
+                result = measure(server.port, paths, args.clients, args.duration, args.warmup)
+            finally:
+                server.close()
+        results['modes'][mode] = result
+        print(f"{mode:<8}{result['throughput']:>10.1f}{result['p50_ms'] or 0:>9.1f}"
+              f"{result['p95_ms'] or 0:>9.1f}{result['p99_ms'] or 0:>9.1f}{result['errors']:>8}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
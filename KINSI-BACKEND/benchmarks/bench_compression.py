@@ -0,0 +1,106 @@
+# benchmarks/bench_compression.py
+"""Response compression: bytes on the wire, CPU and latency per coding.
+
+For each seeded catalog (``--scales`` are service counts; the synthetic
+catalogs have about 3.5 services per vendor, so the defaults give roughly
+1k and 10k vendors) every page of GET /api/vendors?limit=200 is fetched
+through the test client with Accept-Encoding set to each coding in turn:
+
+* cache off: every page is serialized and compressed per request
+* cache on: repeat hits, after one pass has stored the pages and their
+  compressed copies next to the ETag
+
+Per walk it prints bytes on the wire, CPU time and p50/p95 latency per
+page, and the time to load the whole catalog over a ``--mbps`` link
+(server time plus transfer). Codings whose package is missing (brotli,
+zstandard) are skipped.
+
+    python benchmarks/bench_compression.py
+"""
+import argparse
+import gzip
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+from common import make_app
+from bench_http import catalog_path, percentile
+from app.compression import ENCODERS
+
+DECODERS = {'identity': lambda body: body, 'gzip': gzip.decompress}
+if 'br' in ENCODERS:
+    import brotli
+    DECODERS['br'] = brotli.decompress
+if 'zstd' in ENCODERS:
+    import zstandard
+    DECODERS['zstd'] = lambda body: zstandard.ZstdDecompressor().decompress(body)
+
+
+def walk(client, encoding):
+    """Every catalog page with one Accept-Encoding; returns (bodies, latencies ms, CPU s)"""
+    headers = {'Accept-Encoding': encoding}
+    bodies, latencies = [], []
+    path = '/api/vendors?limit=200'
+    cpu = time.process_time()
+    while path:
+        start = time.perf_counter()
+        response = client.get(path, headers=headers)
+        latencies.append((time.perf_counter() - start) * 1000)
+        bodies.append((response.headers.get('Content-Encoding', 'identity'), response.get_data()))
+        cursor = response.headers.get('X-Next-Cursor')
+        path = f'/api/vendors?limit=200&cursor={cursor}' if cursor else None
+    return bodies, latencies, time.process_time() - cpu
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--scales', default='3500,35000', help="Comma-separated catalog sizes (services)")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--repeat', type=int, default=3, help="Walks per coding; the fastest is kept")
+    parser.add_argument('--mbps', type=float, default=20.0, help="Link speed for the catalog load time")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for scale in args.scales.split(','):
+            db_path = os.path.join(tmp, f'catalog-{scale}.db')
+            shutil.copyfile(catalog_path(scale, args.seed), db_path)
+            reference = None
+            for backend in (None, 'memory'):
+                app = make_app(db_path, RESPONSE_CACHE_BACKEND=backend)
+                client = app.test_client()
+                if reference is None:
+                    reference = [body for _, body in walk(client, 'identity')[0]]
+                    print(f"\n{scale} services, {len(reference)} pages, cache {backend or 'off'}")
+                else:
+                    print(f"\n{scale} services, cache {backend or 'off'} (repeat hits)")
+                print(f"{'':<10}{'KiB/page':>10}{'ratio':>8}{'CPU ms/page':>13}"
+                      f"{'p50/p95 ms':>16}{f'load @{args.mbps:g} Mbit/s':>22}")
+                for encoding in DECODERS:
+                    if backend:
+                        walk(client, encoding)
+                    best = None
+                    for _ in range(args.repeat):
+                        bodies, latencies, cpu = walk(client, encoding)
+                        if best is None or cpu < best[2]:
+                            best = bodies, latencies, cpu
+                    bodies, latencies, cpu = best
+                    if [coding for coding, _ in bodies] != [encoding] * len(bodies) or \
+                            [DECODERS[encoding](body) for _, body in bodies] != reference:
+                        print(f"{encoding}: responses differ from the identity walk")
+                        return 1
+                    size = sum(len(body) for _, body in bodies)
+                    latencies.sort()
+                    load = sum(latencies) / 1000 + size * 8 / (args.mbps * 1e6)
+                    print(f"{encoding:<10}{size / len(bodies) / 1024:>10.1f}"
+                          f"{sum(map(len, reference)) / size:>8.1f}"
+                          f"{cpu * 1000 / len(bodies):>13.2f}"
+                          f"{percentile(latencies, 0.50):>9.2f}/{percentile(latencies, 0.95):<6.2f}"
+                          f"{load:>20.2f} s")
+                app.extensions['counter_buffer'].stop()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,54 @@
+# benchmarks/bench_counters.py
+"""Counter ingestion throughput: write-behind buffer vs. one commit per increment.
+
+Drives POST /api/vendor/services/<id>/counters from several threads, once
+with buffering on and once with COUNTER_FLUSH_INTERVAL = 0 (write-through).
+
+    python benchmarks/bench_counters.py [increments_per_thread] [threads]
+"""
+import sys
+import threading
+import time
+
+from common import fill_catalog, make_app
+from app import db
+
+N_SERVICES = 5000
+
+
+def run(app, per_thread, n_threads):
+    def worker(offset):
+        client = app.test_client()
+        for n in range(per_thread):
+            service_id = (offset * per_thread + n) % N_SERVICES + 1
+            client.post(f'/api/vendor/services/{service_id}/counters', json={'views': 1})
+
+    threads = [threading.Thread(target=worker, args=(t,)) for t in range(n_threads)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    app.extensions['counter_buffer'].flush()
+    elapsed = time.perf_counter() - start
+
+    with app.app_context():
+        total = db.session.execute(db.text("SELECT SUM(views) FROM services")).scalar()
+    return per_thread * n_threads / elapsed, total
+
+
+def main():
+    per_thread = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    n_threads = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+    print(f"{per_thread * n_threads} increments from {n_threads} threads")
+    for label, interval in [('buffered', 2.0), ('write-through', 0)]:
+        app = make_app()
+        app.extensions['counter_buffer'].flush_interval = interval
+        with app.app_context():
+            fill_catalog(N_SERVICES // 5, services_per_vendor=5)
+        rate, total = run(app, per_thread, n_threads)
+        print(f"{label:<14}{rate:>10.0f} increments/s   (views written: {total})")
+
+
+if __name__ == '__main__':
+    main()
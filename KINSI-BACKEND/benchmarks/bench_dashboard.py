@@ -0,0 +1,94 @@
+# benchmarks/bench_dashboard.py
+"""Vendor dashboard: three chained requests vs. GET /api/vendor/dashboard.
+
+``chain`` is what VendorDashBoard.jsx does today: /vendor/profile/<user>,
+then /vendor/services/<vendor> and /vendor/stats/<vendor> with the id the
+first response returned. ``dashboard`` is the composite endpoint. Both run
+through the test client on a copy of the seeded catalog for random
+vendors, with the response cache off (every load a miss, as after any
+write) and on (repeat loads; the three chained endpoints are cached, the
+dashboard is not).
+
+Server time is measured; ``--rtt-ms`` adds the network round trips a
+browser would wait for, one per request, since the chained calls cannot
+overlap.
+
+    python benchmarks/bench_dashboard.py --scale 100k
+"""
+import argparse
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+from common import make_app
+from bench_http import catalog_path, percentile
+from app import db
+
+
+def load_chain(client, user_id):
+    vendor = client.get(f'/api/vendor/profile/{user_id}').get_json()
+    services = client.get(f"/api/vendor/services/{vendor['id']}").get_json()
+    stats = client.get(f"/api/vendor/stats/{vendor['id']}").get_json()
+    return vendor, services, stats
+
+
+def load_dashboard(client, user_id):
+    data = client.get(f'/api/vendor/dashboard/{user_id}').get_json()
+    return data['profile'], data['services'], data['stats']
+
+
+METHODS = {'chain': (load_chain, 3), 'dashboard': (load_dashboard, 1)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--scale', default='100k', help="Catalog size: 1k, 100k, 1m or a service count")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--loads', type=int, default=500, help="Dashboard loads per method")
+    parser.add_argument('--rtt-ms', type=float, default=30.0, help="Network round trip per request")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, 'catalog.db')
+        shutil.copyfile(catalog_path(args.scale, args.seed), db_path)
+        print(f"{args.scale} catalog, {args.loads} loads, {args.rtt_ms:g} ms RTT; p50/p95 ms")
+        print(f"{'':<26}{'server':>18}{'with RTT':>18}")
+        for backend in (None, 'memory'):
+            app = make_app(db_path, RESPONSE_CACHE_BACKEND=backend,
+                           RESPONSE_CACHE_MAX_ENTRIES=4 * args.loads)
+            client = app.test_client()
+            with app.app_context():
+                user_ids = db.session.execute(db.text(
+                    "SELECT user_id FROM vendors ORDER BY user_id")).scalars().all()
+                db.session.remove()
+            users = random.Random(args.seed).choices(user_ids, k=args.loads)
+
+            results = {}
+            for name, (load, requests) in METHODS.items():
+                if backend:
+                    for user_id in set(users):
+                        load(client, user_id)
+                samples = []
+                for user_id in users:
+                    start = time.perf_counter()
+                    results.setdefault(user_id, {})[name] = load(client, user_id)
+                    samples.append((time.perf_counter() - start) * 1000)
+                samples.sort()
+                p50, p95 = percentile(samples, 0.50), percentile(samples, 0.95)
+                rtt = requests * args.rtt_ms
+                label = f"{name}, cache {backend or 'off'}"
+                print(f"{label:<26}{p50:>9.2f}/{p95:<8.2f}{p50 + rtt:>9.2f}/{p95 + rtt:<8.2f}")
+
+            different = sum(1 for by_method in results.values()
+                            if by_method['chain'] != by_method['dashboard'])
+            if different:
+                print(f"{different} vendors differ between the chain and the dashboard")
+                return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,103 @@
+# benchmarks/bench_engine.py
+"""Concurrent read/write throughput and lock errors per engine profile.
+
+Several worker processes (standing in for gunicorn workers), each with a
+few threads, hit the same SQLite file with a mix of reads (services and
+stats) and writes (profile updates and new services). The response cache
+is off so every read reaches the database.
+
+    python benchmarks/bench_engine.py [processes] [threads] [seconds] [write_ratio]
+"""
+import multiprocessing
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+
+from common import fill_catalog, make_app
+
+N_VENDORS = 500
+
+
+def worker(db_path, profile, n_threads, seconds, write_ratio, results):
+    app = make_app(db_path, DB_ENGINE_PROFILE=profile, RESPONSE_CACHE_BACKEND=None,
+                   COUNTER_FLUSH_INTERVAL=0)
+    counts = {'reads': 0, 'writes': 0, 'errors': 0, 'locked': 0}
+    lock = threading.Lock()
+    deadline = time.perf_counter() + seconds
+
+    def run(seed):
+        rng = random.Random(seed)
+        client = app.test_client()
+        while time.perf_counter() < deadline:
+            vendor_id = rng.randint(1, N_VENDORS)
+            if rng.random() < write_ratio:
+                kind = 'writes'
+                if rng.random() < 0.5:
+                    response = client.post('/api/vendor/profile', json={
+                        'user_id': vendor_id, 'business_name': f'Vendor {rng.random()}'})
+                else:
+                    response = client.post('/api/vendor/services', json={
+                        'vendor_id': vendor_id, 'service_name': 'bench', 'category': 'Venue',
+                        'price': 100})
+            else:
+                kind = 'reads'
+                path = rng.choice(['/api/vendor/services/', '/api/vendor/stats/'])
+                response = client.get(f'{path}{vendor_id}')
+            with lock:
+                if response.status_code >= 500:
+                    counts['errors'] += 1
+                    if b'locked' in response.data:
+                        counts['locked'] += 1
+                else:
+                    counts[kind] += 1
+
+    threads = [threading.Thread(target=run, args=(os.getpid() * 100 + t,)) for t in range(n_threads)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    results.put(counts)
+
+
+def run_profile(profile, n_procs, n_threads, seconds, write_ratio):
+    db_path = os.path.join(tempfile.mkdtemp(prefix='kinsi-bench-'), 'bench.db')
+    app = make_app(db_path, DB_ENGINE_PROFILE=profile)
+    with app.app_context():
+        fill_catalog(N_VENDORS, services_per_vendor=5)
+        from app.stats import rebuild_vendor_stats
+        rebuild_vendor_stats()
+
+    results = multiprocessing.Queue()
+    procs = [multiprocessing.Process(target=worker, args=(db_path, profile, n_threads, seconds,
+                                                          write_ratio, results))
+             for _ in range(n_procs)]
+    for proc in procs:
+        proc.start()
+    totals = {'reads': 0, 'writes': 0, 'errors': 0, 'locked': 0}
+    for _ in procs:
+        for key, value in results.get().items():
+            totals[key] += value
+    for proc in procs:
+        proc.join()
+    return totals
+
+
+def main():
+    n_procs = int(sys.argv[1]) if len(sys.argv) > 1 else 4
+    n_threads = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+    seconds = float(sys.argv[3]) if len(sys.argv) > 3 else 10
+    write_ratio = float(sys.argv[4]) if len(sys.argv) > 4 else 0.2
+    print(f"{n_procs} processes x {n_threads} threads, {seconds:.0f}s, {write_ratio:.0%} writes")
+    print(f"{'profile':<12}{'reads/s':>10}{'writes/s':>10}{'errors':>8}{'locked':>8}{'error rate':>12}")
+    for profile in ('default', 'production'):
+        t = run_profile(profile, n_procs, n_threads, seconds, write_ratio)
+        total = t['reads'] + t['writes'] + t['errors']
+        print(f"{profile:<12}{t['reads'] / seconds:>10.0f}{t['writes'] / seconds:>10.0f}"
+              f"{t['errors']:>8}{t['locked']:>8}{t['errors'] / max(total, 1):>12.2%}")
+
+
+if __name__ == '__main__':
+    main()
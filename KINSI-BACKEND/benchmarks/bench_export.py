@@ -0,0 +1,74 @@
+# benchmarks/bench_export.py
+"""Peak RSS and time-to-first-byte of the catalog export.
+
+Compares the streamed /api/vendors/export (NDJSON and chunked JSON array)
+with building the whole list and passing it to jsonify, which is what
+GET /api/vendors did for the full catalog before it was paginated. Each
+mode runs in its own process so peak RSS is not shared between them.
+
+    python benchmarks/bench_export.py [n_vendors]
+"""
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from common import fill_catalog, make_app, peak_rss_mb
+from app.models.vendors import Vendor
+from flask import jsonify
+from sqlalchemy.orm import selectinload
+
+MODES = ['buffered', 'ndjson', 'json']
+
+
+def run_child(mode, db_path):
+    app = make_app(db_path)
+    start = time.perf_counter()
+    ttfb = None
+    size = 0
+    if mode == 'buffered':
+        with app.test_request_context():
+            vendors_data = []
+            for vendor in Vendor.query.options(selectinload(Vendor.services)).all():
+                vendor_data = vendor.to_dict()
+                vendor_data['services'] = [s.to_dict() for s in vendor.services]
+                vendors_data.append(vendor_data)
+            size = len(jsonify(vendors_data).get_data())
+        ttfb = time.perf_counter() - start
+    else:
+        client = app.test_client()
+        response = client.get(f'/api/vendors/export?format={mode}', buffered=False)
+        for chunk in response.response:
+            if ttfb is None:
+                ttfb = time.perf_counter() - start
+            size += len(chunk)
+        response.close()
+    total = time.perf_counter() - start
+    print(json.dumps({"ttfb_ms": ttfb * 1000, "total_ms": total * 1000,
+                      "peak_rss_mb": peak_rss_mb(), "bytes": size}))
+
+
+def main():
+    n_vendors = int(sys.argv[1]) if len(sys.argv) > 1 else 20_000
+    db_path = os.path.join(tempfile.mkdtemp(prefix='kinsi-bench-'), 'bench.db')
+    app = make_app(db_path)
+    with app.app_context():
+        fill_catalog(n_vendors, services_per_vendor=5)
+
+    print(f"{n_vendors} vendors, {n_vendors * 5} services")
+    print(f"{'mode':<10}{'ttfb ms':>10}{'total ms':>10}{'peak RSS MB':>13}{'MB out':>9}")
+    for mode in MODES:
+        out = subprocess.run([sys.executable, __file__, '--child', mode, db_path],
+                             capture_output=True, text=True, check=True).stdout
+        result = json.loads(out.strip().splitlines()[-1])
+        print(f"{mode:<10}{result['ttfb_ms']:>10.1f}{result['total_ms']:>10.0f}"
+              f"{result['peak_rss_mb']:>13.1f}{result['bytes'] / 1e6:>9.1f}")
+
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1 and sys.argv[1] == '--child':
+        run_child(sys.argv[2], sys.argv[3])
+    else:
+        main()
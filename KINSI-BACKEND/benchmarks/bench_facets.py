@@ -0,0 +1,85 @@
+# benchmarks/bench_facets.py
+"""Facet counts: client-side filtering vs. GROUP BY vs. the cached endpoint.
+
+``client`` mirrors what LocalVendors.jsx does today: load every vendor
+with its services, then filter the whole list once per category to count
+it (price and rating counts done the same way). ``sql`` is
+app/facets.py's single GROUP BY statement, unfiltered and with the search
+filters. ``endpoint`` is GET /api/vendors/facets through the test client
+with the in-memory response cache, as a hit and as the first request
+after a service write invalidated it.
+
+    python benchmarks/bench_facets.py --scale 100k
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+
+from common import make_app, timed
+from bench_http import catalog_path
+from app import db
+from app.cache import invalidate
+from app.facets import FACETS_TAG, PRICE_BUCKETS, get_facets
+from app.models.vendors import Vendor
+from sqlalchemy.orm import selectinload
+
+FILTERS = [('', None), ('garden', None), ('', 'Photography'), ('rustic', 'Venue')]
+
+
+def client_side_counts():
+    vendors = Vendor.query.options(selectinload(Vendor.services)).all()
+    vendors = [vendor for vendor in vendors if vendor.is_active]
+    categories = {service.category for vendor in vendors for service in vendor.services}
+    counts = {category: len([v for v in vendors
+                             if any(s.category == category and s.is_active for s in v.services)])
+              for category in categories}
+    bounds = (0, *PRICE_BUCKETS, float('inf'))
+    for low, high in zip(bounds, bounds[1:]):
+        counts[(low, high)] = len([v for v in vendors
+                                   if any(low <= s.price < high and s.is_active for s in v.services)])
+    for low in (4.5, 4.0, 3.0, 0.0):
+        counts[low] = len([v for v in vendors if (v.rating or 0) >= low])
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--scale', default='100k', help="Catalog size: 1k, 100k, 1m or a service count")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, 'catalog.db')
+        shutil.copyfile(catalog_path(args.scale, args.seed), db_path)
+        app = make_app(db_path, RESPONSE_CACHE_BACKEND='memory')
+        client = app.test_client()
+        with app.app_context():
+            vendors = db.session.execute(db.text("SELECT COUNT(*) FROM vendors")).scalar()
+            print(f"{args.scale} catalog, {vendors} vendors; p50/p95 ms")
+
+            result = timed(client_side_counts, repeat=3)
+            db.session.expire_all()
+            print(f"{'client-side filtering':<34}{result[0]:>10.1f}/{result[1]:<10.1f}")
+            for text, category in FILTERS:
+                result = timed(lambda: get_facets(text, category), repeat=args.repeat)
+                label = f"sql q={text or '-'} category={category or '-'}"
+                print(f"{label:<34}{result[0]:>10.2f}/{result[1]:<10.2f}")
+
+            client.get('/api/vendors/facets')
+            hit = timed(lambda: client.get('/api/vendors/facets'), repeat=args.repeat * 10)
+            print(f"{'endpoint, cache hit':<34}{hit[0]:>10.2f}/{hit[1]:<10.2f}")
+
+            def after_write():
+                invalidate(FACETS_TAG)
+                client.get('/api/vendors/facets')
+            miss = timed(after_write, repeat=args.repeat)
+            print(f"{'endpoint, after invalidation':<34}{miss[0]:>10.2f}/{miss[1]:<10.2f}")
+            db.session.remove()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,198 @@
+# benchmarks/bench_geo.py
+"""Nearby search: grid-cell index vs. a latitude B-tree vs. a full scan.
+
+``--vendors`` vendors are written straight into a scratch database, most
+of them clustered around the cities in app/data/places.csv (Nairobi and
+Mombasa heaviest) and the rest spread over the whole country; a quarter
+get one service in a random category. Queries are timed from dense points
+(city centres and neighbourhoods) and sparse ones (random points anywhere
+in the country), at several radii, with and without a category:
+
+* grid: app/geo.py, ix_vendors_geo range searches per cell row, growing
+  the radius from NEARBY_START_KM
+* latitude: a (latitude, longitude, is_active) index over the whole
+  bounding box, refined the same way
+* scan: the bounding box checked against every row (``--scan-queries``
+  points only, it is slow)
+* endpoint: GET /api/vendors/nearby through the test client
+
+The three methods must return the same vendors; p50/p95 ms are reported.
+
+    python benchmarks/bench_geo.py --vendors 1000000 --queries 100
+"""
+import argparse
+import json
+import random
+import sys
+import time
+
+from common import CATEGORIES, make_app
+from bench_http import percentile
+from app import db
+from app.geo import bounding_box, grid_cell, haversine_km, load_places, nearby_vendor_ids
+
+# Kenya, roughly
+BOUNDS = (-4.6, 4.6, 34.0, 41.8)
+CITY_WEIGHTS = {'Nairobi': 35, 'Mombasa': 15, 'Kisumu': 8, 'Nakuru': 8, 'Eldoret': 6}
+CLUSTERED_SHARE = 0.85
+SPREAD_DEGREES = 0.04
+RADII = (2, 10, 50)
+LIMIT = 20
+
+
+def fill_vendors(n_vendors, seed, batch_size=50_000):
+    """Insert vendors with locations (and some services) straight through the driver"""
+    rng = random.Random(seed)
+    places, _ = load_places()
+    cities = [place for place in places.values() if place.parent is None]
+    weights = [CITY_WEIGHTS.get(place.name, 1) for place in cities]
+    connection = db.session.connection()
+    vendors, services = [], []
+    for vendor_id in range(1, n_vendors + 1):
+        if rng.random() < CLUSTERED_SHARE:
+            city = rng.choices(cities, weights)[0]
+            latitude = city.latitude + rng.gauss(0, SPREAD_DEGREES)
+            longitude = city.longitude + rng.gauss(0, SPREAD_DEGREES)
+        else:
+            latitude = rng.uniform(BOUNDS[0], BOUNDS[1])
+            longitude = rng.uniform(BOUNDS[2], BOUNDS[3])
+        category = rng.choice(CATEGORIES)
+        vendors.append((vendor_id, vendor_id, f"Vendor {vendor_id}", category,
+                        rng.random() > 0.03, round(rng.uniform(0, 5), 1), 0,
+                        latitude, longitude, grid_cell(latitude, longitude)))
+        if rng.random() < 0.25:
+            services.append((vendor_id, "Package", rng.choice(CATEGORIES), 1000.0, 0, 0, 0, True))
+        if len(vendors) >= batch_size or vendor_id == n_vendors:
+            connection.exec_driver_sql(
+                "INSERT INTO vendors (id, user_id, business_name, service_type, is_active, "
+                "rating, total_reviews, latitude, longitude, geo_cell) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", vendors)
+            connection.exec_driver_sql(
+                "INSERT INTO services (vendor_id, service_name, category, price, views, "
+                "inquiries, bookings, is_active) VALUES (?, ?, ?, ?, ?, ?, ?, ?)", services)
+            db.session.commit()
+            connection = db.session.connection()
+            vendors, services = [], []
+
+
+def bbox_nearby(latitude, longitude, radius_km, category, index_hint):
+    """Nearest vendors from one bounding-box query over the whole radius"""
+    min_lat, max_lat, lng_ranges = bounding_box(latitude, longitude, radius_km)
+    params = {"min_lat": min_lat, "max_lat": max_lat, "category": category}
+    lngs = []
+    for n, (west, east) in enumerate(lng_ranges):
+        params[f"west_{n}"], params[f"east_{n}"] = west, east
+        lngs.append(f"v.longitude BETWEEN :west_{n} AND :east_{n}")
+    category_filter = (
+        "AND (v.service_type = :category OR EXISTS (SELECT 1 FROM services s "
+        "WHERE s.category = :category AND s.is_active = TRUE AND s.vendor_id = v.id))"
+    ) if category else ''
+    rows = db.session.execute(db.text(
+        f"SELECT v.id, v.latitude, v.longitude FROM vendors v {index_hint} "
+        f"WHERE v.latitude BETWEEN :min_lat AND :max_lat AND ({' OR '.join(lngs)}) "
+        f"AND v.is_active = TRUE {category_filter}"
+    ), params)
+    hits = []
+    for vendor_id, lat, lng in rows:
+        distance = haversine_km(latitude, longitude, lat, lng)
+        if distance <= radius_km:
+            hits.append((distance, vendor_id))
+    hits.sort()
+    return [(vendor_id, distance) for distance, vendor_id in hits[:LIMIT]]
+
+
+METHODS = {
+    'grid': lambda lat, lng, radius, category: nearby_vendor_ids(lat, lng, radius, category, LIMIT),
+    'latitude': lambda lat, lng, radius, category: bbox_nearby(
+        lat, lng, radius, category, 'INDEXED BY ix_bench_latitude'),
+    'scan': lambda lat, lng, radius, category: bbox_nearby(lat, lng, radius, category, 'NOT INDEXED'),
+}
+
+
+def query_points(n, seed):
+    rng = random.Random(seed)
+    places = list(load_places()[0].values())
+    dense = [(place.latitude, place.longitude)
+             for place in rng.choices(places, k=n)]
+    sparse = [(rng.uniform(BOUNDS[0], BOUNDS[1]), rng.uniform(BOUNDS[2], BOUNDS[3]))
+              for _ in range(n)]
+    return {'dense': dense, 'sparse': sparse}
+
+
+def run(method, points, radius, category, results):
+    latencies = []
+    for point in points:
+        start = time.perf_counter()
+        found = METHODS[method](*point, radius, category)
+        latencies.append((time.perf_counter() - start) * 1000)
+        results.setdefault((point, radius, category), {})[method] = [vendor_id for vendor_id, _ in found]
+    latencies.sort()
+    return percentile(latencies, 0.50), percentile(latencies, 0.95)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--vendors', type=int, default=1_000_000)
+    parser.add_argument('--queries', type=int, default=100, help="Points per combination")
+    parser.add_argument('--scan-queries', type=int, default=3, help="Points per combination for the full scan")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', help="Write results to this JSON file")
+    args = parser.parse_args()
+
+    app = make_app()
+    client = app.test_client()
+    points = query_points(args.queries, args.seed)
+    combos = [(kind, radius, category) for kind in points for radius in RADII
+              for category in (None, 'Photography')]
+    timings, found = {}, {}
+    with app.app_context():
+        start = time.perf_counter()
+        fill_vendors(args.vendors, args.seed)
+        print(f"{args.vendors} vendors written in {time.perf_counter() - start:.1f}s")
+
+        for kind, radius, category in combos:
+            timings[(kind, radius, category)] = {
+                'grid': run('grid', points[kind], radius, category, found)}
+            latencies = []
+            for lat, lng in points[kind]:
+                path = f"/api/vendors/nearby?lat={lat}&lng={lng}&radius_km={radius}&limit={LIMIT}"
+                if category:
+                    path += f"&category={category}"
+                began = time.perf_counter()
+                assert client.get(path).status_code == 200
+                latencies.append((time.perf_counter() - began) * 1000)
+            latencies.sort()
+            timings[(kind, radius, category)]['endpoint'] = (
+                percentile(latencies, 0.50), percentile(latencies, 0.95))
+
+        db.session.execute(db.text(
+            "CREATE INDEX ix_bench_latitude ON vendors (latitude, longitude, is_active)"))
+        db.session.commit()
+        for kind, radius, category in combos:
+            timings[(kind, radius, category)]['latitude'] = run(
+                'latitude', points[kind], radius, category, found)
+            timings[(kind, radius, category)]['scan'] = run(
+                'scan', points[kind][:args.scan_queries], radius, category, found)
+
+    mismatches = sum(1 for by_method in found.values()
+                     if any(ids != by_method['grid'] for ids in by_method.values()))
+    methods = ('grid', 'endpoint', 'latitude', 'scan')
+    print(f"{'points':<8}{'km':>4}{'category':>13}" + ''.join(f"{name + ' p50/p95':>22}" for name in methods))
+    for (kind, radius, category), by_method in timings.items():
+        print(f"{kind:<8}{radius:>4}{category or '-':>13}" + ''.join(
+            f"{by_method[name][0]:>11.2f}/{by_method[name][1]:<10.2f}" for name in methods))
+    print(f"result mismatches between methods: {mismatches}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'vendors': args.vendors, 'queries': args.queries, 'mismatches': mismatches,
+                       'results': [{'points': kind, 'radius_km': radius, 'category': category,
+                                    **{f'{name}_p50_ms': by_method[name][0] for name in methods},
+                                    **{f'{name}_p95_ms': by_method[name][1] for name in methods}}
+                                   for (kind, radius, category), by_method in timings.items()]},
+                      f, indent=2)
+    return 1 if mismatches else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,463 @@
+# benchmarks/bench_http.py
+"""Repeatable HTTP load benchmark over every API endpoint.
+
+A synthetic catalog (seed_catalog.py) is generated once per scale and
+seed, cached in the temp directory and copied for every run, so runs start
+from identical data. Each endpoint is then driven with a fixed, seeded
+sequence of requests by ``--concurrency`` threads, either in-process
+through the Flask test client or over HTTP against a local gunicorn.
+p50/p95/p99 latency, throughput, errors and peak RSS are written to a
+JSON file; ``compare`` (or ``run --baseline``) flags regressions and
+exits 1.
+
+    python benchmarks/bench_http.py run --scale 100k --mode gunicorn --output base.json
+    python benchmarks/bench_http.py run --scale 100k --mode gunicorn --baseline base.json
+    python benchmarks/bench_http.py compare base.json new.json [--threshold 0.2]
+"""
+import argparse
+import http.client
+import json
+import math
+import os
+import platform
+import queue
+import random
+import shutil
+import socket
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+
+from common import make_app, peak_rss_mb
+from app.synthetic import CATALOG_VERSION
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DATA_DIR = os.path.join(tempfile.gettempdir(), 'kinsi-bench-data')
+WORDS = ['photo', 'garden', 'cake', 'dj', 'flowers', 'venue', 'elegant', 'coverage', 'rustic']
+CATEGORIES = ['Photography', 'Catering', 'Venue', 'Decoration', 'Flowers', 'Transportation']
+
+
+@dataclass
+class Endpoint:
+    name: str
+    method: str
+    # (rng, ids) -> (path, json body or None, raw body or None, content type or None)
+    build: object
+    # Requests per run, as a fraction of --requests
+    share: float = 1.0
+
+
+def _json(path, body):
+    return path, body, None, None
+
+
+def _import_body(rng, ids):
+    rows = []
+    for _ in range(50):
+        user_id = rng.randint(1, ids['users'] * 2)
+        rows.append(json.dumps({
+            'user_id': user_id, 'business_name': f'Imported vendor {user_id}',
+            'service_type': rng.choice(CATEGORIES),
+            'services': [{'service_name': 'Imported package', 'category': rng.choice(CATEGORIES),
+                          'price': rng.randint(100, 5000)}],
+        }))
+    return '/api/vendors/import', None, '\n'.join(rows) + '\n', 'application/x-ndjson'
+
+
+def _deleted_service(rng, ids):
+    # Each delete targets a different service so none of them 404
+    return _json(f"/api/vendor/services/{ids['delete_ids'].pop()}", None)
+
+
+ENDPOINTS = [
+    Endpoint('profile', 'GET', lambda rng, ids: _json(
+        f"/api/vendor/profile/{rng.randint(1, ids['users'])}", None)),
+    Endpoint('profile_fields', 'GET', lambda rng, ids: _json(
+        f"/api/vendor/profile/{rng.randint(1, ids['users'])}?fields=id,business_name,rating", None)),
+    Endpoint('stats', 'GET', lambda rng, ids: _json(
+        f"/api/vendor/stats/{rng.randint(1, ids['vendors'])}", None)),
+    Endpoint('services', 'GET', lambda rng, ids: _json(
+        f"/api/vendor/services/{rng.randint(1, ids['vendors'])}", None)),
+    Endpoint('catalog_page', 'GET', lambda rng, ids: _json(
+        f"/api/vendors?limit=50&cursor={rng.randint(0, ids['vendors'])}", None)),
+    Endpoint('search_text', 'GET', lambda rng, ids: _json(
+        f"/api/vendors/search?q={rng.choice(WORDS)}", None)),
+    Endpoint('search_category', 'GET', lambda rng, ids: _json(
+        f"/api/vendors/search?category={rng.choice(CATEGORIES)}", None)),
+    Endpoint('export', 'GET', lambda rng, ids: _json('/api/vendors/export', None), share=0.02),
+    Endpoint('profile_update', 'POST', lambda rng, ids: _json('/api/vendor/profile', {
+        'user_id': rng.randint(1, ids['users']), 'description': f'Updated {rng.random()}'}), share=0.5),
+    Endpoint('service_create', 'POST', lambda rng, ids: _json('/api/vendor/services', {
+        'vendor_id': rng.randint(1, ids['vendors']), 'service_name': 'Benchmark package',
+        'category': rng.choice(CATEGORIES), 'price': rng.randint(100, 5000),
+        'features': ['Benchmark']}), share=0.5),
+    Endpoint('service_update', 'PUT', lambda rng, ids: _json(
+        f"/api/vendor/services/{rng.randint(1, ids['services'])}",
+        {'price': rng.randint(100, 5000)}), share=0.5),
+    Endpoint('counters', 'POST', lambda rng, ids: _json(
+        f"/api/vendor/services/{rng.randint(1, ids['services'])}/counters", {'views': 1})),
+    Endpoint('counters_batch', 'POST', lambda rng, ids: _json('/api/vendor/services/counters', {
+        'increments': [{'service_id': rng.randint(1, ids['services']), 'views': 1}
+                       for _ in range(20)]}), share=0.5),
+    Endpoint('import', 'POST', _import_body, share=0.05),
+    Endpoint('service_delete', 'DELETE', _deleted_service, share=0.5),
+]
+
+
+def percentile(sorted_samples, q):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_samples:
+        return None
+    return sorted_samples[min(len(sorted_samples) - 1, max(0, math.ceil(q * len(sorted_samples)) - 1))]
+
+
+def catalog_path(scale, seed):
+    """Path of the cached seeded catalog, generating it on first use"""
+    path = os.path.join(DATA_DIR, f'catalog-v{CATALOG_VERSION}-{scale}-{seed}.db')
+    if not os.path.exists(path):
+        os.makedirs(DATA_DIR, exist_ok=True)
+        partial = path + '.partial'
+        if os.path.exists(partial):
+            os.remove(partial)
+        print(f"Generating {scale} catalog (seed {seed}) in {path}")
+        subprocess.run(
+            [sys.executable, os.path.join(ROOT, 'seed_catalog.py'), '--scale', scale, '--seed', str(seed)],
+            env={**os.environ, 'DATABASE_URL': 'sqlite:///' + partial, 'RESPONSE_CACHE_BACKEND': 'none'},
+            check=True,
+        )
+        # Fold the WAL back in so a plain file copy is complete
+        conn = sqlite3.connect(partial)
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        conn.execute("PRAGMA journal_mode=DELETE")
+        conn.close()
+        os.replace(partial, path)
+    return path
+
+
+def catalog_ids(db_path, delete_count):
+    conn = sqlite3.connect(db_path)
+    vendors, users = conn.execute("SELECT MAX(id), MAX(user_id) FROM vendors").fetchone()
+    services = conn.execute("SELECT MAX(id) FROM services").fetchone()[0]
+    conn.close()
+    delete_ids = random.Random(0).sample(range(1, services + 1), min(delete_count, services))
+    return {'vendors': vendors, 'users': users, 'services': services, 'delete_ids': delete_ids}
+
+
+class ClientTarget:
+    """Requests through the Flask test client, one client per thread"""
+
+    def __init__(self, db_path, cache_backend):
+        self.app = make_app(db_path, RESPONSE_CACHE_BACKEND=cache_backend)
+
+    def connect(self):
+        client = self.app.test_client()
+
+        def send(method, path, body, raw, content_type):
+            if raw is not None:
+                response = client.open(path, method=method, data=raw, content_type=content_type)
+            else:
+                response = client.open(path, method=method, json=body)
+            # Drain without buffering, so streamed bodies do not count towards RSS
+            for _ in response.iter_encoded():
+                pass
+            response.close()
+            return response.status_code
+        return send, lambda: None
+
+    def peak_rss_mb(self):
+        return peak_rss_mb()
+
+    def close(self):
+        self.app.extensions['counter_buffer'].stop()
+
+
+class GunicornTarget:
+    """Requests over keep-alive HTTP connections to a local gunicorn"""
+
+    def __init__(self, db_path, cache_backend, workers, threads, env=None):
+        with socket.socket() as sock:
+            sock.bind(('127.0.0.1', 0))
+            self.port = sock.getsockname()[1]
+        env = {**os.environ, 'DATABASE_URL': 'sqlite:///' + db_path,
+               'RESPONSE_CACHE_BACKEND': cache_backend or 'none', 'ADMISSION_ENABLED': '0',
+               **(env or {})}
+        self.proc = subprocess.Popen(
+            [sys.executable, '-m', 'gunicorn', '--workers', str(workers), '--threads', str(threads),
+             '--bind', f'127.0.0.1:{self.port}', '--chdir', ROOT, '--log-level', 'warning',
+             'app:create_app()'],
+            env=env,
+        )
+        self._peak_rss = 0.0
+        self._stop = threading.Event()
+        self._wait_ready()
+        self._sampler = threading.Thread(target=self._sample_rss, daemon=True)
+        self._sampler.start()
+
+    def _wait_ready(self, timeout=60):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if self.proc.poll() is not None:
+                raise RuntimeError("gunicorn exited during startup")
+            try:
+                conn = http.client.HTTPConnection('127.0.0.1', self.port, timeout=5)
+                conn.request('GET', '/api/vendor/stats/1')
+                conn.getresponse().read()
+                conn.close()
+                return
+            except OSError:
+                time.sleep(0.2)
+        raise RuntimeError("gunicorn did not start")
+
+    def _tree_rss_mb(self):
+        pids = {self.proc.pid}
+        for entry in os.listdir('/proc'):
+            if entry.isdigit():
+                try:
+                    with open(f'/proc/{entry}/stat') as stat:
+                        if int(stat.read().rsplit(')', 1)[1].split()[1]) == self.proc.pid:
+                            pids.add(int(entry))
+                except (OSError, IndexError, ValueError):
+                    continue
+        total = 0
+        for pid in pids:
+            try:
+                with open(f'/proc/{pid}/status') as status:
+                    for line in status:
+                        if line.startswith('VmRSS:'):
+                            total += int(line.split()[1])
+            except OSError:
+                continue
+        return total / 1024
+
+    def _sample_rss(self):
+        while not self._stop.wait(0.2):
+            self._peak_rss = max(self._peak_rss, self._tree_rss_mb())
+
+    def connect(self):
+        conn = http.client.HTTPConnection('127.0.0.1', self.port, timeout=300)
+
+        def send(method, path, body, raw, content_type):
+            headers = {}
+            payload = None
+            if raw is not None:
+                payload, headers['Content-Type'] = raw.encode(), content_type
+            elif body is not None:
+                payload, headers['Content-Type'] = json.dumps(body).encode(), 'application/json'
+            conn.request(method, path, body=payload, headers=headers)
+            response = conn.getresponse()
+            response.read()
+            return response.status
+        return send, conn.close
+
+    def peak_rss_mb(self):
+        return max(self._peak_rss, self._tree_rss_mb())
+
+    def close(self):
+        self._stop.set()
+        self.proc.terminate()
+        self.proc.wait(timeout=30)
+
+
+def drive(target, requests, concurrency):
+    """Send the prepared requests with N threads; returns (latencies ms, errors, seconds)"""
+    pending = queue.SimpleQueue()
+    for item in requests:
+        pending.put(item)
+    latencies, errors = [], []
+    lock = threading.Lock()
+
+    def run():
+        send, close = target.connect()
+        try:
+            while True:
+                try:
+                    method, path, body, raw, content_type = pending.get_nowait()
+                except queue.Empty:
+                    return
+                start = time.perf_counter()
+                try:
+                    status = send(method, path, body, raw, content_type)
+                except (OSError, http.client.HTTPException):
+                    send, close = target.connect()
+                    status = 599
+                elapsed = (time.perf_counter() - start) * 1000
+                with lock:
+                    latencies.append(elapsed)
+                    if status >= 400:
+                        errors.append(status)
+        finally:
+            close()
+
+    threads = [threading.Thread(target=run) for _ in range(min(concurrency, len(requests)))]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return latencies, errors, time.perf_counter() - start
+
+
+def run_benchmark(args):
+    template = catalog_path(args.scale, args.seed)
+    run_dir = tempfile.mkdtemp(prefix='kinsi-bench-')
+    db_path = os.path.join(run_dir, 'bench.db')
+    shutil.copy(template, db_path)
+
+    plans = []
+    for endpoint in ENDPOINTS:
+        plans.append((endpoint, max(1, int(args.requests * endpoint.share))))
+    deletes = sum(count for endpoint, count in plans if endpoint.name == 'service_delete')
+    ids = catalog_ids(db_path, deletes)
+
+    # gunicorn serves the same create_app(), so its routes can be listed here
+    routes = {rule.rule for rule in make_app(db_path).url_map.iter_rules()}
+    cache_backend = None if args.cache == 'none' else args.cache
+    if args.mode == 'gunicorn':
+        target = GunicornTarget(db_path, cache_backend, args.workers, args.threads)
+    else:
+        target = ClientTarget(db_path, cache_backend)
+
+    results = {}
+    total_requests = total_seconds = 0
+    try:
+        for endpoint, count in plans:
+            probe_path = endpoint.build(random.Random(args.seed), dict(ids, delete_ids=[1]))[0]
+            route = probe_path.split('?')[0]
+            if not any(_route_matches(rule, route) for rule in routes):
+                print(f"{endpoint.name:<18}skipped (route not registered)")
+                continue
+
+            rng = random.Random(f'{args.seed}-{endpoint.name}')
+            requests = [(endpoint.method, *endpoint.build(rng, ids)) for _ in range(count)]
+            latencies, errors, seconds = drive(target, requests, args.concurrency)
+            latencies.sort()
+            results[endpoint.name] = {
+                'method': endpoint.method,
+                'requests': len(latencies),
+                'errors': len(errors),
+                'p50_ms': round(percentile(latencies, 0.50), 3),
+                'p95_ms': round(percentile(latencies, 0.95), 3),
+                'p99_ms': round(percentile(latencies, 0.99), 3),
+                'throughput': round(len(latencies) / seconds, 1),
+            }
+            total_requests += len(latencies)
+            total_seconds += seconds
+            r = results[endpoint.name]
+            print(f"{endpoint.name:<18}{r['requests']:>6} req {r['p50_ms']:>9.2f} {r['p95_ms']:>9.2f} "
+                  f"{r['p99_ms']:>9.2f} ms {r['throughput']:>9.1f} req/s {r['errors']:>5} errors")
+        peak_rss = target.peak_rss_mb()
+    finally:
+        target.close()
+        shutil.rmtree(run_dir, ignore_errors=True)
+
+    return {
+        'meta': {
+            'scale': args.scale, 'seed': args.seed, 'mode': args.mode, 'cache': args.cache,
+            'requests': args.requests, 'concurrency': args.concurrency,
+            'workers': args.workers if args.mode == 'gunicorn' else None,
+            'threads': args.threads if args.mode == 'gunicorn' else None,
+            'python': platform.python_version(), 'machine': platform.machine(),
+            'created': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        },
+        'peak_rss_mb': round(peak_rss, 1),
+        'total': {'requests': total_requests,
+                  'throughput': round(total_requests / total_seconds, 1) if total_seconds else 0},
+        'endpoints': results,
+    }
+
+
+def _route_matches(rule, path):
+    rule_parts, path_parts = rule.strip('/').split('/'), path.strip('/').split('/')
+    return len(rule_parts) == len(path_parts) and all(
+        r == p or r.startswith('<') for r, p in zip(rule_parts, path_parts))
+
+
+def compare_results(baseline, current, threshold=0.2, min_delta_ms=1.0, min_delta_rss_mb=5.0):
+    """Return human-readable regressions of ``current`` against ``baseline``"""
+    regressions = []
+    for key in ('scale', 'mode', 'cache', 'concurrency'):
+        if baseline['meta'].get(key) != current['meta'].get(key):
+            print(f"warning: {key} differs ({baseline['meta'].get(key)} vs {current['meta'].get(key)})")
+
+    for name, base in baseline['endpoints'].items():
+        new = current['endpoints'].get(name)
+        if new is None:
+            regressions.append(f"{name}: missing from current run")
+            continue
+        for metric in ('p50_ms', 'p95_ms', 'p99_ms'):
+            before, after = base[metric], new[metric]
+            if after - before > min_delta_ms and after > before * (1 + threshold):
+                regressions.append(f"{name}: {metric} {before:.2f} -> {after:.2f} "
+                                   f"(+{(after / before - 1) * 100:.0f}%)")
+        if new['throughput'] < base['throughput'] * (1 - threshold):
+            regressions.append(f"{name}: throughput {base['throughput']:.1f} -> "
+                               f"{new['throughput']:.1f} req/s")
+        if new['errors'] > base['errors']:
+            regressions.append(f"{name}: errors {base['errors']} -> {new['errors']}")
+
+    before, after = baseline['peak_rss_mb'], current['peak_rss_mb']
+    if after - before > min_delta_rss_mb and after > before * (1 + threshold):
+        regressions.append(f"peak RSS {before:.1f} -> {after:.1f} MB")
+    return regressions
+
+
+def _report(baseline, current, threshold):
+    regressions = compare_results(baseline, current, threshold)
+    for line in regressions:
+        print(f"REGRESSION {line}")
+    if not regressions:
+        print(f"No regressions beyond {threshold:.0%}")
+    return 1 if regressions else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    run = commands.add_parser('run', help="Run the benchmark")
+    run.add_argument('--scale', default='1k', help="Catalog size: 1k, 100k, 1m or a service count")
+    run.add_argument('--seed', type=int, default=42)
+    run.add_argument('--mode', choices=['client', 'gunicorn'], default='client')
+    run.add_argument('--requests', type=int, default=200, help="Requests per read endpoint")
+    run.add_argument('--concurrency', type=int, default=8)
+    run.add_argument('--workers', type=int, default=4, help="gunicorn workers")
+    run.add_argument('--threads', type=int, default=4, help="gunicorn threads per worker")
+    run.add_argument('--cache', choices=['memory', 'sqlite', 'none'], default='memory',
+                     help="Response cache backend")
+    run.add_argument('--output', help="Write results to this JSON file")
+    run.add_argument('--baseline', help="Compare against this results file")
+    run.add_argument('--threshold', type=float, default=0.2)
+
+    compare = commands.add_parser('compare', help="Compare two result files")
+    compare.add_argument('baseline')
+    compare.add_argument('current')
+    compare.add_argument('--threshold', type=float, default=0.2)
+    args = parser.parse_args()
+
+    if args.command == 'compare':
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        with open(args.current) as f:
+            current = json.load(f)
+        return _report(baseline, current, args.threshold)
+
+    print(f"{'endpoint':<18}{'count':>10} {'p50':>9} {'p95':>9} {'p99':>9}")
+    results = run_benchmark(args)
+    print(f"total {results['total']['requests']} requests, "
+          f"{results['total']['throughput']:.1f} req/s, peak RSS {results['peak_rss_mb']:.1f} MB")
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+    if args.baseline:
+        with open(args.baseline) as f:
+            return _report(json.load(f), results, args.threshold)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,92 @@
+# benchmarks/bench_import.py
+"""Bulk import throughput vs. one POST /api/vendor/profile per vendor.
+
+The per-profile path is timed on a sample and extrapolated, since running
+it for the full row count takes minutes. A small batch mixing good and
+malformed rows is imported first, to check bad rows are skipped.
+
+    python benchmarks/bench_import.py [n_rows] [sample_rows]
+"""
+import io
+import json
+import random
+import sys
+import time
+
+from common import CATEGORIES, WORDS, make_app
+from app import db
+from app.bulk_import import import_vendors
+
+
+def make_rows(n_rows, seed=42):
+    rng = random.Random(seed)
+    lines = []
+    for user_id in range(1, n_rows + 1):
+        category = rng.choice(CATEGORIES)
+        lines.append(json.dumps({
+            "user_id": user_id,
+            "business_name": f"{rng.choice(WORDS).title()} {category} {user_id}",
+            "service_type": category,
+            "description": ' '.join(rng.choices(WORDS, k=12)),
+            "services": [{
+                "service_name": f"{rng.choice(WORDS)} package",
+                "category": category,
+                "price": round(rng.uniform(100, 10000), 2),
+                "features": rng.sample(WORDS, 3),
+            }],
+        }))
+    return '\n'.join(lines) + '\n'
+
+
+# Each bad row must be reported and skipped without losing the good ones
+MIXED_ROWS = [
+    {"user_id": 1, "business_name": "Good One", "services": [{"service_name": "Basic", "price": 10}]},
+    {"user_id": 2, "business_name": 123},
+    {"user_id": 3, "business_name": "Bad Email", "email": ["a@b.c"]},
+    {"user_id": 4, "business_name": "Bad Service", "services": [{"service_name": 5}]},
+    {"user_id": 5, "business_name": "Bad Price", "services": [{"service_name": "X", "price": [1]}]},
+    {"user_id": 6, "business_name": "Bad Category",
+     "services": [{"service_name": "Y", "category": {"a": 1}}]},
+    {"user_id": 7, "business_name": "Good Two"},
+]
+
+
+def check_row_errors():
+    data = ''.join(json.dumps(row) + '\n' for row in MIXED_ROWS)
+    app = make_app()
+    with app.app_context():
+        report = import_vendors(io.StringIO(data), 'ndjson')
+        imported = db.session.execute(db.text(
+            "SELECT user_id FROM vendors ORDER BY user_id")).scalars().all()
+    assert [row for row, _ in report.errors] == [2, 3, 4, 5, 6], report.errors
+    assert (report.vendors, report.services, imported) == (2, 1, [1, 7]), (report, imported)
+
+
+def main():
+    n_rows = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    sample = int(sys.argv[2]) if len(sys.argv) > 2 else 1000
+    data = make_rows(n_rows)
+    check_row_errors()
+
+    app = make_app()
+    with app.app_context():
+        start = time.perf_counter()
+        report = import_vendors(io.StringIO(data), 'ndjson')
+        bulk = time.perf_counter() - start
+    print(f"bulk import      {n_rows} rows in {bulk:6.1f}s  ({n_rows / bulk:8.0f} rows/s, "
+          f"{len(report.errors)} errors)")
+
+    app = make_app()
+    client = app.test_client()
+    rows = [json.loads(line) for line in data.splitlines()[:sample]]
+    start = time.perf_counter()
+    for row in rows:
+        row.pop('services')
+        client.post('/api/vendor/profile', json=row)
+    per_row = (time.perf_counter() - start) / sample
+    print(f"per-profile POST {sample} rows in {per_row * sample:6.1f}s  ({1 / per_row:8.0f} rows/s, "
+          f"~{per_row * n_rows:.0f}s for {n_rows} rows, vendors only)")
+
+
+if __name__ == '__main__':
+    main()
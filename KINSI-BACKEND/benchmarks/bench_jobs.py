@@ -0,0 +1,144 @@
+# benchmarks/bench_jobs.py
+"""Background job queue throughput, in jobs per second.
+
+On a scratch database:
+
+* enqueue: ``--jobs`` jobs queued one transaction each, as request
+  handlers do, and all in one transaction
+* noop: draining that many no-op jobs with 1, 4 and 8 worker threads,
+  i.e. the queue's own cost (claim, ack and one commit per job)
+* io: the same with a handler that sleeps ``--io-ms``, where threads
+  overlap the waits
+* processes: ``--processes`` worker processes draining no-op jobs
+  together, claiming from the same table
+* limited: io jobs of a type capped at 2 concurrent, drained by 8
+  threads; prints the most seen running at once
+
+    python benchmarks/bench_jobs.py --jobs 2000
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+from common import make_app
+from app import db
+from app.jobs import JobWorker, enqueue, job
+from app.models.jobs import Job
+
+_running = {'now': 0, 'max': 0}
+_running_lock = threading.Lock()
+
+
+@job('bench_noop')
+def noop(index):
+    return None
+
+
+@job('bench_io')
+def io(index, ms):
+    time.sleep(ms / 1000)
+
+
+@job('bench_limited', concurrency=2)
+def limited(index, ms):
+    with _running_lock:
+        _running['now'] += 1
+        _running['max'] = max(_running['max'], _running['now'])
+    time.sleep(ms / 1000)
+    with _running_lock:
+        _running['now'] -= 1
+
+
+def fill(app, job_type, count, **payload):
+    with app.app_context():
+        for index in range(count):
+            enqueue(job_type, {'index': index, **payload})
+        db.session.commit()
+
+
+def drain(app, threads):
+    """Run a burst worker; returns (jobs done, seconds)"""
+    worker = JobWorker(app, threads)
+    start = time.perf_counter()
+    worker.run(burst=True)
+    return worker.counts['done'], time.perf_counter() - start
+
+
+def report(label, jobs, seconds):
+    print(f"{label:<36}{jobs:>8}{seconds:>10.2f} s{jobs / seconds:>12.0f} jobs/s")
+
+
+def worker_process(db_path):
+    """Entry point of the --processes workers"""
+    app = make_app(db_path, JOB_POLL_INTERVAL=0.01)
+    done, _ = drain(app, 4)
+    print(done)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--jobs', type=int, default=2000)
+    parser.add_argument('--io-ms', type=float, default=5.0, help="Sleep of each io job")
+    parser.add_argument('--processes', type=int, default=2)
+    parser.add_argument('--worker', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.worker:
+        worker_process(args.worker)
+        return 0
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, 'jobs.db')
+        app = make_app(db_path, JOB_POLL_INTERVAL=0.01)
+        print(f"{'':<36}{'jobs':>8}{'time':>12}{'rate':>18}")
+
+        with app.app_context():
+            start = time.perf_counter()
+            for index in range(args.jobs):
+                enqueue('bench_noop', {'index': index})
+                db.session.commit()
+            report("enqueue, one commit per job", args.jobs, time.perf_counter() - start)
+            db.session.execute(db.delete(Job))
+            db.session.commit()
+        start = time.perf_counter()
+        fill(app, 'bench_noop', args.jobs)
+        report("enqueue, one commit for all", args.jobs, time.perf_counter() - start)
+
+        for threads in (1, 4, 8):
+            if threads > 1:
+                fill(app, 'bench_noop', args.jobs)
+            report(f"noop, {threads} threads", *drain(app, threads))
+
+        io_jobs = max(1, args.jobs // 4)
+        for threads in (1, 4, 8):
+            fill(app, 'bench_io', io_jobs, ms=args.io_ms)
+            report(f"io {args.io_ms:g} ms, {threads} threads", *drain(app, threads))
+
+        fill(app, 'bench_noop', args.jobs)
+        start = time.perf_counter()
+        workers = [subprocess.Popen([sys.executable, __file__, '--worker', db_path],
+                                    stdout=subprocess.PIPE, text=True)
+                   for _ in range(args.processes)]
+        done = [int(proc.communicate()[0].split()[-1]) for proc in workers]
+        report(f"noop, {args.processes} processes x 4 threads", sum(done), time.perf_counter() - start)
+        print(f"{'':<36}per process: {', '.join(map(str, done))}")
+
+        fill(app, 'bench_limited', io_jobs, ms=args.io_ms)
+        report(f"limited to 2, io {args.io_ms:g} ms, 8 threads", *drain(app, 8))
+        print(f"{'':<36}at most {_running['max']} running at once")
+
+        with app.app_context():
+            left = db.session.execute(
+                db.select(db.func.count()).select_from(Job).where(Job.status != 'done')).scalar()
+        app.extensions['counter_buffer'].stop()
+    if left or _running['max'] > 2:
+        print(f"{left} jobs not done")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,150 @@
+# benchmarks/bench_leaderboards.py
+"""Leaderboards: in-memory top-K vs. ORDER BY ... LIMIT on every request.
+
+On a copy of the seeded catalog, for both boards, overall and per
+service_type:
+
+* sql: the ranking query a request would run without app/leaderboards.py
+  (vendors joined with vendor_stats, ORDER BY the score, LIMIT size)
+* recompute: the periodic full rebuild (one window-function query)
+* memory: Leaderboards.top() with nothing pending
+* endpoint: GET /api/vendors/leaderboards/<board> through the test client
+* incremental: top() right after a counter flush booked ``--touched``
+  random services, i.e. the one-query update of the vendors concerned
+
+Then ``--rounds`` rounds of random writes (bookings, new ratings,
+deactivations, service_type changes) are applied, each followed by reads,
+and every board is compared with the SQL answer; the run fails on any
+mismatch.
+
+    python benchmarks/bench_leaderboards.py --scale 100k
+"""
+import argparse
+import os
+import random
+import shutil
+import sys
+import tempfile
+
+from common import make_app, timed
+from bench_http import CATEGORIES, catalog_path
+from app import db
+from app.leaderboards import ALL, BOARDS, get_leaderboards, vendors_changed
+
+_ORDER = {
+    'top_rated': "v.rating > 0 ORDER BY v.rating DESC, v.total_reviews DESC, v.id",
+    'most_booked': "COALESCE(s.total_bookings, 0) > 0 "
+                   "ORDER BY COALESCE(s.total_bookings, 0) DESC, v.id",
+}
+
+
+def sql_top(board, service_type, limit):
+    """Vendor ids of a board straight from the database"""
+    category = "AND v.service_type = :service_type " if service_type else ''
+    return [row.id for row in db.session.execute(db.text(
+        "SELECT v.id FROM vendors v LEFT JOIN vendor_stats s ON s.vendor_id = v.id "
+        f"WHERE v.is_active = TRUE {category}AND {_ORDER[board]} LIMIT :limit"
+    ), {"service_type": service_type, "limit": limit})]
+
+
+def book(buffer, service_ids, rng, count):
+    # The flush writes through its own session; release this one's lock first
+    db.session.commit()
+    for service_id in rng.sample(service_ids, count):
+        buffer.add(service_id, bookings=rng.randint(1, 20))
+    buffer.flush()
+
+
+def random_writes(buffer, rng, vendor_ids, service_ids, count):
+    """Counter bookings plus direct vendor updates, as their write paths would do them"""
+    book(buffer, service_ids, rng, count)
+    changed = rng.sample(vendor_ids, count)
+    for vendor_id in changed:
+        kind = rng.random()
+        if kind < 0.6:
+            db.session.execute(db.text(
+                "UPDATE vendors SET rating = :rating, total_reviews = total_reviews + 1 "
+                "WHERE id = :id"), {"rating": round(rng.uniform(3.5, 5.0), 1), "id": vendor_id})
+        elif kind < 0.8:
+            db.session.execute(db.text(
+                "UPDATE vendors SET is_active = NOT is_active WHERE id = :id"), {"id": vendor_id})
+        else:
+            db.session.execute(db.text(
+                "UPDATE vendors SET service_type = :service_type WHERE id = :id"),
+                {"service_type": rng.choice(CATEGORIES), "id": vendor_id})
+    db.session.commit()
+    vendors_changed(changed)
+
+
+def mismatches(leaderboards):
+    found = 0
+    for board in BOARDS:
+        for service_type in (ALL, *CATEGORIES):
+            expected = sql_top(board, service_type, leaderboards.size)
+            actual = [entry['id'] for entry in leaderboards.top(board, service_type)]
+            found += actual != expected
+    return found
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--scale', default='100k', help="Catalog size: 1k, 100k, 1m or a service count")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--size', type=int, default=20, help="LEADERBOARD_SIZE")
+    parser.add_argument('--touched', type=int, default=200, help="Services booked per incremental update")
+    parser.add_argument('--rounds', type=int, default=50)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, 'catalog.db')
+        shutil.copyfile(catalog_path(args.scale, args.seed), db_path)
+        app = make_app(db_path, LEADERBOARD_SIZE=args.size, LEADERBOARD_REFRESH_INTERVAL=0,
+                       COUNTER_FLUSH_INTERVAL=60.0)
+        client = app.test_client()
+        buffer = app.extensions['counter_buffer']
+        with app.app_context():
+            leaderboards = get_leaderboards()
+            vendor_ids = db.session.execute(db.text("SELECT id FROM vendors")).scalars().all()
+            service_ids = db.session.execute(db.text("SELECT id FROM services")).scalars().all()
+            print(f"{args.scale} catalog, {len(vendor_ids)} vendors, top {args.size}; p50/p95 ms")
+
+            for board in BOARDS:
+                for service_type in (ALL, 'Photography'):
+                    result = timed(lambda: sql_top(board, service_type, args.size), repeat=args.repeat)
+                    label = f"sql {board} {service_type or 'all'}"
+                    print(f"{label:<40}{result[0]:>10.2f}/{result[1]:<10.2f}")
+
+            result = timed(leaderboards.recompute, repeat=max(3, args.repeat // 4))
+            print(f"{'recompute (both boards, all types)':<40}{result[0]:>10.2f}/{result[1]:<10.2f}")
+            for board in BOARDS:
+                for service_type in (ALL, 'Photography'):
+                    result = timed(lambda: leaderboards.top(board, service_type), repeat=args.repeat * 50)
+                    label = f"memory {board} {service_type or 'all'}"
+                    print(f"{label:<40}{result[0]:>10.4f}/{result[1]:<10.4f}")
+            for board in BOARDS:
+                path = f'/api/vendors/leaderboards/{board}'
+                result = timed(lambda: client.get(path), repeat=args.repeat * 10)
+                print(f"{'endpoint ' + board:<40}{result[0]:>10.2f}/{result[1]:<10.2f}")
+
+            samples = []
+            for _ in range(args.repeat):
+                book(buffer, service_ids, rng, args.touched)
+                samples.append(timed(lambda: leaderboards.top('most_booked'), repeat=1)[0])
+            samples.sort()
+            label = f"incremental, {args.touched} services booked"
+            print(f"{label:<40}{samples[len(samples) // 2]:>10.2f}/{samples[-1]:<10.2f}")
+
+            leaderboards.recompute()
+            wrong = 0
+            for _ in range(args.rounds):
+                random_writes(buffer, rng, vendor_ids, service_ids, args.touched)
+                wrong += mismatches(leaderboards)
+            print(f"boards differing from SQL after {args.rounds} rounds of writes: {wrong}")
+            db.session.remove()
+    return 1 if wrong else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
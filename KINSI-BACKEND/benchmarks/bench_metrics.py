@@ -0,0 +1,79 @@
+# benchmarks/bench_metrics.py
+"""Per-request cost of the /metrics instrumentation, and scrape cost.
+
+Runs the same read endpoints with METRICS_ENABLED off and on (response
+cache off, so every request reaches the database), alternating rounds to
+even out noise, then times a /metrics scrape that merges the snapshots of
+several workers.
+
+    python benchmarks/bench_metrics.py [requests per round] [rounds]
+"""
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+from common import fill_catalog, make_app
+
+N_VENDORS = 1000
+PATHS = ['/api/vendor/stats/{id}', '/api/vendor/services/{id}', '/api/vendor/profile/{id}']
+
+
+def per_request_us(app, n):
+    client = app.test_client()
+    start = time.perf_counter()
+    for i in range(n):
+        path = PATHS[i % len(PATHS)].format(id=i % N_VENDORS + 1)
+        client.get(path).get_data()
+    return (time.perf_counter() - start) / n * 1e6
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    rounds = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    db_path = os.path.join(tempfile.mkdtemp(prefix='kinsi-bench-'), 'bench.db')
+    metrics_dir = tempfile.mkdtemp(prefix='kinsi-metrics-')
+
+    seed = make_app(db_path)
+    with seed.app_context():
+        fill_catalog(N_VENDORS, services_per_vendor=5)
+    apps = {
+        'off': make_app(db_path, RESPONSE_CACHE_BACKEND=None, METRICS_ENABLED=False),
+        'on': make_app(db_path, RESPONSE_CACHE_BACKEND=None, METRICS_ENABLED=True),
+        'on+dir': make_app(db_path, RESPONSE_CACHE_BACKEND=None, METRICS_ENABLED=True,
+                           METRICS_DIR=metrics_dir),
+    }
+    for app in apps.values():
+        per_request_us(app, 200)  # warm up
+
+    samples = {name: [] for name in apps}
+    for _ in range(rounds):
+        for name, app in apps.items():
+            samples[name].append(per_request_us(app, n))
+
+    base = statistics.median(samples['off'])
+    print(f"{'metrics':<10}{'us/request':>12}{'overhead':>12}")
+    for name, values in samples.items():
+        value = statistics.median(values)
+        print(f"{name:<10}{value:>12.1f}{value - base:>+9.1f} us ({(value / base - 1) * 100:+.1f}%)")
+
+    # Scrape with 8 workers' worth of snapshots on disk
+    app = apps['on+dir']
+    store = app.extensions['metrics_store']
+    registry = app.extensions['metrics']
+    for pid in range(1, 8):
+        path = store._path(os.getppid(), 10_000_000 + pid)
+        with open(path, 'w') as f:
+            json.dump(registry.snapshot(), f)
+    client = app.test_client()
+    start = time.perf_counter()
+    for _ in range(50):
+        body = client.get('/metrics').get_data()
+    print(f"scrape with 8 worker snapshots: {(time.perf_counter() - start) / 50 * 1000:.2f} ms, "
+          f"{len(body) / 1024:.0f} KiB")
+
+
+if __name__ == '__main__':
+    main()
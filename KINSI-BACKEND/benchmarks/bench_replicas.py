@@ -0,0 +1,167 @@
+# benchmarks/bench_replicas.py
+"""Read throughput against the number of read replicas.
+
+For each count in ``--replicas`` a fresh copy of the seeded catalog is
+served by a local gunicorn with that many SQLite replica files in
+DATABASE_REPLICA_URLS, while ``flask replicas sync --interval`` copies the
+primary into them (and stamps the heartbeat, also with no replicas). The
+response and vendor caches are off, so every read reaches a database.
+For ``--seconds``, closed-loop threads run:
+
+* readers: ``--readers`` threads mixing catalog pages, vendor services
+  and vendor stats
+* writers: ``--writers`` threads updating vendor profiles
+
+It prints reads and writes per second, read p50/p99 latency, and where
+the workers routed reads (from /metrics). Replicas take read work off
+the primary file, not off the CPUs: on a host whose workers are
+CPU-bound, throughput stays flat or drops with the sync's copying, and
+it scales only when the replicas sit on their own disks or hosts.
+
+    python benchmarks/bench_replicas.py --replicas 0,1,2,3
+"""
+import argparse
+import http.client
+import json
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+from bench_http import GunicornTarget, ROOT, catalog_ids, catalog_path, percentile
+
+
+def reader(rng, ids):
+    roll = rng.random()
+    if roll < 0.4:
+        return 'GET', f"/api/vendors?limit=50&cursor={rng.randint(0, ids['vendors'])}", None
+    if roll < 0.7:
+        return 'GET', f"/api/vendor/services/{rng.randint(1, ids['vendors'])}", None
+    return 'GET', f"/api/vendor/stats/{rng.randint(1, ids['vendors'])}", None
+
+
+def writer(rng, ids):
+    return 'POST', '/api/vendor/profile', {'user_id': rng.randint(1, ids['users']),
+                                           'description': f'Updated {rng.random()}'}
+
+
+def run_load(port, ids, readers, writers, seconds, seed):
+    """Closed-loop load; returns ([(status, ms)] of reads, [(status, ms)] of writes)"""
+    results = {'read': [], 'write': []}
+    lock = threading.Lock()
+    deadline = time.monotonic() + seconds
+
+    def run(kind, build, index):
+        rng = random.Random(f'{seed}-{kind}-{index}')
+        conn = http.client.HTTPConnection('127.0.0.1', port, timeout=300)
+        samples = []
+        while time.monotonic() < deadline:
+            method, path, body = build(rng, ids)
+            payload = json.dumps(body).encode() if body is not None else None
+            headers = {'Content-Type': 'application/json'} if body is not None else {}
+            start = time.perf_counter()
+            try:
+                conn.request(method, path, body=payload, headers=headers)
+                response = conn.getresponse()
+                response.read()
+                status = response.status
+            except (OSError, http.client.HTTPException):
+                conn.close()
+                conn = http.client.HTTPConnection('127.0.0.1', port, timeout=300)
+                status = 599
+            samples.append((status, (time.perf_counter() - start) * 1000))
+        conn.close()
+        with lock:
+            results[kind].extend(samples)
+
+    threads = [threading.Thread(target=run, args=('read', reader, index)) for index in range(readers)]
+    threads += [threading.Thread(target=run, args=('write', writer, index)) for index in range(writers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results['read'], results['write']
+
+
+def read_routes(port):
+    """Reads routed per bind, summed over the workers"""
+    conn = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+    conn.request('GET', '/metrics')
+    text = conn.getresponse().read().decode()
+    conn.close()
+    routes = {}
+    for line in text.splitlines():
+        if line.startswith('kinsi_db_read_routes_total{'):
+            labels, value = line.rsplit(' ', 1)
+            routes[labels.split('"')[1]] = int(float(value))
+    return routes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--scale', default='35000', help="Catalog size in services")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--replicas', default='0,1,2,3', help="Comma-separated replica counts")
+    parser.add_argument('--seconds', type=float, default=15.0, help="Load duration per count")
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--threads', type=int, default=8, help="gthread threads per worker")
+    parser.add_argument('--readers', type=int, default=16)
+    parser.add_argument('--writers', type=int, default=2)
+    parser.add_argument('--sync-interval', type=float, default=2.0)
+    args = parser.parse_args()
+
+    print(f"{args.scale} services, {args.workers} workers x {args.threads} threads, "
+          f"{args.readers} readers, {args.writers} writers, sync every {args.sync_interval:g} s, "
+          f"{os.cpu_count()} CPUs")
+    print(f"{'replicas':<10}{'reads/s':>9}{'read p50/p99 ms':>18}{'writes/s':>10}{'errors':>8}  reads routed")
+    with tempfile.TemporaryDirectory() as tmp:
+        for count in map(int, args.replicas.split(',')):
+            run_dir = os.path.join(tmp, f'run-{count}')
+            os.makedirs(os.path.join(run_dir, 'metrics'))
+            db_path = os.path.join(run_dir, 'primary.db')
+            shutil.copyfile(catalog_path(args.scale, args.seed), db_path)
+            ids = catalog_ids(db_path, 0)
+            env = {
+                **os.environ,
+                'DATABASE_URL': 'sqlite:///' + db_path,
+                'DATABASE_REPLICA_URLS': ','.join(
+                    'sqlite:///' + os.path.join(run_dir, f'replica-{index}.db') for index in range(count)),
+                'RESPONSE_CACHE_BACKEND': 'none',
+                'VENDOR_CACHE_ENABLED': '0',
+                'METRICS_DIR': os.path.join(run_dir, 'metrics'),
+                'FLASK_APP': 'app.py',
+            }
+            flask = [sys.executable, '-m', 'flask', 'replicas', 'sync']
+            # Adds the heartbeat table to catalogs seeded before it existed
+            subprocess.run([sys.executable, '-m', 'flask', 'create-db'], env=env, cwd=ROOT,
+                           check=True, stdout=subprocess.DEVNULL)
+            subprocess.run(flask, env=env, cwd=ROOT, check=True, stdout=subprocess.DEVNULL)
+            sync = subprocess.Popen([*flask, '--interval', str(args.sync_interval)], env=env, cwd=ROOT)
+            target = GunicornTarget(db_path, None, args.workers, args.threads, env=env)
+            try:
+                # Let every worker's monitor see the replicas before measuring
+                run_load(target.port, ids, args.readers, 0, 2.0, args.seed)
+                before = read_routes(target.port)
+                reads, writes = run_load(target.port, ids, args.readers, args.writers,
+                                         args.seconds, args.seed)
+                after = read_routes(target.port)
+            finally:
+                target.close()
+                sync.terminate()
+                sync.wait()
+            routed = {key: after[key] - before.get(key, 0) for key in sorted(after)}
+            errors = sum(status >= 400 for status, _ in reads + writes)
+            latencies = sorted(ms for status, ms in reads if status < 400)
+            print(f"{count:<10}{len(reads) / args.seconds:>9.0f}"
+                  f"{percentile(latencies, 0.50):>9.1f}/{percentile(latencies, 0.99):<8.1f}"
+                  f"{len(writes) / args.seconds:>10.1f}{errors:>8}  "
+                  f"{', '.join(f'{key} {value}' for key, value in routed.items()) or '-'}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,48 @@
+# benchmarks/bench_search.py
+"""Search latency: FTS5 index vs. loading everything and filtering in Python.
+
+The scan mirrors what LocalVendors.jsx does today after fetching
+/api/vendors: lowercase substring checks over every vendor and service.
+
+    python benchmarks/bench_search.py [n_services]
+"""
+import sys
+
+from common import fill_catalog, make_app, timed
+from app import db
+from app.models.vendors import Vendor
+from app.search import rebuild_search_index, search_vendor_ids
+from sqlalchemy.orm import selectinload
+
+QUERIES = ['rustic', 'garden photography', 'luxury venue', 'bridal']
+
+
+def scan_search(term):
+    term = term.lower()
+    vendors = Vendor.query.options(selectinload(Vendor.services)).all()
+    return [
+        v.id for v in vendors
+        if term in (v.business_name or '').lower()
+        or term in (v.service_type or '').lower()
+        or any(term in (s.service_name or '').lower() for s in v.services)
+    ]
+
+
+def main():
+    n_services = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    services_per_vendor = 5
+    app = make_app()
+    with app.app_context():
+        fill_catalog(n_services // services_per_vendor, services_per_vendor)
+        rebuild_search_index()
+        print(f"{n_services} services, {n_services // services_per_vendor} vendors")
+        print(f"{'query':<22}{'fts5 p50/p95 ms':>20}{'scan p50/p95 ms':>20}")
+        for query in QUERIES:
+            fts = timed(lambda: search_vendor_ids(query, limit=20))
+            scan = timed(lambda: scan_search(query), repeat=3)
+            db.session.expire_all()
+            print(f"{query:<22}{fts[0]:>11.2f}/{fts[1]:<8.2f}{scan[0]:>11.1f}/{scan[1]:<8.1f}")
+
+
+if __name__ == '__main__':
+    main()
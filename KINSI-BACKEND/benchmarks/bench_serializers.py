@@ -0,0 +1,84 @@
+# benchmarks/bench_serializers.py
+"""Serialization cost per 10k rows.
+
+Compares the old hand-written to_dict() bodies with the compiled
+serializers, with and without native datetimes, stdlib json vs. orjson,
+and a full SELECT vs. a ?fields= projection pushed into the query.
+
+    python benchmarks/bench_serializers.py [n_rows]
+"""
+import json
+import sys
+import time
+
+from common import fill_catalog, make_app
+from app import db
+from app.models.services import Service
+from app.models.vendors import Vendor
+from app.serializers import (SERVICE_FIELDS, VENDOR_FIELDS, compile_serializer,
+                             serialize_vendors, vendor_load_options)
+
+
+def legacy_service_dict(service):
+    return {
+        "id": service.id,
+        "vendor_id": service.vendor_id,
+        "service_name": service.service_name,
+        "category": service.category,
+        "price": service.price,
+        "duration": service.duration,
+        "description": service.description,
+        "features": json.loads(service.features) if service.features else [],
+        "views": service.views,
+        "inquiries": service.inquiries,
+        "bookings": service.bookings,
+        "is_active": service.is_active,
+        "created_at": service.created_at.isoformat() if service.created_at else None,
+        "updated_at": service.updated_at.isoformat() if service.updated_at else None,
+    }
+
+
+def per_10k(fn, n_rows, repeat=5):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000 * 10_000 / n_rows
+
+
+def main():
+    n_rows = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000
+    app = make_app()
+    with app.app_context():
+        fill_catalog(n_rows // 10, services_per_vendor=10)
+        services = Service.query.all()
+        compiled = compile_serializer(Service, SERVICE_FIELDS, False)
+        native = compile_serializer(Service, SERVICE_FIELDS, True)
+        payload = [compiled(s) for s in services]
+
+        print(f"ms per 10k service rows ({len(services)} rows)")
+        print(f"  legacy to_dict            {per_10k(lambda: [legacy_service_dict(s) for s in services], n_rows):8.1f}")
+        print(f"  compiled serializer       {per_10k(lambda: [compiled(s) for s in services], n_rows):8.1f}")
+        print(f"  compiled, native dates    {per_10k(lambda: [native(s) for s in services], n_rows):8.1f}")
+        print(f"  json.dumps                {per_10k(lambda: json.dumps(payload), n_rows):8.1f}")
+        try:
+            import orjson
+            print(f"  orjson.dumps              {per_10k(lambda: orjson.dumps(payload), n_rows):8.1f}")
+        except ImportError:
+            print("  orjson.dumps              (orjson not installed)")
+
+        def query_and_serialize(fields, service_fields):
+            vendors = Vendor.query.options(*vendor_load_options(fields, service_fields)).all()
+            serialize_vendors(vendors, fields, service_fields)
+            db.session.expunge_all()
+
+        print("ms per 10k service rows, SELECT + serialize vendors with services")
+        print(f"  all columns               "
+              f"{per_10k(lambda: query_and_serialize(VENDOR_FIELDS, SERVICE_FIELDS), n_rows, 3):8.1f}")
+        print(f"  ?fields=id,business_name,services.service_name,services.price "
+              f"{per_10k(lambda: query_and_serialize(('id', 'business_name'), ('service_name', 'price')), n_rows, 3):8.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,153 @@
+# benchmarks/bench_startup.py
+"""Start-up cost: import, create_app, first request, and gunicorn boot.
+
+Every sample runs in a fresh interpreter against a copy of the seeded
+catalog, timing ``from app import create_app``, ``create_app()`` and the
+first and second request through the test client; medians over
+``--runs`` are reported, along with heavy modules that got imported
+anyway. gunicorn is then started with and without preloading, timing
+how long it takes until the first request is answered and how slow the
+first request on each worker is.
+
+    python benchmarks/bench_startup.py --scale 100k --runs 7
+"""
+import argparse
+import http.client
+import json
+import os
+import shutil
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from bench_http import ROOT, catalog_path
+
+# Modules serving processes should not need to import
+HEAVY_MODULES = ('alembic', 'flask_migrate', 'app.synthetic')
+
+_PROBE = '''
+import json, sys, time
+start = time.perf_counter()
+from app import create_app
+imported = time.perf_counter()
+app = create_app()
+created = time.perf_counter()
+client = app.test_client()
+status = client.get('/api/vendor/profile/1').status_code
+first = time.perf_counter()
+client.get('/api/vendor/profile/2')
+second = time.perf_counter()
+print(json.dumps({
+    'import_ms': (imported - start) * 1000,
+    'create_app_ms': (created - imported) * 1000,
+    'first_request_ms': (first - created) * 1000,
+    'second_request_ms': (second - first) * 1000,
+    'status': status,
+    'heavy_modules': sorted(name for name in %r if name in sys.modules),
+}))
+'''
+
+
+def probe(db_path):
+    env = {**os.environ, 'DATABASE_URL': 'sqlite:///' + db_path, 'PYTHONPATH': ROOT}
+    output = subprocess.run([sys.executable, '-c', _PROBE % (HEAVY_MODULES,)], env=env,
+                            cwd=ROOT, check=True, capture_output=True, text=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def _get(port, path, timeout=5):
+    conn = http.client.HTTPConnection('127.0.0.1', port, timeout=timeout)
+    try:
+        conn.request('GET', path)
+        response = conn.getresponse()
+        response.read()
+        return response.status
+    finally:
+        conn.close()
+
+
+def gunicorn_boot(db_path, workers, preload, timeout=60):
+    """(ms until the first answered request, slowest first request of a fresh connection ms)"""
+    port = _free_port()
+    env = {**os.environ, 'DATABASE_URL': 'sqlite:///' + db_path,
+           'GUNICORN_PRELOAD': '1' if preload else '0'}
+    start = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '--workers', str(workers), '--bind', f'127.0.0.1:{port}',
+         '--log-level', 'warning', 'app:create_app()'],
+        env=env, cwd=ROOT)
+    try:
+        deadline = start + timeout
+        while True:
+            if proc.poll() is not None:
+                raise RuntimeError("gunicorn exited during startup")
+            if time.perf_counter() > deadline:
+                raise RuntimeError("gunicorn did not start")
+            try:
+                _get(port, '/api/vendor/profile/1')
+                break
+            except OSError:
+                time.sleep(0.01)
+        ready_ms = (time.perf_counter() - start) * 1000
+
+        # Sync workers take one connection each, so a few rounds reach every worker
+        slowest = 0.0
+        for n in range(workers * 4):
+            began = time.perf_counter()
+            _get(port, f'/api/vendor/profile/{n + 2}')
+            slowest = max(slowest, (time.perf_counter() - began) * 1000)
+        return ready_ms, slowest
+    finally:
+        proc.terminate()
+        proc.wait(timeout=30)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--scale', default='1k', help="Catalog size: 1k, 100k, 1m or a service count")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--workers', type=int, default=4, help="gunicorn workers")
+    parser.add_argument('--output', help="Write results to this JSON file")
+    args = parser.parse_args()
+
+    source = catalog_path(args.scale, args.seed)
+    results = {'scale': args.scale, 'runs': args.runs}
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, 'catalog.db')
+        shutil.copyfile(source, db_path)
+
+        samples = [probe(db_path) for _ in range(args.runs)]
+        for key in ('import_ms', 'create_app_ms', 'first_request_ms', 'second_request_ms'):
+            results[key] = statistics.median(sample[key] for sample in samples)
+            print(f"{key:<20}{results[key]:>9.1f}")
+        results['heavy_modules'] = samples[0]['heavy_modules']
+        print(f"heavy modules imported: {', '.join(results['heavy_modules']) or 'none'}")
+
+        for preload in (False, True):
+            boots = [gunicorn_boot(db_path, args.workers, preload) for _ in range(args.runs)]
+            name = 'gunicorn_preload' if preload else 'gunicorn'
+            results[name] = {
+                'ready_ms': statistics.median(ready for ready, _ in boots),
+                'slowest_first_request_ms': statistics.median(slowest for _, slowest in boots),
+            }
+            print(f"{name:<20}ready {results[name]['ready_ms']:>7.1f} ms, slowest early request "
+                  f"{results[name]['slowest_first_request_ms']:>6.1f} ms")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
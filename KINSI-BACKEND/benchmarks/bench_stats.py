@@ -0,0 +1,44 @@
+# benchmarks/bench_stats.py
+"""Vendor stats latency: vendor_stats rollup lookup vs. summing services in Python.
+
+    python benchmarks/bench_stats.py [services_per_vendor]
+"""
+import sys
+
+from common import fill_catalog, make_app, timed
+from app import db
+from app.models.services import Service
+from app.stats import get_vendor_stats_row, rebuild_vendor_stats
+
+
+def load_and_sum(vendor_id):
+    services = Service.query.filter_by(vendor_id=vendor_id).all()
+    return {
+        "total_services": len(services),
+        "total_views": sum(service.views for service in services),
+        "total_inquiries": sum(service.inquiries for service in services),
+        "total_bookings": sum(service.bookings for service in services),
+    }
+
+
+def main():
+    per_vendor = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    app = make_app()
+    with app.app_context():
+        fill_catalog(20, services_per_vendor=per_vendor)
+        rebuild_vendor_stats()
+        assert load_and_sum(7) == get_vendor_stats_row(7)
+
+        def old():
+            load_and_sum(7)
+            db.session.expunge_all()
+
+        scan = timed(old)
+        rollup = timed(lambda: get_vendor_stats_row(7), repeat=200)
+        print(f"vendor with {per_vendor} services")
+        print(f"load + sum in Python   p50 {scan[0]:8.2f} ms   p95 {scan[1]:8.2f} ms")
+        print(f"vendor_stats lookup    p50 {rollup[0]:8.3f} ms   p95 {rollup[1]:8.3f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,105 @@
+# benchmarks/bench_sync.py
+"""Delta sync vs. refetching the catalog.
+
+On a copy of the seeded catalog, through the test client with the
+response cache off:
+
+* refetch: every page of GET /api/vendors (what the retry button in
+  LocalVendors.jsx does), response bytes and wall time
+* initial sync: every page of GET /api/vendors/changes without a token
+* idle: one /api/vendors/changes call with the token when nothing changed
+* delta: the same after ``--changes`` service updates and deletes
+
+    python benchmarks/bench_sync.py --scale 100k
+"""
+import argparse
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+from common import make_app, timed
+from bench_http import catalog_path
+from app import db
+
+
+def walk(client, first, following):
+    """Follow a paginated endpoint to the end; returns (pages, bytes, last response)"""
+    pages = size = 0
+    response = client.get(first)
+    while True:
+        pages += 1
+        size += len(response.get_data())
+        path = following(response)
+        if path is None:
+            return pages, size, response
+        response = client.get(path)
+
+
+def next_catalog_page(response):
+    cursor = response.headers.get('X-Next-Cursor')
+    return f'/api/vendors?limit=200&cursor={cursor}' if cursor else None
+
+
+def next_changes_page(response):
+    data = response.get_json()
+    return f"/api/vendors/changes?limit=2000&since={data['next']}" if data['has_more'] else None
+
+
+def report(label, seconds, pages, size):
+    print(f"{label:<34}{seconds * 1000:>10.1f} ms{pages:>8} pages{size / 1024:>12.1f} KiB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--scale', default='100k', help="Catalog size: 1k, 100k, 1m or a service count")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--changes', type=int, default=50, help="Services updated, and deleted, before the delta")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, 'catalog.db')
+        shutil.copyfile(catalog_path(args.scale, args.seed), db_path)
+        app = make_app(db_path, RESPONSE_CACHE_BACKEND=None, SYNC_LAG_SECONDS=0.0)
+        client = app.test_client()
+        with app.app_context():
+            service_ids = db.session.execute(db.text("SELECT id FROM services")).scalars().all()
+            db.session.remove()
+        print(f"{args.scale} catalog, {len(service_ids)} services")
+
+        start = time.perf_counter()
+        pages, size, _ = walk(client, '/api/vendors?limit=200', next_catalog_page)
+        report("refetch /api/vendors", time.perf_counter() - start, pages, size)
+
+        start = time.perf_counter()
+        pages, size, last = walk(client, '/api/vendors/changes?limit=2000', next_changes_page)
+        report("initial sync", time.perf_counter() - start, pages, size)
+        token = last.get_json()['next']
+
+        idle = client.get(f'/api/vendors/changes?since={token}')
+        p50, _ = timed(lambda: client.get(f'/api/vendors/changes?since={token}'))
+        report("idle (nothing changed)", p50 / 1000, 1, len(idle.get_data()))
+
+        touched = rng.sample(service_ids, 2 * args.changes)
+        for service_id in touched[:args.changes]:
+            client.put(f'/api/vendor/services/{service_id}', json={'price': rng.randint(100, 9000)})
+        for service_id in touched[args.changes:]:
+            client.delete(f'/api/vendor/services/{service_id}')
+        start = time.perf_counter()
+        pages, size, last = walk(client, f'/api/vendors/changes?limit=2000&since={token}',
+                                 next_changes_page)
+        report(f"delta ({args.changes} updated, {args.changes} deleted)",
+               time.perf_counter() - start, pages, size)
+        data = last.get_json()
+        if len(data['services']) != args.changes or len(data['deleted']) != args.changes:
+            print(f"expected {args.changes} services and deletes, got "
+                  f"{len(data['services'])} and {len(data['deleted'])}")
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,135 @@
+# benchmarks/bench_vendor_cache.py
+"""Vendor identity cache: latency, hit rate and cross-process invalidation.
+
+On a copy of a seeded catalog, with the response cache off so every
+request reaches its handler:
+
+* profile: GET /api/vendor/profile/<user_id> with skewed (Zipf-like)
+  user ids, identity cache off and on; prints p50/p95 latency, requests per
+  second and the cache's hit/miss/stale counts
+* services: GET /api/vendor/services/<vendor_id>, where the cache only
+  replaces the existence check
+* invalidation: a second process on the same database and stamp file
+  (another gunicorn worker) updates a vendor this process has cached, then
+  this process looks it up again; ``--rounds`` times, reporting how many
+  lookups returned the old name
+
+    python benchmarks/bench_vendor_cache.py --requests 5000
+"""
+import argparse
+import os
+import random
+import shutil
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+
+from common import make_app
+from bench_http import catalog_path, percentile
+from app.vendor_cache import find_vendor
+
+
+def skewed(rng, population, count, exponent=1.1):
+    """``count`` draws where the k-th most popular item has weight 1/k**exponent"""
+    weights = [1 / (rank ** exponent) for rank in range(1, len(population) + 1)]
+    return rng.choices(population, weights=weights, k=count)
+
+
+def run(client, paths):
+    latencies = []
+    start = time.perf_counter()
+    for path in paths:
+        began = time.perf_counter()
+        response = client.get(path)
+        latencies.append((time.perf_counter() - began) * 1000)
+        assert response.status_code == 200, (path, response.status_code)
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    return latencies, len(paths) / elapsed
+
+
+def lookup(app, vendor_id, user_id):
+    """find_vendor by user_id and by id, as a GET handler (on the read pool) would"""
+    with app.test_request_context():
+        return find_vendor(user_id=user_id), find_vendor(vendor_id)
+
+
+def writer_process(db_path, stamp_path):
+    """Entry point of the --writer process: one profile update per input line"""
+    app = make_app(db_path, RESPONSE_CACHE_BACKEND=None, VENDOR_CACHE_STAMP_PATH=stamp_path)
+    client = app.test_client()
+    for line in sys.stdin:
+        user_id, name = line.split(maxsplit=1)
+        response = client.post('/api/vendor/profile',
+                               json={'user_id': int(user_id), 'business_name': name.strip()})
+        print(response.status_code, flush=True)
+    app.extensions['counter_buffer'].stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--scale', default='35000', help="Catalog size in services")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--requests', type=int, default=5000)
+    parser.add_argument('--rounds', type=int, default=200)
+    parser.add_argument('--writer', nargs=2, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.writer:
+        writer_process(*args.writer)
+        return 0
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, 'catalog.db')
+        stamp_path = os.path.join(tmp, 'vendor-stamps')
+        shutil.copyfile(catalog_path(args.scale, args.seed), db_path)
+        conn = sqlite3.connect(db_path)
+        vendors = conn.execute("SELECT id, user_id FROM vendors ORDER BY id").fetchall()
+        conn.close()
+        rng = random.Random(args.seed)
+        rng.shuffle(vendors)
+        picks = skewed(rng, vendors, args.requests)
+        workloads = {
+            'profile': [f'/api/vendor/profile/{user_id}' for _, user_id in picks],
+            'services': [f'/api/vendor/services/{vendor_id}' for vendor_id, _ in picks],
+        }
+        print(f"{args.scale} services, {len(vendors)} vendors, {args.requests} requests, "
+              f"{len(set(picks))} distinct vendors")
+        print(f"{'':<24}{'p50/p95 ms':>14}{'req/s':>10}  cache")
+
+        for name, paths in workloads.items():
+            for enabled in (False, True):
+                app = make_app(db_path, RESPONSE_CACHE_BACKEND=None, VENDOR_CACHE_ENABLED=enabled,
+                               VENDOR_CACHE_STAMP_PATH=stamp_path)
+                client = app.test_client()
+                client.get(paths[0])
+                latencies, rate = run(client, paths)
+                cache = app.extensions['vendor_cache']
+                print(f"{name + (', cache on' if enabled else ', cache off'):<24}"
+                      f"{percentile(latencies, 0.50):>7.2f}/{percentile(latencies, 0.95):<6.2f}"
+                      f"{rate:>10.0f}  {cache.stats() if cache else '-'}")
+                app.extensions['counter_buffer'].stop()
+
+        app = make_app(db_path, RESPONSE_CACHE_BACKEND=None, VENDOR_CACHE_STAMP_PATH=stamp_path)
+        writer = subprocess.Popen([sys.executable, __file__, '--writer', db_path, stamp_path],
+                                  stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True)
+        stale = 0
+        for round_ in range(args.rounds):
+            vendor_id, user_id = rng.choice(vendors)
+            lookup(app, vendor_id, user_id)
+            name = f'Renamed {round_}'
+            writer.stdin.write(f'{user_id} {name}\n')
+            writer.stdin.flush()
+            assert writer.stdout.readline().strip() == '200'
+            stale += sum(record['business_name'] != name for record in lookup(app, vendor_id, user_id))
+        writer.stdin.close()
+        writer.wait()
+        print(f"\ninvalidation: {args.rounds} updates in another process, "
+              f"{stale} stale lookups, {app.extensions['vendor_cache'].stats()}")
+        app.extensions['counter_buffer'].stop()
+    return 1 if stale else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,113 @@
+# benchmarks/common.py
+"""Shared helpers for the benchmark scripts in this folder.
+
+Every benchmark runs against a throwaway SQLite file, never site.db.
+"""
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app, db
+from app.config import Config
+from app.search import create_search_index
+
+CATEGORIES = [
+    'Photography', 'Catering', 'Decoration', 'Venue', 'Music & Entertainment',
+    'Event Planning', 'Flowers', 'Transportation',
+]
+WORDS = [
+    'classic', 'modern', 'rustic', 'elegant', 'garden', 'beach', 'luxury', 'budget',
+    'traditional', 'vintage', 'bridal', 'outdoor', 'premium', 'intimate', 'grand',
+]
+
+
+def make_app(db_path=None, **overrides):
+    """Create the app bound to a fresh SQLite file and create the schema.
+
+    Keyword arguments override Config attributes.
+    """
+    if db_path is None:
+        db_path = os.path.join(tempfile.mkdtemp(prefix='kinsi-bench-'), 'bench.db')
+
+    BenchConfig = type('BenchConfig', (Config,), {
+        'SQLALCHEMY_DATABASE_URI': 'sqlite:///' + db_path,
+        # Benchmarks drive everything from one address
+        'ADMISSION_ENABLED': False,
+        **overrides,
+    })
+
+    app = create_app(BenchConfig)
+    with app.app_context():
+        db.create_all()
+        create_search_index()
+    return app
+
+
+def fill_catalog(n_vendors, services_per_vendor, seed=42):
+    """Bulk-insert a random catalog (call inside an app context)"""
+    rng = random.Random(seed)
+    vendors = []
+    services = []
+    for vendor_id in range(1, n_vendors + 1):
+        category = rng.choice(CATEGORIES)
+        vendors.append({
+            "id": vendor_id, "user_id": vendor_id,
+            "business_name": f"{rng.choice(WORDS).title()} {category} {vendor_id}",
+            "service_type": category,
+            "description": ' '.join(rng.choices(WORDS, k=12)),
+            "is_active": True, "rating": round(rng.uniform(0, 5), 1), "total_reviews": 0,
+        })
+        for _ in range(services_per_vendor):
+            services.append({
+                "vendor_id": vendor_id,
+                "service_name": f"{rng.choice(WORDS)} {category.lower()} package",
+                "category": category,
+                "price": round(rng.uniform(100, 10000), 2),
+                "description": ' '.join(rng.choices(WORDS, k=8)),
+                "features": json.dumps(rng.sample(WORDS, 3)),
+                "views": 0, "inquiries": 0, "bookings": 0, "is_active": True,
+            })
+    db.session.execute(db.text(
+        "INSERT INTO vendors (id, user_id, business_name, service_type, description, "
+        "is_active, rating, total_reviews) VALUES (:id, :user_id, :business_name, "
+        ":service_type, :description, :is_active, :rating, :total_reviews)"), vendors)
+    db.session.execute(db.text(
+        "INSERT INTO services (vendor_id, service_name, category, price, description, "
+        "features, views, inquiries, bookings, is_active) VALUES (:vendor_id, "
+        ":service_name, :category, :price, :description, :features, :views, "
+        ":inquiries, :bookings, :is_active)"), services)
+    db.session.commit()
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process in MB.
+
+    Prefers VmHWM, which starts fresh on exec; ru_maxrss can be inherited
+    from a bigger parent process on Linux.
+    """
+    try:
+        with open('/proc/self/status') as status:
+            for line in status:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    import resource
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def timed(fn, repeat=20):
+    """Run fn repeatedly, return (median, p95) wall time in milliseconds"""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return statistics.median(samples), samples[int(len(samples) * 0.95) - 1]
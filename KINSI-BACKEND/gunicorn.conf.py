@@ -0,0 +1,44 @@
+# gunicorn.conf.py
+"""gunicorn settings, picked up from the working directory:
+
+    gunicorn 'app:create_app()'
+
+The app is loaded once in the master (GUNICORN_PRELOAD=1, the default) and
+workers fork from it with every module imported, mappers configured and
+serializers compiled. Loading the app does no database I/O, and each
+worker forgets pooled connections inherited from the master before it
+serves. With GUNICORN_PRELOAD=0 every worker loads and warms up the app
+itself.
+"""
+import os
+
+preload_app = os.environ.get('GUNICORN_PRELOAD', '1') == '1'
+
+
+def on_starting(server):
+    if server.cfg.preload_app:
+        from app.startup import warm_up
+        warm_up(server.app.wsgi())
+
+
+def post_fork(server, worker):
+    if server.cfg.preload_app:
+        from app.startup import reset_after_fork
+        reset_after_fork(server.app.wsgi())
+
+
+def child_exit(server, worker):
+    # Move the dead worker's totals into the master's archive snapshot, so
+    # /metrics keeps them without counting a restarted worker twice
+    from app.config import Config
+    directory = server.app.wsgi().config.get('METRICS_DIR') if server.cfg.preload_app \
+        else Config.METRICS_DIR
+    if directory:
+        from app.metrics import archive_worker_snapshot
+        archive_worker_snapshot(directory, server.pid, worker.pid)
+
+
+def post_worker_init(worker):
+    if not worker.cfg.preload_app:
+        from app.startup import warm_up
+        warm_up(worker.wsgi)
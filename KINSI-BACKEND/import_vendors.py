@@ -0,0 +1,47 @@
+# import_vendors.py
+"""Bulk import vendors and their services from a CSV or NDJSON file.
+
+Usage: python import_vendors.py vendors.ndjson [--format csv|ndjson] [--chunk-size 500]
+"""
+import argparse
+import os
+import sys
+import time
+
+# Add the current directory to Python path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app import create_app, db
+from app.bulk_import import DEFAULT_CHUNK_SIZE, import_vendors
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk import vendors and services")
+    parser.add_argument('path', help="CSV or NDJSON file, or - for stdin")
+    parser.add_argument('--format', choices=['csv', 'ndjson'],
+                        help="Input format (default: guessed from the file extension)")
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE,
+                        help="Rows per transaction")
+    args = parser.parse_args()
+    
+    import_format = args.format or ('csv' if args.path.lower().endswith('.csv') else 'ndjson')
+    app = create_app()
+    
+    with app.app_context():
+        start = time.perf_counter()
+        if args.path == '-':
+            report = import_vendors(sys.stdin, import_format, args.chunk_size)
+        else:
+            with open(args.path, encoding='utf-8', newline='') as stream:
+                report = import_vendors(stream, import_format, args.chunk_size)
+        elapsed = time.perf_counter() - start
+        db.session.close()
+    
+    for line_number, error in report.errors:
+        print(f"row {line_number}: {error}", file=sys.stderr)
+    print(f"✅ {report.rows} rows read, {report.vendors} vendors and "
+          f"{report.services} services written in {elapsed:.1f}s "
+          f"({len(report.errors)} errors)")
+    return 1 if report.errors else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -7,7 +7,13 @@ sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
 from app import create_app, db
 from app.models.vendors import Vendor
-from app.models.services import Service
+from app.models.services import Service  # noqa: F401 (registers the table)
+from app.models.vendor_stats import VendorStats
+from app.models.tombstones import Tombstone  # noqa: F401 (registers the table)
+from app.models.jobs import Job  # noqa: F401 (registers the table)
+from app.models.replica_heartbeat import ReplicaHeartbeat  # noqa: F401 (registers the table)
+from app.search import SEARCH_TABLE, create_search_index, index_vendor
+from app.geo import locate, set_location
 
 def init_database():
     """Initialize the database with all tables"""
@@ -17,9 +23,12 @@ def init_database():
         try:
             print("🗄️  Initializing database...")
             
-            # Drop all tables and recreate them
+            # Drop all tables and recreate them; the FTS index is not a model table
+            db.session.execute(db.text(f"DROP TABLE IF EXISTS {SEARCH_TABLE}"))
+            db.session.commit()
             db.drop_all()
             db.create_all()
+            create_search_index()
             
             print("✅ Database tables created successfully!")
             
@@ -37,9 +46,13 @@ def init_database():
                 service_type="Photography",
                 description="Professional wedding photography services",
                 contact_phone="+1234567890",
-                address="123 Wedding Street, City"
+                address="123 Wedding Street, Nairobi"
             )
+            set_location(test_vendor, *locate(None, test_vendor.address))
             db.session.add(test_vendor)
+            db.session.flush()
+            db.session.add(VendorStats(vendor_id=test_vendor.id))
+            index_vendor(test_vendor.id)
             db.session.commit()
             
             print("✅ Test vendor created successfully!")
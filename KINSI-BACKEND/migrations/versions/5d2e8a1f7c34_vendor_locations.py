@@ -0,0 +1,44 @@
+"""Vendor locations for nearby search
+
+Revision ID: 5d2e8a1f7c34
+Revises: c41f7a2b9e10
+Create Date: 2026-10-18 15:00:00.000000
+
+Adds latitude/longitude and the grid cell of app/geo.py to vendors, with
+the covering index nearby queries prefilter on. Run
+``flask geocode-vendors`` afterwards to locate existing vendors.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5d2e8a1f7c34'
+down_revision = 'c41f7a2b9e10'
+branch_labels = None
+depends_on = None
+
+COLUMNS = [
+    ('latitude', sa.Float()),
+    ('longitude', sa.Float()),
+    ('geo_cell', sa.Integer()),
+]
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    existing = {column['name'] for column in inspector.get_columns('vendors')}
+    for name, type_ in COLUMNS:
+        if name not in existing:
+            op.add_column('vendors', sa.Column(name, type_, nullable=True))
+
+    if 'ix_vendors_geo' not in {index['name'] for index in inspector.get_indexes('vendors')}:
+        op.create_index('ix_vendors_geo', 'vendors',
+                        ['geo_cell', 'latitude', 'longitude', 'is_active'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_vendors_geo', table_name='vendors')
+    with op.batch_alter_table('vendors') as batch_op:
+        for name, _ in reversed(COLUMNS):
+            batch_op.drop_column(name)
@@ -0,0 +1,31 @@
+"""Read replica heartbeat
+
+Revision ID: 8a61f0d3c2e9
+Revises: 3c8d1f6a4b52
+Create Date: 2026-10-18 23:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8a61f0d3c2e9'
+down_revision = '3c8d1f6a4b52'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    if 'replica_heartbeat' in inspector.get_table_names():
+        return
+    op.create_table('replica_heartbeat',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('beat_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+
+
+def downgrade():
+    op.drop_table('replica_heartbeat')
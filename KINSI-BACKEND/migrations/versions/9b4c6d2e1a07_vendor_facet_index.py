@@ -0,0 +1,28 @@
+"""Covering index for vendor facet counts
+
+Revision ID: 9b4c6d2e1a07
+Revises: 5d2e8a1f7c34
+Create Date: 2026-10-18 16:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9b4c6d2e1a07'
+down_revision = '5d2e8a1f7c34'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    existing = {index['name'] for index in inspector.get_indexes('vendors')}
+    if 'ix_vendors_is_active_service_type' not in existing:
+        op.create_index('ix_vendors_is_active_service_type', 'vendors',
+                        ['is_active', 'service_type'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_vendors_is_active_service_type', table_name='vendors')
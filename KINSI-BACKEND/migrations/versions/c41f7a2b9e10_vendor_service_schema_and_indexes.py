@@ -0,0 +1,139 @@
+"""Vendor/service schema and hot-query indexes
+
+Revision ID: c41f7a2b9e10
+Revises: 7f924896221c
+Create Date: 2026-10-18 12:30:00.000000
+
+Databases bootstrapped with db.create_all() already have the tables, so
+each table and index is only created when missing. A vendor_stats table
+or search index created here is filled from the existing vendors and
+services, as `flask vendor-stats rebuild` and `flask rebuild-search-index` would.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c41f7a2b9e10'
+down_revision = '7f924896221c'
+branch_labels = None
+depends_on = None
+
+INDEXES = [
+    ('ix_services_vendor_id_is_active', 'services', ['vendor_id', 'is_active']),
+    ('ix_services_category', 'services', ['category', 'is_active', 'vendor_id']),
+    ('ix_vendors_is_active_rating', 'vendors', ['is_active', 'rating']),
+    ('ix_vendors_service_type', 'vendors', ['service_type']),
+]
+
+BACKFILL_STATS = (
+    "INSERT INTO vendor_stats (vendor_id, total_services, total_views, total_inquiries, "
+    "total_bookings) "
+    "SELECT v.id, COUNT(s.id), COALESCE(SUM(s.views), 0), COALESCE(SUM(s.inquiries), 0), "
+    "COALESCE(SUM(s.bookings), 0) "
+    "FROM vendors v LEFT JOIN services s ON s.vendor_id = v.id GROUP BY v.id"
+)
+
+# One document per active vendor with the text of its active services,
+# as app/search.py builds them
+BACKFILL_SEARCH = (
+    "INSERT INTO vendor_search (rowid, business_name, description, service_type, "
+    "service_names, categories, features) "
+    "SELECT v.id, COALESCE(v.business_name, ''), COALESCE(v.description, ''), "
+    "COALESCE(v.service_type, ''), "
+    "COALESCE((SELECT group_concat(COALESCE(s.service_name, ''), ' ') FROM services s "
+    "WHERE s.vendor_id = v.id AND s.is_active = 1), ''), "
+    "COALESCE((SELECT group_concat(COALESCE(s.category, ''), ' ') FROM services s "
+    "WHERE s.vendor_id = v.id AND s.is_active = 1), ''), "
+    "COALESCE((SELECT group_concat(f.value, ' ') FROM services s, json_each("
+    "CASE WHEN json_valid(s.features) THEN s.features ELSE '[]' END) f "
+    "WHERE s.vendor_id = v.id AND s.is_active = 1), '') "
+    "FROM vendors v WHERE v.is_active = 1"
+)
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    tables = set(inspector.get_table_names())
+
+    if 'vendors' not in tables:
+        op.create_table('vendors',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('business_name', sa.String(length=100), nullable=False),
+        sa.Column('owner_name', sa.String(length=100), nullable=True),
+        sa.Column('email', sa.String(length=120), nullable=True),
+        sa.Column('service_type', sa.String(length=100), nullable=True),
+        sa.Column('description', sa.Text(), nullable=True),
+        sa.Column('contact_phone', sa.String(length=20), nullable=True),
+        sa.Column('address', sa.String(length=200), nullable=True),
+        sa.Column('experience', sa.String(length=100), nullable=True),
+        sa.Column('website', sa.String(length=120), nullable=True),
+        sa.Column('instagram', sa.String(length=120), nullable=True),
+        sa.Column('facebook', sa.String(length=120), nullable=True),
+        sa.Column('twitter', sa.String(length=120), nullable=True),
+        sa.Column('is_active', sa.Boolean(), nullable=True),
+        sa.Column('rating', sa.Float(), nullable=True),
+        sa.Column('total_reviews', sa.Integer(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('user_id')
+        )
+
+    if 'services' not in tables:
+        op.create_table('services',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('vendor_id', sa.Integer(), nullable=False),
+        sa.Column('service_name', sa.String(length=100), nullable=False),
+        sa.Column('category', sa.String(length=50), nullable=False),
+        sa.Column('price', sa.Float(), nullable=False),
+        sa.Column('duration', sa.String(length=50), nullable=True),
+        sa.Column('description', sa.Text(), nullable=True),
+        sa.Column('features', sa.Text(), nullable=True),
+        sa.Column('views', sa.Integer(), nullable=True),
+        sa.Column('inquiries', sa.Integer(), nullable=True),
+        sa.Column('bookings', sa.Integer(), nullable=True),
+        sa.Column('is_active', sa.Boolean(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['vendor_id'], ['vendors.id'], ),
+        sa.PrimaryKeyConstraint('id')
+        )
+
+    if 'vendor_stats' not in tables:
+        op.create_table('vendor_stats',
+        sa.Column('vendor_id', sa.Integer(), nullable=False),
+        sa.Column('total_services', sa.Integer(), nullable=False),
+        sa.Column('total_views', sa.Integer(), nullable=False),
+        sa.Column('total_inquiries', sa.Integer(), nullable=False),
+        sa.Column('total_bookings', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['vendor_id'], ['vendors.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('vendor_id')
+        )
+        op.execute(BACKFILL_STATS)
+
+    for name, table, columns in INDEXES:
+        existing = {index['name'] for index in inspector.get_indexes(table)} \
+            if table in tables else set()
+        if name not in existing:
+            op.create_index(name, table, columns, unique=False)
+
+    if op.get_bind().dialect.name == 'sqlite' and 'vendor_search' not in tables:
+        op.execute(
+            "CREATE VIRTUAL TABLE vendor_search USING fts5("
+            "business_name, description, service_type, "
+            "service_names, categories, features, "
+            "tokenize = 'unicode61 remove_diacritics 2')"
+        )
+        op.execute(BACKFILL_SEARCH)
+
+
+def downgrade():
+    if op.get_bind().dialect.name == 'sqlite':
+        op.execute("DROP TABLE IF EXISTS vendor_search")
+    for name, table, _ in reversed(INDEXES):
+        op.drop_index(name, table_name=table)
+    op.drop_table('vendor_stats')
+    op.drop_table('services')
+    op.drop_table('vendors')
@@ -0,0 +1,61 @@
+"""Delta sync: updated_at indexes and delete tombstones
+
+Revision ID: e7a3c5b9d210
+Revises: 9b4c6d2e1a07
+Create Date: 2026-10-18 18:00:00.000000
+
+Rows without updated_at get their created_at (or now) so that the first
+sync, which walks updated_at from the epoch, sees them. Stamps written
+without microseconds (by the sqlite3 driver's own datetime adapter) get
+them, so every stamp compares as text the way it does as a datetime.
+"""
+from datetime import datetime
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e7a3c5b9d210'
+down_revision = '9b4c6d2e1a07'
+branch_labels = None
+depends_on = None
+
+INDEXES = [
+    ('ix_vendors_updated_at', 'vendors', ['updated_at', 'id']),
+    ('ix_services_updated_at', 'services', ['updated_at', 'id']),
+]
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    if 'tombstones' not in inspector.get_table_names():
+        op.create_table('tombstones',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('table_name', sa.String(length=50), nullable=False),
+        sa.Column('record_id', sa.Integer(), nullable=False),
+        sa.Column('vendor_id', sa.Integer(), nullable=True),
+        sa.Column('deleted_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('id')
+        )
+        op.create_index('ix_tombstones_deleted_at', 'tombstones', ['deleted_at', 'id'], unique=False)
+
+    for table in ('vendors', 'services'):
+        stamp = sa.table(table, sa.column('updated_at', sa.DateTime()),
+                         sa.column('created_at', sa.DateTime()))
+        op.execute(stamp.update().where(stamp.c.updated_at.is_(None)).values(
+            updated_at=sa.func.coalesce(stamp.c.created_at, sa.literal(datetime.utcnow(), sa.DateTime()))))
+        op.execute(stamp.update().where(sa.func.length(stamp.c.updated_at) == 19).values(
+            updated_at=stamp.c.updated_at.concat('.000000')))
+
+    for name, table, columns in INDEXES:
+        existing = {index['name'] for index in inspector.get_indexes(table)}
+        if name not in existing:
+            op.create_index(name, table, columns, unique=False)
+
+
+def downgrade():
+    for name, table, _ in reversed(INDEXES):
+        op.drop_index(name, table_name=table)
+    op.drop_index('ix_tombstones_deleted_at', table_name='tombstones')
+    op.drop_table('tombstones')
@@ -0,0 +1,55 @@
+# seed_catalog.py
+"""Fill the database with a deterministic synthetic catalog.
+
+Usage: python seed_catalog.py [--scale 1k|100k|1m|<services>] [--seed 42] [--skip-index]
+
+Rows are appended to whatever DATABASE_URL points at; run init_db.py (or
+flask db upgrade) first on a new database.
+"""
+import argparse
+import os
+import sys
+import time
+
+# Add the current directory to Python path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app import create_app, db
+from app.search import create_search_index, rebuild_search_index
+from app.stats import rebuild_vendor_stats
+from app.synthetic import SCALES, generate_catalog, parse_scale
+
+def main():
+    parser = argparse.ArgumentParser(description="Seed a synthetic vendor catalog")
+    parser.add_argument('--scale', default='1k',
+                        help=f"Number of services: {', '.join(SCALES)} or an integer")
+    parser.add_argument('--seed', type=int, default=42, help="Random seed")
+    parser.add_argument('--skip-index', action='store_true',
+                        help="Do not rebuild the search index and vendor stats")
+    args = parser.parse_args()
+    
+    try:
+        n_services = parse_scale(args.scale)
+    except ValueError as e:
+        parser.error(str(e))
+    app = create_app()
+    
+    with app.app_context():
+        db.create_all()
+        create_search_index()
+        
+        start = time.perf_counter()
+        n_vendors, written = generate_catalog(n_services, seed=args.seed)
+        print(f"✅ {n_vendors} vendors and {written} services written in "
+              f"{time.perf_counter() - start:.1f}s")
+        
+        if not args.skip_index:
+            start = time.perf_counter()
+            rebuild_search_index()
+            rebuild_vendor_stats()
+            print(f"✅ Search index and vendor stats rebuilt in {time.perf_counter() - start:.1f}s")
+        db.session.close()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -70,6 +70,8 @@ const VendorDashboard = () => {
   const apiCall = async (endpoint, options = {}) => {
     try {
       const response = await fetch(`${API_BASE_URL}${endpoint}`, {
+        // Keeps the backend's read-your-writes cookie after profile and service edits
+        credentials: 'include',
         headers: {
           'Content-Type': 'application/json',
           ...options.headers
@@ -100,8 +102,9 @@ const VendorDashboard = () => {
 
     setLoading(true);
     try {
-      // Load vendor profile
-      const vendorData = await apiCall(`/vendor/profile/${currentUserId}`);
+      // Profile, services and stats in one request
+      const dashboard = await apiCall(`/vendor/dashboard/${currentUserId}`);
+      const vendorData = dashboard && dashboard.profile;
       if (vendorData) {
         setVendorId(vendorData.id);
         setVendorProfile({
@@ -120,12 +123,8 @@ const VendorDashboard = () => {
             twitter: vendorData.twitter || ''
           }
         });
-
-        // Load services
-        await loadVendorServices(vendorData.id);
-        
-        // Load stats
-        await loadVendorStats(vendorData.id);
+        setServices(dashboard.services || []);
+        setVendorStats(dashboard.stats);
       }
     } catch (error) {
       console.log('No existing vendor profile found');